@@ -3,22 +3,26 @@ from __future__ import annotations
 import collections
 import functools
 import logging
+import multiprocessing
 import random
 import secrets
 import warnings
 from argparse import Namespace
+from array import array
 from collections import Counter, deque, defaultdict
 from collections.abc import Collection, MutableSequence
 from enum import IntEnum, IntFlag
 from typing import (AbstractSet, Any, Callable, ClassVar, Dict, Iterable, Iterator, List, Literal, Mapping, NamedTuple,
                     Optional, Protocol, Set, Tuple, Union, TYPE_CHECKING, Literal, overload)
 import dataclasses
+import itertools
 
 from typing_extensions import NotRequired, TypedDict
 
 import NetUtils
 import Options
 import Utils
+import sphere_pool
 
 if TYPE_CHECKING:
     from entrance_rando import ERPlacementState
@@ -87,6 +91,8 @@ class MultiWorld():
     progression_balancing: Dict[int, Options.ProgressionBalancing]
     completion_condition: Dict[int, Callable[[CollectionState], bool]]
     indirect_connections: Dict[Region, Set[Entrance]]
+    item_indices: Dict[int, Dict[str, int]]
+    dense_location_ids: DenseIds
     exclude_locations: Dict[int, Options.ExcludeLocations]
     priority_locations: Dict[int, Options.PriorityLocations]
     start_inventory: Dict[int, Options.StartInventory]
@@ -166,6 +172,8 @@ class MultiWorld():
         self.early_items = {player: {} for player in self.player_ids}
         self.local_early_items = {player: {} for player in self.player_ids}
         self.indirect_connections = {}
+        self.item_indices = {}
+        self.dense_location_ids = DenseIds()
         self.start_inventory_from_pool: Dict[int, Options.StartInventoryPool] = {}
         self.plando_item_blocks = {}
 
@@ -209,6 +217,18 @@ class MultiWorld():
 
         return new_id, new_group
 
+    def get_item_index(self, player: int) -> Dict[str, int]:
+        """
+        Get the dense item name to index mapping used by ItemCounts for a world with compact_prog_items.
+        Created from the world's item names on first use, names collected later get appended to it.
+        """
+        index = self.item_indices.get(player)
+        if index is None:
+            # index 0 is reserved for unknown item names and always has a count of 0
+            index = {item_name: i for i, item_name in enumerate(self.worlds[player].item_name_to_id, 1)}
+            self.item_indices[player] = index
+        return index
+
     def get_player_groups(self, player: int) -> Set[int]:
         return {group_id for group_id, group in self.groups.items() if player in group["players"]}
 
@@ -581,39 +601,67 @@ class MultiWorld():
 
         return False
 
-    def get_spheres(self) -> Iterator[Set[Location]]:
+    def get_sphere_pool(self, state: CollectionState, candidates: Iterable[Location],
+                        processes: int) -> Optional[sphere_pool.SpherePool]:
+        """Create a SpherePool if more than one process was requested and this platform can fork."""
+        if processes <= 1:
+            return None
+        if multiprocessing.current_process().daemon:
+            # e.g. a Generate.py --batch seed, daemonic processes can't start worker processes
+            logging.info("Parallel sphere evaluation isn't possible in a daemonic process, using a single process.")
+            return None
+        if not sphere_pool.can_fork():
+            logging.warning("Parallel sphere evaluation requires fork, falling back to a single process.")
+            return None
+        return sphere_pool.SpherePool(state, candidates, processes)
+
+    def get_spheres(self, processes: int = 0) -> Iterator[Set[Location]]:
         """
         yields a set of locations for each logical sphere
 
         If there are unreachable locations, the last sphere of reachable
         locations is followed by an empty set, and then a set of all of the
         unreachable locations.
+
+        :param processes: if more than 1, evaluate each sphere's locations in that many forked worker processes
         """
         state = CollectionState(self)
         locations = set(self.get_filled_locations())
+        pool = self.get_sphere_pool(state, locations, processes)
 
-        while locations:
-            sphere: Set[Location] = set()
-
-            for location in locations:
-                if location.can_reach(state):
-                    sphere.add(location)
-            yield sphere
-            if not sphere:
-                if locations:
-                    yield locations  # unreachable locations
-                break
-
-            for location in sphere:
-                state.collect(location.item, True, location)
-            locations -= sphere
+        try:
+            while locations:
+                sphere: Set[Location]
+                if pool:
+                    sphere = set(pool.reachable(locations))
+                else:
+                    sphere = set()
+                    for location in locations:
+                        if location.can_reach(state):
+                            sphere.add(location)
+                yield sphere
+                if not sphere:
+                    if locations:
+                        yield locations  # unreachable locations
+                    break
 
-    def get_sendable_spheres(self) -> Iterator[Set[Location]]:
+                for location in sphere:
+                    state.collect(location.item, True, location)
+                if pool:
+                    pool.collect(sphere)
+                locations -= sphere
+        finally:
+            if pool:
+                pool.close()
+
+    def get_sendable_spheres(self, processes: int = 0) -> Iterator[Set[Location]]:
         """
         yields a set of multiserver sendable locations (location.item.code: int) for each logical sphere
 
         If there are unreachable locations, the last sphere of reachable locations is followed by an empty set,
         and then a set of all of the unreachable locations.
+
+        :param processes: if more than 1, evaluate each sphere's locations in that many forked worker processes
         """
         state = CollectionState(self)
         locations: Set[Location] = set()
@@ -623,36 +671,58 @@ class MultiWorld():
                 locations.add(location)
             else:
                 events.add(location)
+        pool = self.get_sphere_pool(state, locations | events, processes)
 
-        while locations:
-            sphere: Set[Location] = set()
-
-            # cull events out
-            done_events: Set[Union[Location, None]] = {None}
-            while done_events:
-                done_events = set()
-                for event in events:
-                    if event.can_reach(state):
-                        state.collect(event.item, True, event)
-                        done_events.add(event)
-                events -= done_events
-
-            for location in locations:
-                if location.can_reach(state):
-                    sphere.add(location)
-
-            yield sphere
-            if not sphere:
-                if locations:
-                    yield locations  # unreachable locations
-                break
+        try:
+            while locations:
+                sphere: Set[Location] = set()
+
+                # cull events out
+                done_events: Set[Union[Location, None]] = {None}
+                while done_events:
+                    done_events = set()
+                    if pool:
+                        # reachability of all events is checked before collecting any of them, which takes more
+                        # iterations than the serial path, but reaches the same events in the end
+                        done_events.update(pool.reachable(events))
+                        for event in done_events:
+                            state.collect(event.item, True, event)
+                        pool.collect(done_events)
+                    else:
+                        for event in events:
+                            if event.can_reach(state):
+                                state.collect(event.item, True, event)
+                                done_events.add(event)
+                    events -= done_events
+
+                if pool:
+                    sphere.update(pool.reachable(locations))
+                else:
+                    for location in locations:
+                        if location.can_reach(state):
+                            sphere.add(location)
+
+                yield sphere
+                if not sphere:
+                    if locations:
+                        yield locations  # unreachable locations
+                    break
 
-            for location in sphere:
-                state.collect(location.item, True, location)
-            locations -= sphere
+                for location in sphere:
+                    state.collect(location.item, True, location)
+                if pool:
+                    pool.collect(sphere)
+                locations -= sphere
+        finally:
+            if pool:
+                pool.close()
+
+    def fulfills_accessibility(self, state: Optional[CollectionState] = None, processes: int = 0):
+        """
+        Check if accessibility rules are fulfilled with current or supplied state.
 
-    def fulfills_accessibility(self, state: Optional[CollectionState] = None):
-        """Check if accessibility rules are fulfilled with current or supplied state."""
+        :param processes: if more than 1, evaluate each sphere's locations in that many forked worker processes
+        """
         if not state:
             state = CollectionState(self)
         players: Dict[str, Set[int]] = {
@@ -683,39 +753,289 @@ class MultiWorld():
             return True
 
         locations = [location for location in self.get_locations() if location_relevant(location)]
+        pool = self.get_sphere_pool(state, locations, processes)
 
-        while locations:
-            sphere: List[Location] = []
-            for n in range(len(locations) - 1, -1, -1):
-                if locations[n].can_reach(state):
-                    sphere.append(locations.pop(n))
+        try:
+            while locations:
+                sphere: List[Location] = []
+                if pool:
+                    sphere = pool.reachable(locations)
+                    reached = set(sphere)
+                    locations = [location for location in locations if location not in reached]
+                else:
+                    for n in range(len(locations) - 1, -1, -1):
+                        if locations[n].can_reach(state):
+                            sphere.append(locations.pop(n))
+
+                if not sphere:
+                    if __debug__:
+                        from Fill import FillError
+                        raise FillError(
+                            f"Could not access required locations for accessibility check. Missing: {locations}",
+                            multiworld=self,
+                        )
+                    # ran out of places and did not finish yet, quit
+                    logging.warning(f"Could not access required locations for accessibility check."
+                                    f" Missing: {locations}")
+                    return False
+
+                for location in sphere:
+                    if location.item:
+                        state.collect(location.item, True, location)
+                if pool:
+                    pool.collect(location for location in sphere if location.item)
+
+                if self.has_beaten_game(state):
+                    beatable_fulfilled = True
+
+                if all_done():
+                    return True
+        finally:
+            if pool:
+                pool.close()
 
-            if not sphere:
-                if __debug__:
-                    from Fill import FillError
-                    raise FillError(
-                        f"Could not access required locations for accessibility check. Missing: {locations}",
-                        multiworld=self,
-                    )
-                # ran out of places and did not finish yet, quit
-                logging.warning(f"Could not access required locations for accessibility check."
-                                f" Missing: {locations}")
-                return False
+        return False
 
-            for location in sphere:
-                if location.item:
-                    state.collect(location.item, True, location)
 
-            if self.has_beaten_game(state):
-                beatable_fulfilled = True
+PathValue = Tuple[str, Optional["PathValue"]]
 
-            if all_done():
-                return True
 
-        return False
+class CopyOnWriteDict(dict):
+    """
+    Per-player container mapping used by CollectionState.
+
+    copy() shares every per-player container between the original and the copy. A shared container is only copied
+    the first time it is retrieved through item access, so players whose data is never touched are never copied.
+    Read-only access that must not trigger a copy can use `dict.__getitem__` directly.
+    It is also nested per player, mapping item names to lists, for CollectionState.collection_marks.
+    """
+    __slots__ = ("_shared",)
+
+    _shared: Set[int]
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._shared = set()
+
+    def __getitem__(self, player: int):
+        if player in self._shared:
+            self._shared.remove(player)
+            container = dict.__getitem__(self, player).copy()
+            dict.__setitem__(self, player, container)
+            return container
+        return dict.__getitem__(self, player)
+
+    def __setitem__(self, player: int, container) -> None:
+        self._shared.discard(player)
+        dict.__setitem__(self, player, container)
+
+    def __delitem__(self, player: int) -> None:
+        self._shared.discard(player)
+        dict.__delitem__(self, player)
+
+    def get(self, player: int, default=None):
+        if player in self:
+            return self[player]
+        return default
+
+    def unshare(self) -> None:
+        """Give this mapping its own copy of every container that is still shared."""
+        for player in tuple(self._shared):
+            self[player]
+
+    def values(self):
+        self.unshare()
+        return super().values()
+
+    def items(self):
+        self.unshare()
+        return super().items()
+
+    def copy(self) -> CopyOnWriteDict:
+        ret = CopyOnWriteDict(self)
+        # both sides have to copy before their next write, as they now reference the same containers
+        self._shared.update(self.keys())
+        ret._shared.update(self.keys())
+        return ret
 
+    def __reduce__(self):
+        self.unshare()
+        return CopyOnWriteDict, (dict(self),)
 
-PathValue = Tuple[str, Optional["PathValue"]]
+
+_get_shared = dict.__getitem__
+
+
+class DenseIds:
+    """Assigns dense integer ids to objects with a `dense_id` attribute, such as the Locations of a MultiWorld."""
+    __slots__ = ("objects",)
+
+    objects: List[Any]
+    """the object for each id"""
+
+    def __init__(self) -> None:
+        self.objects = []
+
+    def id_of(self, obj: Any) -> int:
+        dense_id = obj.dense_id
+        if dense_id is None:
+            dense_id = obj.dense_id = len(self.objects)
+            self.objects.append(obj)
+        return dense_id
+
+
+class DenseSet(collections.abc.MutableSet):
+    """
+    Set of objects that have dense ids from a DenseIds, with one byte per id.
+
+    Copies are a single memcpy and iteration is in id order, which makes large sets of Locations in CollectionState
+    cheap to copy. Set operators that create a new set return a built-in set.
+    """
+    __slots__ = ("ids", "flags", "size")
+
+    ids: DenseIds
+    flags: bytearray
+    size: int
+
+    def __init__(self, ids: DenseIds, iterable: Iterable[Any] = ()) -> None:
+        self.ids = ids
+        self.flags = bytearray(len(ids.objects))
+        self.size = 0
+        for obj in iterable:
+            self.add(obj)
+
+    @classmethod
+    def _from_iterable(cls, iterable: Iterable[Any]) -> Set[Any]:
+        return set(iterable)
+
+    def __contains__(self, obj: object) -> bool:
+        dense_id = getattr(obj, "dense_id", None)
+        return dense_id is not None and dense_id < len(self.flags) and self.flags[dense_id] == 1
+
+    def __iter__(self) -> Iterator[Any]:
+        return itertools.compress(self.ids.objects, self.flags)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({set(self)})"
+
+    def add(self, obj: Any) -> None:
+        dense_id = self.ids.id_of(obj)
+        flags = self.flags
+        if dense_id >= len(flags):
+            flags.extend(bytes(len(self.ids.objects) - len(flags)))
+        elif flags[dense_id]:
+            return
+        flags[dense_id] = 1
+        self.size += 1
+
+    def discard(self, obj: Any) -> None:
+        if obj in self:
+            self.flags[obj.dense_id] = 0
+            self.size -= 1
+
+    def remove(self, obj: Any) -> None:
+        if obj not in self:
+            raise KeyError(obj)
+        self.discard(obj)
+
+    def clear(self) -> None:
+        self.flags = bytearray(len(self.ids.objects))
+        self.size = 0
+
+    def update(self, *iterables: Iterable[Any]) -> None:
+        for iterable in iterables:
+            for obj in iterable:
+                self.add(obj)
+
+    def copy(self) -> DenseSet:
+        ret = DenseSet.__new__(DenseSet)
+        ret.ids = self.ids
+        ret.flags = self.flags[:]
+        ret.size = self.size
+        return ret
+
+    def difference(self, *iterables: Iterable[Any]) -> Set[Any]:
+        return set(self).difference(*iterables)
+
+    def union(self, *iterables: Iterable[Any]) -> Set[Any]:
+        return set(self).union(*iterables)
+
+    def intersection(self, *iterables: Iterable[Any]) -> Set[Any]:
+        return set(self).intersection(*iterables)
+
+    def issubset(self, other: Iterable[Any]) -> bool:
+        return set(self).issubset(other)
+
+
+class ItemCounts(collections.abc.MutableMapping):
+    """
+    Counter-compatible item counts of a single player, stored densely in an array.
+
+    Item names are resolved through an index shared by every state of that player, see MultiWorld.get_item_index, so
+    copying only duplicates the array. Counts are limited to 0..65535, setting a count below 1 removes the item.
+    """
+    __slots__ = ("index", "counts")
+
+    index: Dict[str, int]
+    counts: array
+
+    def __init__(self, index: Dict[str, int], counts: Optional[array] = None) -> None:
+        self.index = index
+        self.counts = array("H", bytes(2 * (len(index) + 1))) if counts is None else counts
+
+    def __getitem__(self, item: str) -> int:
+        try:
+            return self.counts[self.index.get(item, 0)]
+        except IndexError:  # item name was added to the index after this array was created
+            return 0
+
+    def __setitem__(self, item: str, count: int) -> None:
+        index = self.index
+        i = index.get(item)
+        if i is None:
+            i = index[item] = len(index) + 1
+        counts = self.counts
+        if i >= len(counts):
+            counts.frombytes(bytes(2 * (len(index) + 1 - len(counts))))
+        counts[i] = count if count > 0 else 0
+
+    def __delitem__(self, item: str) -> None:
+        self[item] = 0
+
+    def __contains__(self, item: object) -> bool:
+        return self[item] > 0
+
+    def __iter__(self) -> Iterator[str]:
+        for item, count in zip(tuple(self.index), self.counts[1:]):
+            if count:
+                yield item
+
+    def __len__(self) -> int:
+        return len(self.counts) - self.counts.count(0)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({dict(self.items())})"
+
+    def copy(self) -> ItemCounts:
+        return ItemCounts(self.index, self.counts[:])
+
+    def total(self) -> int:
+        return sum(self.counts)
+
+    def update(self, other: Mapping[str, int] = (), **kwargs: int) -> None:
+        """Add counts like Counter.update."""
+        for item, count in dict(other, **kwargs).items():
+            self[item] += count
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, ItemCounts) and other.index is self.index:
+            return self.counts.tobytes().rstrip(b"\0") == other.counts.tobytes().rstrip(b"\0")
+        return super().__eq__(other)
+
+    __hash__ = None  # type: ignore[assignment]
 
 
 class CollectionState():
@@ -723,9 +1043,21 @@ class CollectionState():
     multiworld: MultiWorld
     reachable_regions: Dict[int, Set[Region]]
     blocked_connections: Dict[int, Set[Entrance]]
-    advancements: Set[Location]
+    region_sources: Dict[int, Dict[Region, Optional[Entrance]]]
+    """per player, the entrance each reachable region was first reached through, in the order they were reached"""
+    collection_marks: Dict[int, Dict[str, List[int]]]
+    """
+    per player and item name, how many of the player's regions were reached when each copy of the item that is still in
+    the state was collected
+    """
+    pending_rechecks: Dict[int, int]
+    """
+    per player that had items removed since their reachable regions were last updated, how many of the regions reached
+    first don't need to be re-verified
+    """
+    advancements: DenseSet
     path: Dict[Union[Region, Entrance], PathValue]
-    locations_checked: Set[Location]
+    locations_checked: DenseSet
     stale: Dict[int, bool]
     allow_partial_entrances: bool
     additional_init_functions: List[Callable[[CollectionState, MultiWorld], None]] = []
@@ -733,13 +1065,20 @@ class CollectionState():
 
     def __init__(self, parent: MultiWorld, allow_partial_entrances: bool = False):
         assert parent.worlds, "CollectionState created without worlds initialized in parent"
-        self.prog_items = {player: Counter() for player in parent.get_all_ids()}
+        self.prog_items = CopyOnWriteDict(
+            (player, ItemCounts(parent.get_item_index(player)) if parent.worlds[player].compact_prog_items
+             else Counter())
+            for player in parent.get_all_ids()
+        )
         self.multiworld = parent
-        self.reachable_regions = {player: set() for player in parent.get_all_ids()}
-        self.blocked_connections = {player: set() for player in parent.get_all_ids()}
-        self.advancements = set()
+        self.reachable_regions = CopyOnWriteDict((player, set()) for player in parent.get_all_ids())
+        self.blocked_connections = CopyOnWriteDict((player, set()) for player in parent.get_all_ids())
+        self.region_sources = CopyOnWriteDict((player, {}) for player in parent.get_all_ids())
+        self.collection_marks = CopyOnWriteDict((player, CopyOnWriteDict()) for player in parent.get_all_ids())
+        self.pending_rechecks = {}
+        self.advancements = DenseSet(parent.dense_location_ids)
         self.path = {}
-        self.locations_checked = set()
+        self.locations_checked = DenseSet(parent.dense_location_ids)
         self.stale = {player: True for player in parent.get_all_ids()}
         self.allow_partial_entrances = allow_partial_entrances
         for function in self.additional_init_functions:
@@ -751,13 +1090,21 @@ class CollectionState():
     def update_reachable_regions(self, player: int):
         self.stale[player] = False
         world: AutoWorld.World = self.multiworld.worlds[player]
+        start: Region = world.get_region(world.origin_region_name)
+        if player in self.pending_rechecks:
+            verified = self.pending_rechecks.pop(player)
+            if start in self.reachable_regions[player]:
+                self._recheck_reachable_regions(player, verified)
         reachable_regions = self.reachable_regions[player]
         queue = deque(self.blocked_connections[player])
-        start: Region = world.get_region(world.origin_region_name)
 
         # init on first call - this can't be done on construction since the regions don't exist yet
         if start not in reachable_regions:
             reachable_regions.add(start)
+            region_sources = self.region_sources[player]
+            region_sources.clear()
+            region_sources[start] = None
+            self.collection_marks[player] = CopyOnWriteDict()
             self.blocked_connections[player].update(start.exits)
             queue.extend(start.exits)
 
@@ -766,9 +1113,52 @@ class CollectionState():
         else:
             self._update_reachable_regions_auto_indirect_conditions(player, queue)
 
+    def _recheck_reachable_regions(self, player: int, verified: int) -> None:
+        """
+        Shrink the player's reachable regions after items were removed, instead of searching from the start again.
+
+        Access rules only ever become true by collecting items, so the regions reached before the removed copies were
+        collected are still reachable. Only the regions reached after them are re-verified, in the order they were
+        reached and each only through the entrance it was reached by. Access rules only see regions that were
+        re-verified before, so the result never contains an unreachable region. The following search from the blocked
+        connections then picks up the dropped regions that are still reachable through other entrances.
+
+        :param verified: the number of regions reached first that don't depend on the removed items
+        """
+        reachable_regions = self.reachable_regions[player]
+        region_sources = self.region_sources[player]
+        rechecked = list(itertools.islice(region_sources.items(), verified, None))
+        reachable_regions.difference_update(region for region, _ in rechecked)
+        dropped: List[Region] = []
+        for region, entrance in rechecked:
+            if entrance is None or (entrance.connected_region is region and entrance.can_reach(self)):
+                reachable_regions.add(region)
+            else:
+                del region_sources[region]
+                dropped.append(region)
+
+        blocked_connections = self.blocked_connections[player]
+        for region in dropped:
+            blocked_connections.difference_update(region.exits)
+        for region in dropped:
+            blocked_connections.update(entrance for entrance in region.entrances
+                                       if entrance.parent_region in reachable_regions)
+        # regions after the verified ones may have moved to earlier positions
+        # marks are in collection order, so they never decrease
+        collection_marks = self.collection_marks[player]
+        for item_name, marks in dict.items(collection_marks):
+            if not marks or marks[-1] <= verified:
+                continue
+            marks = collection_marks[item_name]
+            index = len(marks) - 1
+            while index >= 0 and marks[index] > verified:
+                marks[index] = verified
+                index -= 1
+
     def _update_reachable_regions_explicit_indirect_conditions(self, player: int, queue: deque):
         reachable_regions = self.reachable_regions[player]
         blocked_connections = self.blocked_connections[player]
+        region_sources = self.region_sources[player]
         # run BFS on all connections, and keep track of those blocked by missing items
         while queue:
             connection = queue.popleft()
@@ -780,6 +1170,7 @@ class CollectionState():
                     continue
                 assert new_region, f"tried to search through an Entrance \"{connection}\" with no connected Region"
                 reachable_regions.add(new_region)
+                region_sources[new_region] = connection
                 blocked_connections.remove(connection)
                 blocked_connections.update(new_region.exits)
                 queue.extend(new_region.exits)
@@ -793,6 +1184,7 @@ class CollectionState():
     def _update_reachable_regions_auto_indirect_conditions(self, player: int, queue: deque):
         reachable_regions = self.reachable_regions[player]
         blocked_connections = self.blocked_connections[player]
+        region_sources = self.region_sources[player]
         new_connection: bool = True
         # run BFS on all connections, and keep track of those blocked by missing items
         while new_connection:
@@ -807,6 +1199,7 @@ class CollectionState():
                         continue
                     assert new_region, f"tried to search through an Entrance \"{connection}\" with no connected Region"
                     reachable_regions.add(new_region)
+                    region_sources[new_region] = connection
                     blocked_connections.remove(connection)
                     blocked_connections.update(new_region.exits)
                     queue.extend(new_region.exits)
@@ -816,16 +1209,27 @@ class CollectionState():
             queue.extend(blocked_connections)
 
     def copy(self) -> CollectionState:
-        ret = CollectionState(self.multiworld)
-        ret.prog_items = {player: counter.copy() for player, counter in self.prog_items.items()}
-        ret.reachable_regions = {player: region_set.copy() for player, region_set in
-                                 self.reachable_regions.items()}
-        ret.blocked_connections = {player: entrance_set.copy() for player, entrance_set in
-                                   self.blocked_connections.items()}
+        """
+        Create a copy of this state.
+
+        Per-player containers (prog_items, reachable_regions, blocked_connections, region_sources and collection_marks)
+        are shared copy-on-write, so only the players that get modified afterward are actually copied.
+        """
+        ret = CollectionState.__new__(CollectionState)
+        ret.multiworld = self.multiworld
+        ret.prog_items = self.prog_items.copy()
+        ret.reachable_regions = self.reachable_regions.copy()
+        ret.blocked_connections = self.blocked_connections.copy()
+        ret.region_sources = self.region_sources.copy()
+        ret.collection_marks = self.collection_marks.copy()
+        ret.pending_rechecks = self.pending_rechecks.copy()
         ret.advancements = self.advancements.copy()
         ret.path = self.path.copy()
         ret.locations_checked = self.locations_checked.copy()
+        ret.stale = dict.fromkeys(self.stale, True)
         ret.allow_partial_entrances = self.allow_partial_entrances
+        for function in self.additional_init_functions:
+            function(ret, self.multiworld)
         for function in self.additional_copy_functions:
             ret = function(self, ret)
         return ret
@@ -861,7 +1265,8 @@ class CollectionState():
         return self.sweep_for_advancements(locations)
 
     def _sweep_for_advancements_impl(self, advancements_per_player: List[Tuple[int, List[Location]]],
-                                     yield_each_sweep: bool) -> Iterator[None]:
+                                     yield_each_sweep: bool,
+                                     sweep_order: Optional[List[List[Location]]] = None) -> Iterator[None]:
         """
         The implementation for sweep_for_advancements is separated here because it returns a generator due to the use
         of a yield statement.
@@ -896,6 +1301,8 @@ class CollectionState():
                         unreachable_locations.append(location)
                 if unreachable_locations:
                     next_advancements_per_player.append((player, unreachable_locations))
+                if sweep_order is not None and reachable_locations:
+                    sweep_order.append(reachable_locations)
 
                 # A previous player's locations processed in the current `while players_to_check` iteration could have
                 # collected items belonging to `player`, but now that all of `player`'s reachable locations have been
@@ -936,15 +1343,18 @@ class CollectionState():
     @overload
     def sweep_for_advancements(self, locations: Optional[Iterable[Location]] = None, *,
                                yield_each_sweep: Literal[True],
-                               checked_locations: Optional[Set[Location]] = None) -> Iterator[None]: ...
+                               checked_locations: Optional[Set[Location]] = None,
+                               sweep_order: Optional[List[List[Location]]] = None) -> Iterator[None]: ...
 
     @overload
     def sweep_for_advancements(self, locations: Optional[Iterable[Location]] = None,
                                yield_each_sweep: Literal[False] = False,
-                               checked_locations: Optional[Set[Location]] = None) -> None: ...
+                               checked_locations: Optional[Set[Location]] = None,
+                               sweep_order: Optional[List[List[Location]]] = None) -> None: ...
 
     def sweep_for_advancements(self, locations: Optional[Iterable[Location]] = None, yield_each_sweep: bool = False,
-                               checked_locations: Optional[Set[Location]] = None) -> Optional[Iterator[None]]:
+                               checked_locations: Optional[Set[Location]] = None,
+                               sweep_order: Optional[List[List[Location]]] = None) -> Optional[Iterator[None]]:
         """
         Sweep through the locations that contain uncollected advancement items, collecting the items into the state
         until there are no more reachable locations that contain uncollected advancement items.
@@ -953,7 +1363,18 @@ class CollectionState():
         :param yield_each_sweep: When True, return a generator that yields at the end of each sweep iteration.
         :param checked_locations: Optional override of locations to filter out from the locations argument, defaults to
         self.advancements when None.
+        :param sweep_order: Optional list that the locations collected by each sweep iteration are recorded into.
+        If it already contains the order of a previous sweep of a similar state, those locations are checked first, in
+        the same order, which usually collects most locations without repeatedly checking unreachable ones.
+        The result is the same, as the remaining locations are swept through afterward as usual.
         """
+        if sweep_order and checked_locations is None:
+            if locations is not None:
+                locations = list(locations)
+            self._replay_sweep_order(sweep_order, locations)
+        elif sweep_order:
+            sweep_order.clear()
+
         if checked_locations is None:
             checked_locations = self.advancements
 
@@ -980,24 +1401,65 @@ class CollectionState():
 
         if yield_each_sweep:
             # Return a generator that will yield at the end of each sweep iteration.
-            return self._sweep_for_advancements_impl(advancements_per_player, True)
+            return self._sweep_for_advancements_impl(advancements_per_player, True, sweep_order)
         else:
             # Create the generator, but tell it not to yield anything, so it will run to completion in zero iterations
             # once started, then start and exhaust the generator by attempting to iterate it.
-            for _ in self._sweep_for_advancements_impl(advancements_per_player, False):
+            for _ in self._sweep_for_advancements_impl(advancements_per_player, False, sweep_order):
                 assert False, "Generator yielded when it should have run to completion without yielding"
             return None
 
+    def _replay_sweep_order(self, sweep_order: List[List[Location]], locations: Optional[List[Location]]) -> None:
+        """
+        Collect the locations of a previous sweep's order that are reachable, one recorded sweep iteration at a time,
+        replacing the contents of sweep_order with the iterations that collected something.
+        """
+        previous_order = sweep_order.copy()
+        sweep_order.clear()
+        allowed_locations = None if locations is None else set(locations)
+        advancements = self.advancements
+        for previous_locations in previous_order:
+            # Like in a sweep iteration, all locations are checked before collecting any items, so that the region
+            # accessibility cache does not become stale in between.
+            reachable_locations = [location for location in previous_locations
+                                   if location.advancement and location not in advancements
+                                   and (allowed_locations is None or location in allowed_locations)
+                                   and location.can_reach(self)]
+            for location in reachable_locations:
+                advancements.add(location)
+                self.collect(location.item, True, location)
+            if reachable_locations:
+                sweep_order.append(reachable_locations)
+
     # item name related
+    # Worlds with compact_prog_items store ItemCounts, which these methods read directly: each name is resolved
+    # through the shared index and its count read from the array, skipping ItemCounts.__getitem__. Like there, an
+    # IndexError means the name was added to the index after the array was created, so its count is 0.
     def has(self, item: str, player: int, count: int = 1) -> bool:
-        return self.prog_items[player][item] >= count
+        player_prog_items = _get_shared(self.prog_items, player)
+        if type(player_prog_items) is ItemCounts:
+            try:
+                return player_prog_items.counts[player_prog_items.index.get(item, 0)] >= count
+            except IndexError:
+                return False
+        return player_prog_items[item] >= count
 
     # for loops are specifically used in all/any/count methods, instead of all()/any()/sum(), to avoid the overhead of
     # creating and iterating generator instances. In `return all(player_prog_items[item] for item in items)`, the
     # argument to all() would be a new generator instance, for example.
     def has_all(self, items: Iterable[str], player: int) -> bool:
         """Returns True if each item name of items is in state at least once."""
-        player_prog_items = self.prog_items[player]
+        player_prog_items = _get_shared(self.prog_items, player)
+        if type(player_prog_items) is ItemCounts:
+            index = player_prog_items.index
+            counts = player_prog_items.counts
+            for item in items:
+                try:
+                    if not counts[index.get(item, 0)]:
+                        return False
+                except IndexError:
+                    return False
+            return True
         for item in items:
             if not player_prog_items[item]:
                 return False
@@ -1005,7 +1467,17 @@ class CollectionState():
 
     def has_any(self, items: Iterable[str], player: int) -> bool:
         """Returns True if at least one item name of items is in state at least once."""
-        player_prog_items = self.prog_items[player]
+        player_prog_items = _get_shared(self.prog_items, player)
+        if type(player_prog_items) is ItemCounts:
+            index = player_prog_items.index
+            counts = player_prog_items.counts
+            for item in items:
+                try:
+                    if counts[index.get(item, 0)]:
+                        return True
+                except IndexError:
+                    pass
+            return False
         for item in items:
             if player_prog_items[item]:
                 return True
@@ -1013,7 +1485,18 @@ class CollectionState():
 
     def has_all_counts(self, item_counts: Mapping[str, int], player: int) -> bool:
         """Returns True if each item name is in the state at least as many times as specified."""
-        player_prog_items = self.prog_items[player]
+        player_prog_items = _get_shared(self.prog_items, player)
+        if type(player_prog_items) is ItemCounts:
+            index = player_prog_items.index
+            counts = player_prog_items.counts
+            for item, count in item_counts.items():
+                try:
+                    if counts[index.get(item, 0)] < count:
+                        return False
+                except IndexError:
+                    if count > 0:
+                        return False
+            return True
         for item, count in item_counts.items():
             if player_prog_items[item] < count:
                 return False
@@ -1021,19 +1504,36 @@ class CollectionState():
 
     def has_any_count(self, item_counts: Mapping[str, int], player: int) -> bool:
         """Returns True if at least one item name is in the state at least as many times as specified."""
-        player_prog_items = self.prog_items[player]
+        player_prog_items = _get_shared(self.prog_items, player)
+        if type(player_prog_items) is ItemCounts:
+            index = player_prog_items.index
+            counts = player_prog_items.counts
+            for item, count in item_counts.items():
+                try:
+                    if counts[index.get(item, 0)] >= count:
+                        return True
+                except IndexError:
+                    if count <= 0:
+                        return True
+            return False
         for item, count in item_counts.items():
             if player_prog_items[item] >= count:
                 return True
         return False
 
     def count(self, item: str, player: int) -> int:
-        return self.prog_items[player][item]
+        player_prog_items = _get_shared(self.prog_items, player)
+        if type(player_prog_items) is ItemCounts:
+            try:
+                return player_prog_items.counts[player_prog_items.index.get(item, 0)]
+            except IndexError:
+                return 0
+        return player_prog_items[item]
 
     def has_from_list(self, items: Iterable[str], player: int, count: int) -> bool:
         """Returns True if the state contains at least `count` items matching any of the item names from a list."""
         found: int = 0
-        player_prog_items = self.prog_items[player]
+        player_prog_items = _get_shared(self.prog_items, player)
         for item_name in items:
             found += player_prog_items[item_name]
             if found >= count:
@@ -1044,7 +1544,7 @@ class CollectionState():
         """Returns True if the state contains at least `count` items matching any of the item names from a list.
         Ignores duplicates of the same item."""
         found: int = 0
-        player_prog_items = self.prog_items[player]
+        player_prog_items = _get_shared(self.prog_items, player)
         for item_name in items:
             found += player_prog_items[item_name] > 0
             if found >= count:
@@ -1053,7 +1553,7 @@ class CollectionState():
 
     def count_from_list(self, items: Iterable[str], player: int) -> int:
         """Returns the cumulative count of items from a list present in state."""
-        player_prog_items = self.prog_items[player]
+        player_prog_items = _get_shared(self.prog_items, player)
         total = 0
         for item_name in items:
             total += player_prog_items[item_name]
@@ -1061,7 +1561,7 @@ class CollectionState():
 
     def count_from_list_unique(self, items: Iterable[str], player: int) -> int:
         """Returns the cumulative count of items from a list present in state. Ignores duplicates of the same item."""
-        player_prog_items = self.prog_items[player]
+        player_prog_items = _get_shared(self.prog_items, player)
         total = 0
         for item_name in items:
             if player_prog_items[item_name] > 0:
@@ -1072,7 +1572,7 @@ class CollectionState():
     def has_group(self, item_name_group: str, player: int, count: int = 1) -> bool:
         """Returns True if the state contains at least `count` items present in a specified item group."""
         found: int = 0
-        player_prog_items = self.prog_items[player]
+        player_prog_items = _get_shared(self.prog_items, player)
         for item_name in self.multiworld.worlds[player].item_name_groups[item_name_group]:
             found += player_prog_items[item_name]
             if found >= count:
@@ -1084,7 +1584,7 @@ class CollectionState():
         Ignores duplicates of the same item.
         """
         found: int = 0
-        player_prog_items = self.prog_items[player]
+        player_prog_items = _get_shared(self.prog_items, player)
         for item_name in self.multiworld.worlds[player].item_name_groups[item_name_group]:
             found += player_prog_items[item_name] > 0
             if found >= count:
@@ -1093,7 +1593,7 @@ class CollectionState():
 
     def count_group(self, item_name_group: str, player: int) -> int:
         """Returns the cumulative count of items from an item group present in state."""
-        player_prog_items = self.prog_items[player]
+        player_prog_items = _get_shared(self.prog_items, player)
         return sum(
             player_prog_items[item_name]
             for item_name in self.multiworld.worlds[player].item_name_groups[item_name_group]
@@ -1102,7 +1602,7 @@ class CollectionState():
     def count_group_unique(self, item_name_group: str, player: int) -> int:
         """Returns the cumulative count of items from an item group present in state.
         Ignores duplicates of the same item."""
-        player_prog_items = self.prog_items[player]
+        player_prog_items = _get_shared(self.prog_items, player)
         return sum(
             player_prog_items[item_name] > 0
             for item_name in self.multiworld.worlds[player].item_name_groups[item_name_group]
@@ -1116,6 +1616,14 @@ class CollectionState():
         changed = self.multiworld.worlds[item.player].collect(self, item)
 
         self.stale[item.player] = True
+        if changed:
+            collection_marks = self.collection_marks[item.player]
+            marks = collection_marks.get(item.name)
+            mark = len(_get_shared(self.region_sources, item.player))
+            if marks is None:
+                collection_marks[item.name] = [mark]
+            else:
+                marks.append(mark)
 
         if changed and not prevent_sweep:
             self.sweep_for_advancements()
@@ -1136,9 +1644,11 @@ class CollectionState():
     def remove(self, item: Item):
         changed = self.multiworld.worlds[item.player].remove(self, item)
         if changed:
-            # invalidate caches, nothing can be trusted anymore now
-            self.reachable_regions[item.player] = set()
-            self.blocked_connections[item.player] = set()
+            # the regions reached after the removed copy was collected may have been lost, they get re-verified on the
+            # next update, all of them if the copy wasn't collected through collect
+            marks = self.collection_marks[item.player].get(item.name)
+            verified = marks.pop() if marks else 0
+            self.pending_rechecks[item.player] = min(self.pending_rechecks.get(item.player, verified), verified)
             self.stale[item.player] = True
 
     def remove_item(self, item: str, player: int, count: int = 1) -> None:
@@ -1333,7 +1843,7 @@ class Region:
     def can_reach(self, state: CollectionState) -> bool:
         if state.stale[self.player]:
             state.update_reachable_regions(self.player)
-        return self in state.reachable_regions[self.player]
+        return self in _get_shared(state.reachable_regions, self.player)
 
     @property
     def hint_text(self) -> str:
@@ -1477,6 +1987,8 @@ class Location:
     access_rule: Callable[[CollectionState], bool] = staticmethod(lambda state: True)
     item_rule: Callable[[Item], bool] = staticmethod(lambda item: True)
     item: Optional[Item] = None
+    dense_id: Optional[int] = None
+    """id in MultiWorld.dense_location_ids, assigned when first added to a CollectionState's location set"""
 
     def __init__(self, player: int, name: str = '', address: Optional[int] = None, parent: Optional[Region] = None):
         self.player = player
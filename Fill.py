@@ -1,9 +1,11 @@
 import collections
 import itertools
 import logging
+import time
 import typing
 from collections import Counter, deque
 
+import generation_profile
 from BaseClasses import CollectionState, Item, Location, LocationProgressType, MultiWorld, PlandoItemBlock
 from Options import Accessibility
 
@@ -25,11 +27,16 @@ def _log_fill_progress(name: str, placed: int, total_items: int) -> None:
 
 
 def sweep_from_pool(base_state: CollectionState, itempool: typing.Sequence[Item] = tuple(),
-                    locations: typing.Optional[typing.List[Location]] = None) -> CollectionState:
+                    locations: typing.Optional[typing.List[Location]] = None,
+                    sweep_order: typing.Optional[typing.List[typing.List[Location]]] = None) -> CollectionState:
+    """
+    :param sweep_order: order of a previous sweep from a similar pool to check first, replaced with this sweep's order.
+    See CollectionState.sweep_for_advancements.
+    """
     new_state = base_state.copy()
     for item in itempool:
         new_state.collect(item, True)
-    new_state.sweep_for_advancements(locations=locations)
+    new_state.sweep_for_advancements(locations=locations, sweep_order=sweep_order)
     return new_state
 
 
@@ -58,10 +65,16 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
     reachable_items: typing.Dict[int, typing.Deque[Item]] = {}
     for item in item_pool:
         reachable_items.setdefault(item.player, deque()).append(item)
+    # each maximum exploration state sweeps from a pool with only a few items less than the last one,
+    # so most of the previous sweep's order can be replayed instead of sweeping from scratch
+    sweep_order: typing.List[typing.List[Location]] = []
 
     # for progress logging
     total = min(len(item_pool), len(locations))
     placed = 0
+    # for profiling
+    item_count = len(item_pool)
+    start = time.perf_counter()
 
     while any(reachable_items.values()) and locations:
         if one_item_per_player:
@@ -84,7 +97,7 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
 
         maximum_exploration_state = sweep_from_pool(
             base_state, item_pool + unplaced_items, multiworld.get_filled_locations(item.player)
-            if single_player_placement else None)
+            if single_player_placement else None, sweep_order)
 
         has_beaten_game = multiworld.has_beaten_game(maximum_exploration_state)
 
@@ -236,6 +249,10 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
                 if not location.item:
                     location.progress_type = location.progress_type.EXCLUDED
 
+    if generation_profile.active:
+        generation_profile.active.record_fill_step(name, item_count, placed, sum(swapped_items.values()),
+                                                   len(unplaced_items), time.perf_counter() - start)
+
     if not allow_partial and len(unplaced_items) > 0 and len(locations) > 0:
         # There are leftover unplaceable items and locations that won't accept them
         if multiworld.can_beat_game():
@@ -265,6 +282,9 @@ def remaining_fill(multiworld: MultiWorld,
     swapped_items: typing.Counter[typing.Tuple[int, str]] = Counter()
     total = min(len(itempool), len(locations))
     placed = 0
+    # for profiling
+    item_count = len(itempool)
+    start = time.perf_counter()
 
     # Optimisation: Decide whether to do full location.can_fill check (respect excluded), or only check the item rule
     if check_location_can_fill:
@@ -332,6 +352,10 @@ def remaining_fill(multiworld: MultiWorld,
     if total > 1000:
         _log_fill_progress(name, placed, total)
 
+    if generation_profile.active:
+        generation_profile.active.record_fill_step(name, item_count, placed, sum(swapped_items.values()),
+                                                   len(unplaced_items), time.perf_counter() - start)
+
     if unplaced_items and locations:
         # There are leftover unplaceable items and locations that won't accept them
         if move_unplaceable_to_start_inventory:
@@ -730,6 +754,40 @@ def flood_items(multiworld: MultiWorld) -> None:
                 break
 
 
+class SphereTracker:
+    """
+    Records the spheres found by progression balancing, so that each sphere is only searched for once.
+
+    Progression balancing looks ahead from a copy of its state, which finds the same spheres that its sphere loop finds
+    afterward, unless items get swapped in between. Recorded spheres are reused instead of checking every unchecked
+    location again, until swapping items into a sphere makes the spheres after it outdated.
+    """
+    spheres: typing.List[typing.Set[Location]]
+
+    def __init__(self) -> None:
+        self.spheres = []
+
+    def get_sphere(self, number: int, state: CollectionState,
+                   unchecked_locations: typing.Set[Location]) -> typing.Set[Location]:
+        """
+        Return the locations of a sphere, searching for them if the sphere isn't recorded yet.
+
+        :param number: Number of the sphere, starting at 1. Spheres have to be searched for in order.
+        :param state: State that has collected the advancements of all previous spheres.
+        :param unchecked_locations: Locations that aren't part of any previous sphere.
+        """
+        if number <= len(self.spheres):
+            return self.spheres[number - 1]
+        assert number == len(self.spheres) + 1, "Spheres have to be searched for in order."
+        sphere = {location for location in unchecked_locations if state.can_reach(location)}
+        self.spheres.append(sphere)
+        return sphere
+
+    def discard_after(self, number: int) -> None:
+        """Forget the spheres after a sphere, because items got swapped into it."""
+        del self.spheres[number:]
+
+
 def balance_multiworld_progression(multiworld: MultiWorld) -> None:
     # A system to reduce situations where players have no checks remaining, popularly known as "BK mode."
     # Overall progression balancing algorithm:
@@ -767,6 +825,7 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
             if total_locations_count[player]
         }
         sphere_num: int = 1
+        spheres = SphereTracker()
         moved_item_count: int = 0
 
         def get_sphere_locations(sphere_state: CollectionState,
@@ -784,7 +843,7 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
             # Gather non-locked locations.
             # This ensures that only shuffled locations get counted for progression balancing,
             #   i.e. the items the players will be checking.
-            sphere_locations = get_sphere_locations(state, unchecked_locations)
+            sphere_locations = spheres.get_sphere(sphere_num, state, unchecked_locations)
             for location in sphere_locations:
                 unchecked_locations.remove(location)
                 if not location.locked:
@@ -818,6 +877,7 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                     balancing_unchecked_locations = unchecked_locations.copy()
                     balancing_reachables = reachable_locations_count.copy()
                     balancing_sphere = sphere_locations.copy()
+                    balancing_sphere_num = sphere_num
                     candidate_items: typing.Dict[int, typing.Set[Location]] = collections.defaultdict(set)
                     while True:
                         # Check locations in the current sphere and gather progression items to swap earlier
@@ -832,7 +892,11 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                                         location.progress_type != LocationProgressType.PRIORITY):
                                     candidate_items[player].add(location)
                                     logging.debug(f"Candidate item: {location.name}, {location.item.name}")
-                        balancing_sphere = get_sphere_locations(balancing_state, balancing_unchecked_locations)
+                        # the state of each balancing sphere is the same as the one the sphere loop reaches later,
+                        # so the spheres looked ahead to are recorded for the next balancing and the sphere loop
+                        balancing_sphere = spheres.get_sphere(balancing_sphere_num, balancing_state,
+                                                              balancing_unchecked_locations)
+                        balancing_sphere_num += 1
                         for location in balancing_sphere:
                             balancing_unchecked_locations.remove(location)
                             if not location.locked:
@@ -855,6 +919,8 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                         items_to_test = list(candidate_items[player])
                         items_to_test.sort()
                         multiworld.random.shuffle(items_to_test)
+                        # the reducing states only differ by the item being tested, so each sweep replays the last one
+                        reducing_sweep_order: typing.List[typing.List[Location]] = []
                         while items_to_test:
                             testing = items_to_test.pop()
                             reducing_state = state.copy()
@@ -864,7 +930,8 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                             ), items_to_test):
                                 reducing_state.collect(location.item, True, location)
 
-                            reducing_state.sweep_for_advancements(locations=locations_to_test)
+                            reducing_state.sweep_for_advancements(locations=locations_to_test,
+                                                                  sweep_order=reducing_sweep_order)
 
                             if multiworld.has_beaten_game(balancing_state):
                                 if not multiworld.has_beaten_game(reducing_state):
@@ -902,6 +969,7 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
 
                     if old_moved_item_count < moved_item_count:
                         logging.debug(f"Moved {moved_item_count} items so far\n")
+                        spheres.discard_after(sphere_num - 1)
                         unlocked = {fresh for player in balancing_players for fresh in unlocked_locations[player]}
                         for location in get_sphere_locations(state, unlocked):
                             unchecked_locations.remove(location)
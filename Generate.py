@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import argparse
 import copy
+import functools
 import logging
 import os
 import random
@@ -11,7 +12,7 @@ import urllib.parse
 import urllib.request
 from collections import Counter
 from itertools import chain
-from typing import Any
+from typing import Any, Iterable
 
 import ModuleUpdate
 
@@ -20,7 +21,7 @@ ModuleUpdate.update()
 import Utils
 import Options
 from BaseClasses import seeddigits, get_seed, PlandoOptions
-from Utils import parse_yamls, version_tuple, __version__, tuplize_version
+from Utils import parse_yamls_cached, version_tuple, __version__, tuplize_version
 
 
 def mystery_argparse(argv: list[str] | None = None) -> argparse.Namespace:
@@ -57,6 +58,27 @@ def mystery_argparse(argv: list[str] | None = None) -> argparse.Namespace:
     parser.add_argument("--spoiler_only", action="store_true",
                         help="Skips generation assertion and multidata, outputting only a spoiler log. "
                              "Intended for debugging and testing purposes.")
+    parser.add_argument("--sphere_processes", type=int, default=0,
+                        help="Number of forked processes used to check location reachability when calculating "
+                             "spheres for the accessibility check and multidata. 0 or 1 checks them in-process.")
+    parser.add_argument("--profile_report", default=None, metavar="PATH",
+                        help="Profile the generation and write a JSON report of the time and memory per world and "
+                             "stage, the fill steps, can_reach calls and most expensive access rules to PATH, "
+                             "and an HTML view of it next to it. Slows down generation considerably.")
+    parser.add_argument("--profile_rules", action="store_true",
+                        help="Count the calls and time of access rules. Logs the most expensive rules per game at "
+                             "the end and writes their time as folded stacks for flame graph tools to the output "
+                             "directory.")
+    parser.add_argument("--batch", type=int, default=0,
+                        help="Generate this many multiworlds with different seeds from the same player files. "
+                             "Worlds are imported once and shared with the processes generating the seeds.")
+    parser.add_argument("--batch_processes", type=int, default=0,
+                        help="Number of processes generating seeds in batch mode. Defaults to the number of CPUs.")
+    parser.add_argument("--skip_yaml_cache", action="store_true",
+                        help="Parse all player files, instead of loading the ones parsed before from the cache.")
+    parser.add_argument("--yaml_processes", type=int, default=0,
+                        help="Number of forked processes used to read player files and roll their options. "
+                             "0 or 1 reads and rolls them in-process. The result is the same either way.")
     args = parser.parse_args(argv)
 
     if args.skip_output and args.spoiler_only:
@@ -78,10 +100,6 @@ def get_seed_name(random_source) -> str:
 
 
 def main(args=None) -> tuple[argparse.Namespace, int]:
-    # __name__ == "__main__" check so unittests that already imported worlds don't trip this.
-    if __name__ == "__main__" and "worlds" in sys.modules:
-        raise Exception("Worlds system should not be loaded before logging init.")
-
     if not args:
         args = mystery_argparse()
 
@@ -98,7 +116,8 @@ def main(args=None) -> tuple[argparse.Namespace, int]:
     weights_cache: dict[str, tuple[Any, ...]] = {}
     if args.weights_file_path and os.path.exists(args.weights_file_path):
         try:
-            weights_cache[args.weights_file_path] = read_weights_yamls(args.weights_file_path)
+            weights_cache[args.weights_file_path] = read_weights_yamls(args.weights_file_path,
+                                                                       not args.skip_yaml_cache)
         except Exception as e:
             raise ValueError(f"File {args.weights_file_path} is invalid. Please fix your yaml.") from e
         logging.info(f"Weights: {args.weights_file_path} >> "
@@ -106,7 +125,7 @@ def main(args=None) -> tuple[argparse.Namespace, int]:
 
     if args.meta_file_path and os.path.exists(args.meta_file_path):
         try:
-            meta_weights = read_weights_yamls(args.meta_file_path)[-1]
+            meta_weights = read_weights_yamls(args.meta_file_path, not args.skip_yaml_cache)[-1]
         except Exception as e:
             raise ValueError(f"File {args.meta_file_path} is invalid. Please fix your yaml.") from e
         logging.info(f"Meta: {args.meta_file_path} >> {get_choice('meta_description', meta_weights)}")
@@ -122,26 +141,31 @@ def main(args=None) -> tuple[argparse.Namespace, int]:
     player_id: int = 1
     player_files: dict[int, str] = {}
     player_errors: list[str] = []
+    fnames: list[str] = []
     for file in os.scandir(args.player_files_path):
         fname = file.name
         if file.is_file() and not fname.startswith(".") and not fname.lower().endswith(".ini") and \
                 os.path.join(args.player_files_path, fname) not in {args.meta_file_path, args.weights_file_path}:
-            path = os.path.join(args.player_files_path, fname)
-            try:
-                weights_for_file = []
-                for doc_idx, yaml in enumerate(read_weights_yamls(path)):
-                    if yaml is None:
-                        logging.warning(f"Ignoring empty yaml document #{doc_idx + 1} in {fname}")
-                    else:
-                        weights_for_file.append(yaml)
-                weights_cache[fname] = tuple(weights_for_file)
-
-            except Exception as e:
-                logging.exception(f"Exception reading weights in file {fname}")
-                player_errors.append(
-                    f"{len(player_errors) + 1}. "
-                    f"File {fname} is invalid. Please fix your yaml.\n{Utils.get_all_causes(e)}"
-                )
+            fnames.append(fname)
+    player_yamls = map_in_processes(functools.partial(_read_player_yamls, use_cache=not args.skip_yaml_cache),
+                                    [os.path.join(args.player_files_path, fname) for fname in fnames],
+                                    args.yaml_processes)
+    for fname, (yamls, error) in zip(fnames, player_yamls):
+        if yamls is None:
+            player_errors.append(
+                f"{len(player_errors) + 1}. "
+                f"File {fname} is invalid. Please fix your yaml.\n{error}"
+            )
+            continue
+        weights_for_file = []
+        for doc_idx, yaml in enumerate(yamls):
+            if yaml is None:
+                logging.warning(f"Ignoring empty yaml document #{doc_idx + 1} in {fname}")
+            else:
+                weights_for_file.append(yaml)
+        weights_cache[fname] = tuple(weights_for_file)
+    if not args.skip_yaml_cache:
+        Utils.evict_yaml_cache()
 
     # sort dict for consistent results across platforms:
     weights_cache = {key: value for key, value in sorted(weights_cache.items(), key=lambda k: k[0].casefold())}
@@ -205,17 +229,29 @@ def main(args=None) -> tuple[argparse.Namespace, int]:
                             else:
                                 yaml[category_name][key] = option
 
+    # Every roll is seeded on its own, so they can be rolled in any order and process with the same result.
+    roll_seed = random.getrandbits(64)
+    random_state = random.getstate()
+    if args.yaml_processes > 1:
+        import_rolled_worlds(yaml for yamls in weights_cache.values() for yaml in yamls)
+
     settings_cache: dict[str, tuple[argparse.Namespace, ...] | None] = {fname: None for fname in weights_cache}
     if args.sameoptions:
+        rolls = map_in_processes(_roll_settings_seeded, [
+            (yaml, args.plando, f"{roll_seed}-{fname}-{doc_index}", f"file {fname}")
+            for fname, yamls in weights_cache.items() for doc_index, yaml in enumerate(yamls)
+        ], args.yaml_processes)
+        file_rolls_iterator = iter(rolls)
         for fname, yamls in weights_cache.items():
-            try:
-                settings_cache[fname] = tuple(roll_settings(yaml, args.plando) for yaml in yamls)
-            except Exception as e:
-                logging.exception(f"Exception reading settings in file {fname}")
+            file_rolls = [next(file_rolls_iterator) for _ in yamls]
+            errors = [error for _, error in file_rolls if error]
+            if errors:
                 player_errors.append(
                     f"{len(player_errors) + 1}. "
-                    f"File {fname} is invalid. Please fix your yaml.\n{Utils.get_all_causes(e)}"
+                    f"File {fname} is invalid. Please fix your yaml.\n{errors[0]}"
                 )
+            else:
+                settings_cache[fname] = tuple(settings for settings, _ in file_rolls)
         # Exit early here to avoid throwing the same errors again later
         if player_errors:
             errors = "\n\n".join(player_errors)
@@ -228,6 +264,23 @@ def main(args=None) -> tuple[argparse.Namespace, int]:
     name_counter: Counter[str] = Counter()
     args.player_options = {}
 
+    player_rolls: dict[int, tuple[argparse.Namespace | None, str | None]] = {}
+    if not args.sameoptions:
+        roll_tasks: dict[int, tuple[dict, PlandoOptions, str, str]] = {}
+        player = 1
+        while player <= args.multi:
+            path = player_path_cache[player]
+            if not path:
+                player += 1
+                continue
+            for doc_index, yaml in enumerate(weights_cache[path]):
+                roll_tasks[player] = (yaml, args.plando, f"{roll_seed}-{player}",
+                                      f"file {path} document #{doc_index + 1} (name: {yaml.get('name')})")
+                player += 1
+        player_rolls = dict(zip(roll_tasks, map_in_processes(_roll_settings_seeded, list(roll_tasks.values()),
+                                                             args.yaml_processes)))
+    random.setstate(random_state)
+
     player = 1
     while player <= args.multi:
         path = player_path_cache[player]
@@ -238,12 +291,18 @@ def main(args=None) -> tuple[argparse.Namespace, int]:
 
         for doc_index, yaml in enumerate(weights_cache[path]):
             name = yaml.get("name")
+            # Use the cached settings object if it exists, otherwise the settings rolled for this player
+            # Invariant: settings_cache[path] and weights_cache[path] have the same length
+            cached = settings_cache[path]
+            settings_object, error = (cached[doc_index], None) if cached else player_rolls[player]
+            if settings_object is None:  # the error was logged when rolling
+                player_errors.append(
+                    f"{len(player_errors) + 1}. "
+                    f"File {path} document #{doc_index + 1} (name: {name}) is invalid. "
+                    f"Please fix your yaml.\n{error}")
+                player += 1
+                continue
             try:
-                # Use the cached settings object if it exists, otherwise roll settings within the try-catch
-                # Invariant: settings_cache[path] and weights_cache[path] have the same length
-                cached = settings_cache[path]
-                settings_object: argparse.Namespace = (cached[doc_index] if cached else roll_settings(yaml, args.plando))
-
                 for k, v in vars(settings_object).items():
                     if v is not None:
                         try:
@@ -288,7 +347,130 @@ def main(args=None) -> tuple[argparse.Namespace, int]:
     return args, seed
 
 
-def read_weights_yamls(path) -> tuple[Any, ...]:
+def _generate_batch_seed(args: argparse.Namespace, seed: int) -> tuple[int, str | None]:
+    from Main import main as ERmain
+    args = copy.deepcopy(args)
+    args.seed = seed
+    try:
+        erargs, seed = main(args)
+        ERmain(erargs, seed)
+    except Exception as e:
+        logging.exception(f"Failed to generate seed {seed}")
+        return seed, f"{type(e).__name__}: {e}"
+    return seed, None
+
+
+def generate_batch(args: argparse.Namespace) -> list[tuple[int, str | None]]:
+    """
+    Generate args.batch multiworlds from the same player files, using args.seed and seeds derived from it.
+
+    The worlds of the games the player files can roll are imported before forking the worker processes, so every seed
+    shares the imported modules copy-on-write instead of importing them again, even when worlds are imported lazily.
+    Each worker is forked for a single seed, which is rolled and generated like a regular Generate.py run and written to
+    output_path as soon as it is done.
+    On platforms that can't fork, the seeds are generated one after another in this process.
+
+    :return: each seed and its error, or None if it generated successfully, in the order they finished
+    """
+    import multiprocessing
+
+    seed = get_seed(args.seed)
+    seed_random = random.Random(seed)
+    seeds = [seed] + [seed_random.randint(0, pow(10, seeddigits) - 1) for _ in range(args.batch - 1)]
+    Utils.init_logging(f"Generate_Batch_{seed}", loglevel=args.log_level, add_timestamp=args.log_time)
+    import worlds  # noqa: F401  # import before forking, so that workers share it
+    import_rolled_worlds(_read_batch_yamls(args))
+
+    processes = min(args.batch_processes or os.cpu_count() or 1, len(seeds))
+    logging.info(f"Generating {len(seeds)} seeds in {processes} process{'es' if processes > 1 else ''}.")
+    results: list[tuple[int, str | None]] = []
+    if "fork" in multiprocessing.get_all_start_methods():
+        with multiprocessing.get_context("fork").Pool(processes, maxtasksperchild=1) as pool:
+            for seed, error in pool.imap_unordered(functools.partial(_generate_batch_seed, args), seeds):
+                results.append((seed, error))
+                logging.info(f"Finished {len(results)}/{len(seeds)} seeds, seed {seed} "
+                             f"{'failed: ' + error if error else 'succeeded'}.")
+    else:
+        logging.warning("Batch generation can't fork on this platform, generating seeds one after another.")
+        for seed in seeds:
+            results.append(_generate_batch_seed(args, seed))
+
+    failed = [seed for seed, error in results if error]
+    logging.info(f"Generated {len(results) - len(failed)}/{len(results)} seeds successfully."
+                 + (f" Failed seeds: {', '.join(map(str, failed))}" if failed else ""))
+    return results
+
+
+def _read_batch_yamls(args: argparse.Namespace) -> list[Any]:
+    """Read the yamls of the weights and player files, skipping invalid files, which each seed of the batch reports."""
+    paths = {os.path.join(args.player_files_path, file.name) for file in os.scandir(args.player_files_path)
+             if file.is_file() and not file.name.startswith(".") and not file.name.lower().endswith(".ini")}
+    if args.weights_file_path and os.path.exists(args.weights_file_path):
+        paths.add(args.weights_file_path)
+    yamls: list[Any] = []
+    for path in sorted(paths):
+        try:
+            yamls.extend(yaml for yaml in read_weights_yamls(path, not args.skip_yaml_cache) if isinstance(yaml, dict))
+        except Exception:
+            continue
+    return yamls
+
+
+def map_in_processes(function, items: list, processes: int) -> list:
+    """
+    Apply function to each of items, in up to processes forked processes if more than 1, else in this process.
+
+    :return: the results in the order of items
+    """
+    import multiprocessing
+
+    if processes > 1 and len(items) > 1 and not multiprocessing.current_process().daemon:
+        if "fork" in multiprocessing.get_all_start_methods():
+            with multiprocessing.get_context("fork").Pool(min(processes, len(items))) as pool:
+                return pool.map(function, items)
+        logging.warning("Can't fork on this platform, reading player files in this process.")
+    return [function(item) for item in items]
+
+
+def _read_player_yamls(path: str, use_cache: bool) -> tuple[tuple[Any, ...] | None, str | None]:
+    """Read the yaml documents of a player file, or None and the error if it is invalid."""
+    try:
+        return read_weights_yamls(path, use_cache), None
+    except Exception as e:
+        logging.exception(f"Exception reading weights in file {os.path.basename(path)}")
+        return None, Utils.get_all_causes(e)
+
+
+def _roll_settings_seeded(task: tuple[dict, PlandoOptions, str, str]) -> tuple[argparse.Namespace | None, str | None]:
+    """Roll settings with random seeded by the task, or None and the error if the weights are invalid."""
+    weights, plando_options, seed, description = task
+    random.seed(seed)
+    try:
+        return roll_settings(weights, plando_options), None
+    except Exception as e:
+        logging.exception(f"Exception reading settings in {description}")
+        return None, Utils.get_all_causes(e)
+
+
+def import_rolled_worlds(yamls: Iterable[Any]) -> None:
+    """Import the worlds of the games yamls could roll, so processes forked to roll them don't each import them."""
+    from worlds.AutoWorld import AutoWorldRegister
+
+    games: set[str] = set()
+    for yaml in yamls:
+        game = yaml.get("game")
+        if isinstance(game, str):
+            games.add(game)
+        elif isinstance(game, list):
+            games.update(name for name in game if isinstance(name, str))
+        elif isinstance(game, dict):
+            games.update(name for name, weight in game.items() if isinstance(name, str) and weight)
+    for game in sorted(games):
+        AutoWorldRegister.world_types.get(game)
+
+
+def read_weights_yamls(path, use_cache: bool = False) -> tuple[Any, ...]:
+    """Read all yaml documents of the file or url at path, from the yaml parse cache if use_cache and parsed before."""
     try:
         if urllib.parse.urlparse(path).scheme in ('https', 'file'):
             yaml = str(urllib.request.urlopen(path).read(), "utf-8-sig")
@@ -300,7 +482,7 @@ def read_weights_yamls(path) -> tuple[Any, ...]:
 
     from yaml.error import MarkedYAMLError
     try:
-        return tuple(parse_yamls(yaml))
+        return parse_yamls_cached(yaml, use_cache)
     except MarkedYAMLError as ex:
         if ex.problem_mark:
             lines = yaml.splitlines()
@@ -649,7 +831,16 @@ def roll_alttp_settings(ret: argparse.Namespace, weights):
 if __name__ == '__main__':
     import atexit
     confirmation = atexit.register(input, "Press enter to close.")
-    erargs, seed = main()
+    if "worlds" in sys.modules:
+        raise Exception("Worlds system should not be loaded before logging init.")
+    # only import the worlds of the rolled games, unless overridden
+    os.environ.setdefault("AP_LAZY_WORLDS", "1")
+    args = mystery_argparse()
+    if args.batch > 1:
+        batch_results = generate_batch(args)
+        atexit.unregister(confirmation)
+        sys.exit(1 if any(error for _, error in batch_results) else 0)
+    erargs, seed = main(args)
     from Main import main as ERmain
     multiworld = ERmain(erargs, seed)
     if __debug__:
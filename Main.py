@@ -13,17 +13,49 @@ import worlds
 from BaseClasses import CollectionState, Item, Location, LocationProgressType, MultiWorld
 from Fill import FillError, balance_multiworld_progression, distribute_items_restrictive, flood_items, \
     parse_planned_blocks, distribute_planned_blocks, resolve_early_locations_for_planned
+from generation_profile import GenerationProfile
 from NetUtils import convert_to_base_types
 from Options import StartInventoryPool
 from Utils import __version__, output_path, restricted_dumps, version_tuple
 from settings import get_settings
 from worlds import AutoWorld
+from worlds.generic import Rules
 from worlds.generic.Rules import exclusion_rules, locality_rules
 
 __all__ = ["main"]
 
 
 def main(args, seed=None, baked_server_options: dict[str, object] | None = None):
+    if not args.profile_report and not args.profile_rules:
+        return _main(args, seed, baked_server_options)
+
+    multiworld: MultiWorld | None = None
+    rule_statistics = Rules.RuleStatistics() if args.profile_rules else None
+    Rules.rule_statistics = rule_statistics
+    # the profile reads the access rules from the same statistics
+    profile = GenerationProfile(rule_statistics=rule_statistics) if args.profile_report else None
+    if profile:
+        profile.start()
+    try:
+        multiworld = _main(args, seed, baked_server_options)
+    finally:
+        # also write the reports if generation failed, a failing generation can take just as long
+        if profile:
+            profile.stop()
+        Rules.rule_statistics = None
+        if rule_statistics:
+            rule_statistics.log_summary()
+            folded_path = output_path(f"AP_{multiworld.seed_name if multiworld else args.outputname}_Rules.folded")
+            with open(folded_path, "w", encoding="utf-8") as f:
+                f.write("\n".join(rule_statistics.get_folded_stacks()))
+            logging.info(f"Wrote access rule self times as folded stacks to {folded_path}.")
+        if profile:
+            profile.write(args.profile_report, multiworld)
+            logging.info(f"Wrote generation profile to {args.profile_report}.")
+    return multiworld
+
+
+def _main(args, seed=None, baked_server_options: dict[str, object] | None = None):
     if not baked_server_options:
         baked_server_options = get_settings().server_options.as_dict()
     assert isinstance(baked_server_options, dict)
@@ -51,16 +83,17 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
     multiworld.state = CollectionState(multiworld)
     logger.info('Archipelago Version %s  -  Seed: %s\n', __version__, multiworld.seed)
 
-    logger.info(f"Found {len(AutoWorld.AutoWorldRegister.world_types)} World Types:")
-    longest_name = max(len(text) for text in AutoWorld.AutoWorldRegister.world_types)
+    world_types = worlds.get_loaded_world_types()  # only the imported ones when worlds are loaded lazily
+    logger.info(f"Found {len(world_types)} World Types:")
+    longest_name = max(len(text) for text in world_types)
 
-    world_classes = AutoWorld.AutoWorldRegister.world_types.values()
+    world_classes = world_types.values()
 
     version_count = max(len(cls.world_version.as_simple_string()) for cls in world_classes)
     item_count = len(str(max(len(cls.item_names) for cls in world_classes)))
     location_count = len(str(max(len(cls.location_names) for cls in world_classes)))
 
-    for name, cls in AutoWorld.AutoWorldRegister.world_types.items():
+    for name, cls in world_types.items():
         if not cls.hidden and len(cls.item_names) > 0:
             logger.info(f" {name:{longest_name}}: "
                         f"v{cls.world_version.as_simple_string():{version_count}} | "
@@ -189,6 +222,10 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
     distribute_planned_blocks(multiworld, [x for player in multiworld.plando_item_blocks
                                            for x in multiworld.plando_item_blocks[player]])
 
+    if Rules.rule_statistics:
+        # also count the rules that worlds assigned without set_rule or add_rule
+        Rules.rule_statistics.wrap_remaining(multiworld)
+
     logger.info('Running Pre Main Fill.')
 
     AutoWorld.call_all(multiworld, "pre_fill")
@@ -230,8 +267,19 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
     with output as temp_dir:
         output_players = [player for player in multiworld.player_ids if AutoWorld.World.generate_output.__code__
                           is not multiworld.worlds[player].generate_output.__code__]
+        sphere_processes: int = args.sphere_processes
+        sendable_spheres: list[set[Location]] | None = None
+        if sphere_processes > 1:
+            # forking while other threads hold locks can deadlock the worker processes,
+            # so calculate the spheres before any output threads are started
+            accessibility_fulfilled = multiworld.fulfills_accessibility(processes=sphere_processes)
+            sendable_spheres = list(multiworld.get_sendable_spheres(sphere_processes))
         with concurrent.futures.ThreadPoolExecutor(len(output_players) + 2) as pool:
-            check_accessibility_task = pool.submit(multiworld.fulfills_accessibility)
+            if sphere_processes > 1:
+                check_accessibility_task = concurrent.futures.Future()
+                check_accessibility_task.set_result(accessibility_fulfilled)
+            else:
+                check_accessibility_task = pool.submit(multiworld.fulfills_accessibility)
 
             output_file_futures = [pool.submit(AutoWorld.call_stage, multiworld, "generate_output", temp_dir)]
             for player in output_players:
@@ -318,7 +366,7 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
 
                 # get spheres -> filter address==None -> skip empty
                 spheres: list[dict[int, set[int]]] = []
-                for sphere in multiworld.get_sendable_spheres():
+                for sphere in multiworld.get_sendable_spheres() if sendable_spheres is None else sendable_spheres:
                     current_sphere: dict[int, set[int]] = collections.defaultdict(set)
                     for sphere_location in sphere:
                         current_sphere[sphere_location.player].add(sphere_location.address)
@@ -13,12 +13,15 @@ import itertools
 import logging
 import math
 import operator
+import os
 import pickle
 import random
 import shlex
+import sys
 import threading
 import time
 import typing
+import uuid
 import weakref
 import zlib
 
@@ -212,6 +215,331 @@ class Client(Endpoint):
 team_slot = typing.Tuple[int, int]
 
 
+class OutboundStats:
+    """Counters of the messages sent by the server and the CPU time spent handling location checks."""
+    start_time: float
+    frames: int
+    """websocket messages sent, counting each recipient of a broadcast"""
+    batched_messages: int
+    """ReceivedItems and RoomUpdate messages sent in batched frames, counting each recipient"""
+    batch_encodes: int
+    """batched frames encoded, each sent to every client of a slot that is at the same items index"""
+    location_checks: int
+    check_time: float
+    """process time spent in register_location_checks"""
+
+    def __init__(self) -> None:
+        self.start_time = time.monotonic()
+        self.frames = self.batched_messages = self.batch_encodes = self.location_checks = 0
+        self.check_time = 0.
+
+    def as_dict(self) -> typing.Dict[str, float]:
+        uptime = max(time.monotonic() - self.start_time, 1e-9)
+        return {
+            "uptime": uptime,
+            "frames": self.frames,
+            "frames_per_second": self.frames / uptime,
+            "batched_messages": self.batched_messages,
+            "batch_encodes": self.batch_encodes,
+            "location_checks": self.location_checks,
+            "cpu_per_check": self.check_time / self.location_checks if self.location_checks else 0.,
+        }
+
+    def __str__(self) -> str:
+        stats = self.as_dict()
+        return (f"{stats['frames']} messages sent in {stats['uptime']:.0f} seconds "
+                f"({stats['frames_per_second']:.2f}/s), {stats['batched_messages']} batched into "
+                f"{stats['batch_encodes']} encodes. {stats['location_checks']} location checks "
+                f"using {stats['cpu_per_check'] * 1000:.3f}ms CPU each.")
+
+
+class NameTable(typing.Dict[int, str]):
+    """ID to name lookup table that names unknown IDs without storing them, so looking them up never modifies it."""
+    __slots__ = ("unknown_name",)
+
+    unknown_name: str
+    """format string for the name of an unknown ID"""
+
+    def __init__(self, unknown_name: str) -> None:
+        super().__init__()
+        self.unknown_name = unknown_name
+
+    def __missing__(self, key: int) -> str:
+        return self.unknown_name.format(key)
+
+
+class GameNameTables:
+    """
+    Name lookup tables of a game, derived from its data package and groups. Tables of packages with a checksum are
+    interned, so all rooms hosted by a process share them. They must not be modified.
+    """
+    __slots__ = ("key", "item_names", "location_names", "all_item_and_group_names", "all_location_and_group_names",
+                 "__weakref__")
+
+    key: typing.Optional[typing.Tuple[str, str, str]]
+    """(game, checksum, Archipelago's checksum) if interned"""
+    item_names: typing.Dict[int, str]
+    location_names: typing.Dict[int, str]
+    all_item_and_group_names: typing.FrozenSet[str]
+    all_location_and_group_names: typing.FrozenSet[str]
+
+    def __init__(self, key: typing.Optional[typing.Tuple[str, str, str]], game_package: typing.Mapping[str, typing.Any],
+                 item_name_groups: typing.Mapping[str, typing.Any],
+                 location_name_groups: typing.Mapping[str, typing.Any],
+                 archipelago_package: typing.Mapping[str, typing.Any]) -> None:
+        self.key = key
+        self.item_names = NameTable("Unknown item (ID:{})")
+        self.location_names = NameTable("Unknown location (ID:{})")
+        for item_name, item_id in game_package["item_name_to_id"].items():
+            self.item_names[item_id] = item_name
+        for location_name, location_id in game_package["location_name_to_id"].items():
+            self.location_names[location_id] = location_name
+        # Add Archipelago items and locations to each data package.
+        for item_name, item_id in archipelago_package.get("item_name_to_id", {}).items():
+            self.item_names[item_id] = item_name
+        for location_name, location_id in archipelago_package.get("location_name_to_id", {}).items():
+            self.location_names[location_id] = location_name
+        self.all_item_and_group_names = frozenset(game_package["item_name_to_id"]) | frozenset(item_name_groups)
+        self.all_location_and_group_names = \
+            frozenset(game_package["location_name_to_id"]) | frozenset(location_name_groups)
+
+
+_interned_game_name_tables: weakref.WeakValueDictionary[typing.Tuple[str, str, str], GameNameTables] = \
+    weakref.WeakValueDictionary()
+
+
+def get_game_name_tables(game: str, game_package: typing.Mapping[str, typing.Any],
+                         item_name_groups: typing.Mapping[str, typing.Any],
+                         location_name_groups: typing.Mapping[str, typing.Any],
+                         archipelago_package: typing.Mapping[str, typing.Any]) -> GameNameTables:
+    """Get the name lookup tables of a game, shared with the other rooms using the same data packages if possible."""
+    if game == "Archipelago":
+        archipelago_package = {}  # already part of its own package
+    if "checksum" not in game_package or (archipelago_package and "checksum" not in archipelago_package):
+        return GameNameTables(None, game_package, item_name_groups, location_name_groups, archipelago_package)
+    key = (game, game_package["checksum"], archipelago_package.get("checksum", ""))
+    tables = _interned_game_name_tables.get(key)
+    if not tables:
+        tables = GameNameTables(key, game_package, item_name_groups, location_name_groups, archipelago_package)
+        _interned_game_name_tables[key] = tables
+    return tables
+
+
+def get_memory_usage(obj: typing.Any, exclude: typing.Set[int]) -> int:
+    """
+    Approximate the memory used by obj and the builtin containers and NamedTuples it references, not counting objects
+    whose id is in exclude. Objects counted are added to exclude.
+    """
+    size = 0
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in exclude:
+            continue
+        exclude.add(id(obj))
+        get_size = getattr(obj, "get_size", None)  # compiled LocationStore
+        if callable(get_size) and not isinstance(obj, type):
+            size += get_size()
+            continue
+        size += sys.getsizeof(obj)
+        if isinstance(obj, GameNameTables):
+            stack.extend((obj.item_names, obj.location_names, obj.all_item_and_group_names,
+                          obj.all_location_and_group_names))
+        elif isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset, collections.deque)):
+            stack.extend(obj)
+    return size
+
+
+class SaveJournal:
+    """
+    Append-only log of the changes to a savegame since its last base snapshot.
+
+    Rewriting the whole savegame takes time proportional to everything that happened in the room, so instead each save
+    appends a frame holding only what changed since the previous one: new received items and location checks, changed
+    hints, data storage keys that were set and the small remainder of the savegame. Loading replays the frames onto the
+    snapshot. Replaying a change that is already part of the snapshot has no effect, so changes made while a snapshot is
+    being written are never lost. Once the journal is larger than its snapshot, a new snapshot is written instead.
+    """
+    minimum_compaction_size: typing.ClassVar[int] = 1024 * 1024
+    """Size in bytes the journal may grow to before being compacted, even if its snapshot is smaller."""
+
+    snapshot_path: str
+    path: str
+    journal_id: str
+    size: int
+    snapshot_size: int
+    received_item_counts: typing.Dict[typing.Tuple[int, int, bool], int]
+    location_checks: typing.Dict[team_slot, typing.FrozenSet[int]]
+    hint_slots: typing.Deque[team_slot]
+    """slots whose hints changed since the last save, appended to by the server while the saving thread consumes them"""
+    stored_data_keys: typing.Deque[str]
+    """data storage keys set since the last save, appended to by the server while the saving thread consumes them"""
+    lock: threading.Lock
+
+    def __init__(self, snapshot_path: str) -> None:
+        self.snapshot_path = snapshot_path
+        self.path = snapshot_path + ".journal"
+        self.journal_id = ""
+        self.size = self.snapshot_size = 0
+        self.received_item_counts = {}
+        self.location_checks = {}
+        self.hint_slots = collections.deque()
+        self.stored_data_keys = collections.deque()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def encode_frame(data: typing.Any) -> bytes:
+        encoded = zlib.compress(pickle.dumps(data))
+        return len(encoded).to_bytes(4, "little") + encoded
+
+    @staticmethod
+    def decode_frames(journal: bytes) -> typing.Iterator[typing.Any]:
+        position = 0
+        while position + 4 <= len(journal):
+            size = int.from_bytes(journal[position:position + 4], "little")
+            position += 4
+            if position + size > len(journal):
+                break
+            yield restricted_loads(zlib.decompress(journal[position:position + size]))
+            position += size
+        if position != len(journal):
+            raise EOFError("Journal ends with an incomplete frame.")
+
+    @staticmethod
+    def replay(save_data: typing.Dict[str, typing.Any],
+               records: typing.Iterable[typing.Tuple[typing.Any, ...]]) -> None:
+        for record in records:
+            kind = record[0]
+            if kind == "received_items":
+                _, key, start, items = record
+                received_items = save_data["received_items"].setdefault(key, [])
+                received_items[start:start + len(items)] = items
+            elif kind == "location_checks":
+                _, key, locations = record
+                save_data["location_checks"].setdefault(key, set()).update(locations)
+            elif kind == "hints":
+                _, key, hints = record
+                save_data["hints"][key] = set(hints)
+            elif kind == "stored_data":
+                _, key, value = record
+                save_data["stored_data"][key] = value
+            elif kind == "save":
+                save_data.update(record[1])
+            else:
+                raise ValueError(f"Unknown journal record {kind}.")
+
+    def load(self, logger: logging.Logger) -> typing.Dict[str, typing.Any]:
+        """Read the snapshot and replay the journal belonging to it onto it."""
+        with open(self.snapshot_path, "rb") as f:
+            save_data = restricted_loads(zlib.decompress(f.read()))
+        journal_id = save_data.pop("journal_id", None)
+        if not journal_id:
+            return save_data
+        try:
+            with open(self.path, "rb") as f:
+                frames = self.decode_frames(f.read())
+        except FileNotFoundError:
+            return save_data
+        replayed = 0
+        try:
+            if next(frames, None) != ("journal", journal_id):
+                logger.warning("Ignoring save journal that does not belong to the savegame.")
+                return save_data
+            for records in frames:
+                self.replay(save_data, records)
+                replayed += 1
+        except EOFError:
+            # a frame that was cut off while being written only loses the changes since the save before it
+            logger.warning("Save journal ends with an incomplete save, which was skipped.")
+        logger.info(f"Replayed {replayed} journaled saves.")
+        return save_data
+
+    def needs_snapshot(self) -> bool:
+        return not self.journal_id or self.size > max(self.snapshot_size, self.minimum_compaction_size)
+
+    def set_hints(self, team: int, slot: int) -> None:
+        self.hint_slots.append((team, slot))
+
+    def set_stored_data(self, key: str) -> None:
+        self.stored_data_keys.append(key)
+
+    @staticmethod
+    def _write_file(path: str, data: bytes) -> None:
+        # write next to the file and then replace it, so that a crash can't leave a partially written file behind
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+    def write_snapshot(self, ctx: Context) -> None:
+        """Write the whole savegame as a new snapshot and start an empty journal for it."""
+        with self.lock:
+            self.hint_slots.clear()
+            self.stored_data_keys.clear()
+            save_data = ctx.get_save()
+            # anything changing after this point is either part of the snapshot or journaled again, which is harmless
+            self.received_item_counts = {key: len(items) for key, items in list(save_data["received_items"].items())}
+            self.location_checks = {key: frozenset(checks) for key, checks in save_data["location_checks"].items()}
+            journal_id = uuid.uuid4().hex
+            save_data["journal_id"] = journal_id
+            # Does not use Utils.restricted_dumps because we'd rather make a save than not make one
+            snapshot = zlib.compress(pickle.dumps(save_data))
+            header = self.encode_frame(("journal", journal_id))
+            self._write_file(self.snapshot_path, snapshot)
+            self._write_file(self.path, header)
+            self.journal_id = journal_id
+            self.snapshot_size = len(snapshot)
+            self.size = len(header)
+
+    def append(self, ctx: Context) -> None:
+        """Append the changes since the last save to the journal."""
+        with self.lock:
+            records: typing.List[typing.Tuple[typing.Any, ...]] = []
+
+            received_item_counts: typing.Dict[typing.Tuple[int, int, bool], int] = {}
+            for key, items in list(ctx.received_items.items()):
+                count = self.received_item_counts.get(key, 0)
+                if len(items) > count:
+                    new_items = items[count:]
+                    records.append(("received_items", key, count, new_items))
+                    received_item_counts[key] = count + len(new_items)
+
+            location_checks: typing.Dict[team_slot, typing.FrozenSet[int]] = {}
+            for key, checks in list(ctx.location_checks.items()):
+                journaled_checks = self.location_checks.get(key, frozenset())
+                # checks are never removed, so only slots with more checks than journaled need to be compared
+                if len(checks) > len(journaled_checks):
+                    new_checks = checks - journaled_checks
+                    records.append(("location_checks", key, new_checks))
+                    location_checks[key] = journaled_checks | new_checks
+
+            hint_slots: typing.Set[team_slot] = set()
+            while self.hint_slots:
+                hint_slots.add(self.hint_slots.popleft())
+            records.extend(("hints", key, frozenset(ctx.hints.get(key, ()))) for key in hint_slots)
+
+            stored_data_keys: typing.Set[str] = set()
+            while self.stored_data_keys:
+                stored_data_keys.add(self.stored_data_keys.popleft())
+            records.extend(("stored_data", key, ctx.stored_data[key]) for key in stored_data_keys)
+
+            records.append(("save", ctx.get_save_remainder()))
+            try:
+                frame = self.encode_frame(records)
+                with open(self.path, "ab") as f:
+                    f.write(frame)
+            except BaseException:
+                self.hint_slots.extend(hint_slots)
+                self.stored_data_keys.extend(stored_data_keys)
+                raise
+            self.size += len(frame)
+            self.received_item_counts.update(received_item_counts)
+            self.location_checks.update(location_checks)
+
+
 class Context:
     dumper = staticmethod(encode)
     loader = staticmethod(decode)
@@ -232,9 +560,12 @@ class Context:
     locations: LocationStore  # typing.Dict[int, typing.Dict[int, typing.Tuple[int, int, int]]]
     location_checks: typing.Dict[typing.Tuple[int, int], typing.Set[int]]
     hints_used: typing.Dict[typing.Tuple[int, int], int]
+    hints_by_location: typing.Dict[typing.Tuple[int, int, int], Hint]
+    """(team, finding_player, location) -> the hint for that location, shared by the hint sets of all its players"""
     groups: typing.Dict[int, typing.Set[int]]
     save_version = 2
     stored_data: typing.Dict[str, object]
+    save_journal: typing.Optional[SaveJournal]
     read_data: typing.Dict[str, object]
     stored_data_notification_clients: typing.Dict[str, typing.Set[Client]]
     slot_info: typing.Dict[int, NetworkSlot]
@@ -244,8 +575,11 @@ class Context:
     item_name_groups: typing.Dict[str, typing.Dict[str, typing.Set[str]]]
     location_names: typing.Dict[str, typing.Dict[int, str]]
     location_name_groups: typing.Dict[str, typing.Dict[str, typing.Set[str]]]
-    all_item_and_group_names: typing.Dict[str, typing.Set[str]]
-    all_location_and_group_names: typing.Dict[str, typing.Set[str]]
+    all_item_and_group_names: typing.Dict[str, typing.AbstractSet[str]]
+    all_location_and_group_names: typing.Dict[str, typing.AbstractSet[str]]
+    game_name_tables: typing.Dict[str, GameNameTables]
+    multidata_games: typing.Set[str]
+    """games using the data package embedded in this room's multidata"""
     non_hintable_names: typing.Dict[str, typing.AbstractSet[str]]
     spheres: typing.List[typing.Dict[int, typing.Set[int]]]
     """ each sphere is { player: { location_id, ... } } """
@@ -284,6 +618,7 @@ class Context:
         self.location_check_points = location_check_points
         self.hints_used = collections.defaultdict(int)
         self.hints: typing.Dict[team_slot, typing.Set[Hint]] = collections.defaultdict(set)
+        self.hints_by_location = {}
         self.release_mode: str = release_mode
         self.remaining_mode: str = remaining_mode
         self.collect_mode: str = collect_mode
@@ -302,7 +637,13 @@ class Context:
         self.client_ids: typing.Dict[typing.Tuple[int, int], datetime.datetime] = {}
         self.auto_save_interval = 60  # in seconds
         self.auto_saver_thread: typing.Optional[threading.Thread] = None
+        self.save_journal = None
         self.save_dirty = False
+        self.dirty_item_slots: typing.Set[team_slot] = set()
+        self.pending_room_updates: typing.Dict[team_slot, typing.Dict[str, typing.Any]] = {}
+        self.pending_hint_points: typing.Set[team_slot] = set()
+        self.outbound_scheduled = False
+        self.outbound_stats = OutboundStats()
         self.tags = ['AP']
         self.games: typing.Dict[int, str] = {}
         self.minimum_client_versions: typing.Dict[int, Version] = {}
@@ -322,6 +663,8 @@ class Context:
         self.location_name_groups = {}
         self.all_item_and_group_names = {}
         self.all_location_and_group_names = {}
+        self.game_name_tables = {}
+        self.multidata_games = set()
         self.item_names = collections.defaultdict(
             lambda: Utils.KeyedDefaultDict(lambda code: f'Unknown item (ID:{code})'))
         self.location_names = collections.defaultdict(
@@ -333,6 +676,10 @@ class Context:
     # Data package retrieval
     def _load_game_data(self):
         import worlds
+        if worlds.lazy_load:
+            # only the worlds of the room's games are imported, by _load_room_worlds
+            self.gamespackage = {}
+            return
         self.gamespackage = worlds.network_data_package["games"]
 
         self.item_name_groups = {world_name: world.item_name_groups for world_name, world in
@@ -343,29 +690,59 @@ class Context:
             self.non_hintable_names[world_name] = world.hint_blacklist
 
         for game_package in self.gamespackage.values():
-            # remove groups from data sent to clients
-            del game_package["item_name_groups"]
-            del game_package["location_name_groups"]
+            # remove groups from data sent to clients, which a previous context may have done already
+            game_package.pop("item_name_groups", None)
+            game_package.pop("location_name_groups", None)
+
+    def _load_room_worlds(self, game_names: typing.Iterable[str]) -> None:
+        """When worlds are loaded lazily, import the installed worlds of game_names and load their game data."""
+        import worlds
+        if not worlds.lazy_load:
+            return
+        world_types = worlds.AutoWorldRegister.world_types
+        for world_name in sorted(game_names):
+            world = world_types.get(world_name)
+            if not world or world_name in self.gamespackage:
+                continue
+            game_package = worlds.network_data_package["games"][world_name]
+            game_package.pop("item_name_groups", None)
+            game_package.pop("location_name_groups", None)
+            self.gamespackage[world_name] = game_package
+            self.item_name_groups[world_name] = world.item_name_groups
+            self.location_name_groups[world_name] = world.location_name_groups
+            self.non_hintable_names[world_name] = world.hint_blacklist
 
     def _init_game_data(self):
+        archipelago_package = self.gamespackage.get("Archipelago", {})
         for game_name, game_package in self.gamespackage.items():
             if "checksum" in game_package:
                 self.checksums[game_name] = game_package["checksum"]
-            for item_name, item_id in game_package["item_name_to_id"].items():
-                self.item_names[game_name][item_id] = item_name
-            for location_name, location_id in game_package["location_name_to_id"].items():
-                self.location_names[game_name][location_id] = location_name
-            self.all_item_and_group_names[game_name] = \
-                set(game_package["item_name_to_id"]) | set(self.item_name_groups[game_name])
-            self.all_location_and_group_names[game_name] = \
-                set(game_package["location_name_to_id"]) | set(self.location_name_groups.get(game_name, []))
-
-        archipelago_item_names = self.item_names["Archipelago"]
-        archipelago_location_names = self.location_names["Archipelago"]
-        for game in [game_name for game_name in self.gamespackage if game_name != "Archipelago"]:
-            # Add Archipelago items and locations to each data package.
-            self.item_names[game].update(archipelago_item_names)
-            self.location_names[game].update(archipelago_location_names)
+            tables = get_game_name_tables(game_name, game_package, self.item_name_groups[game_name],
+                                          self.location_name_groups.get(game_name, {}), archipelago_package)
+            self.game_name_tables[game_name] = tables
+            self.item_names[game_name] = tables.item_names
+            self.location_names[game_name] = tables.location_names
+            self.all_item_and_group_names[game_name] = tables.all_item_and_group_names
+            self.all_location_and_group_names[game_name] = tables.all_location_and_group_names
+
+    def get_shared_data(self) -> typing.Iterator[typing.Any]:
+        """Objects shared with the other rooms hosted by the same process."""
+        for game_name, tables in self.game_name_tables.items():
+            if tables.key:
+                yield from (tables, tables.item_names, tables.location_names, tables.all_item_and_group_names,
+                            tables.all_location_and_group_names)
+            if game_name not in self.multidata_games:
+                yield self.gamespackage[game_name]
+                yield self.item_name_groups.get(game_name)
+                yield self.location_name_groups.get(game_name)
+        yield from self.non_hintable_names.values()
+
+    def get_memory_usage(self) -> typing.Dict[str, int]:
+        """Approximate memory in bytes used by each attribute of this room, not counting data shared with other rooms
+        or objects counted for a previous attribute."""
+        exclude = set(map(id, self.get_shared_data()))
+        exclude.add(id(self))
+        return {name: get_memory_usage(value, exclude) for name, value in vars(self).items()}
 
     def item_names_for_game(self, game: str) -> typing.Optional[typing.Dict[str, int]]:
         return self.gamespackage[game]["item_name_to_id"] if game in self.gamespackage else None
@@ -385,6 +762,7 @@ class Context:
             await self.disconnect(endpoint)
             return False
         else:
+            self.outbound_stats.frames += 1
             if self.log_network:
                 self.logger.info(f"Outgoing message: {msg}")
             return True
@@ -399,6 +777,7 @@ class Context:
             await self.disconnect(endpoint)
             return False
         else:
+            self.outbound_stats.frames += 1
             if self.log_network:
                 self.logger.info(f"Outgoing message: {msg}")
             return True
@@ -414,6 +793,7 @@ class Context:
             self.logger.exception("Exception during broadcast_send_encoded_msgs")
             return False
         else:
+            self.outbound_stats.frames += len(sockets)
             if self.log_network:
                 self.logger.info(f"Outgoing broadcast: {msg}")
             return True
@@ -446,6 +826,69 @@ class Context:
         msgs = self.dumper(msgs)
         async_start(self.broadcast_send_encoded_msgs(endpoints, msgs))
 
+    def queue_room_update(self, team: int, slot: int, checked_locations: typing.Iterable[int],
+                          hint_points: bool = False) -> None:
+        """Queue a RoomUpdate for the clients of a slot, merged with the other updates of this event loop tick.
+        If hint_points, the update includes the slot's hint points as of when it is sent."""
+        room_update = self.pending_room_updates.setdefault((team, slot), {"cmd": "RoomUpdate",
+                                                                          "checked_locations": set()})
+        room_update["checked_locations"].update(checked_locations)
+        if hint_points:
+            self.pending_hint_points.add((team, slot))
+        self.schedule_outbound()
+
+    def schedule_outbound(self) -> None:
+        """Send new items and queued room updates once the current event loop tick is done."""
+        if self.outbound_scheduled:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush_outbound()  # nothing to batch with outside the event loop
+        else:
+            self.outbound_scheduled = True
+            loop.call_soon(self.flush_outbound)
+
+    def flush_outbound(self) -> None:
+        """Send every client of a slot with new items or a queued room update one batched frame,
+        encoding it once for all clients of that slot that are at the same items index."""
+        self.outbound_scheduled = False
+        room_updates = self.pending_room_updates
+        hint_points = self.pending_hint_points
+        dirty_slots = self.dirty_item_slots | room_updates.keys()
+        self.pending_room_updates = {}
+        self.pending_hint_points = set()
+        self.dirty_item_slots = set()
+        for team, slot in dirty_slots:
+            room_update = room_updates.get((team, slot))
+            if (team, slot) in hint_points:
+                room_update["hint_points"] = get_slot_points(self, team, slot)
+            batches: typing.Dict[typing.Tuple[typing.Any, ...], typing.List[Client]] = {}
+            for client in self.clients.get(team, {}).get(slot, ()):
+                key: typing.Tuple[typing.Any, ...] = ()
+                if not client.no_items:
+                    start_inventory = get_start_inventory(self, slot, client.remote_start_inventory)
+                    items = get_received_items(self, team, slot, client.remote_items)
+                    if len(start_inventory) + len(items) > client.send_index:
+                        key = (client.send_index, client.remote_items, client.remote_start_inventory)
+                        client.send_index = len(start_inventory) + len(items)
+                if key or room_update:
+                    batches.setdefault(key, []).append(client)
+            for key, clients in batches.items():
+                msgs: typing.List[typing.Dict[str, typing.Any]] = []
+                if key:
+                    send_index, remote_items, remote_start_inventory = key
+                    start_inventory = get_start_inventory(self, slot, remote_start_inventory)
+                    items = get_received_items(self, team, slot, remote_items)
+                    first_new_item = max(0, send_index - len(start_inventory))
+                    msgs.append({"cmd": "ReceivedItems", "index": send_index,
+                                 "items": start_inventory[send_index:] + items[first_new_item:]})
+                if room_update:
+                    msgs.append(room_update)
+                self.outbound_stats.batch_encodes += 1
+                self.outbound_stats.batched_messages += len(msgs) * len(clients)
+                async_start(self.broadcast_send_encoded_msgs(clients, self.dumper(msgs)))
+
     async def disconnect(self, endpoint: Client):
         if endpoint in self.endpoints:
             self.endpoints.remove(endpoint)
@@ -546,6 +989,7 @@ class Context:
 
         for slot, hints in decoded_obj["precollected_hints"].items():
             self.hints[0, slot].update(hints)
+        self.index_hints()
 
         # declare slots that aren't players as done
         for slot, slot_info in self.slot_info.items():
@@ -557,17 +1001,21 @@ class Context:
             server_options = decoded_obj.get("server_options", {})
             self._set_options(server_options)
 
+        self._load_room_worlds({"Archipelago", *self.games.values()})
+
         # embedded data package
         for game_name, data in decoded_obj.get("datapackage", {}).items():
             if game_name in game_data_packages:
-                data = game_data_packages[game_name]
+                data = game_data_packages[game_name]  # may be shared with other rooms
+            else:
+                self.multidata_games.add(game_name)
             self.logger.info(f"Loading embedded data package for game {game_name}")
-            self.gamespackage[game_name] = data
             self.item_name_groups[game_name] = data["item_name_groups"]
             if "location_name_groups" in data:
                 self.location_name_groups[game_name] = data["location_name_groups"]
-                del data["location_name_groups"]
-            del data["item_name_groups"]  # remove from data package, but keep in self.item_name_groups
+            # remove groups from data package, but keep in self.item_name_groups
+            self.gamespackage[game_name] = {key: value for key, value in data.items()
+                                            if key not in ("item_name_groups", "location_name_groups")}
         self._init_game_data()
         for game_name, data in self.item_name_groups.items():
             self.read_data[f"item_name_groups_{game_name}"] = lambda lgame=game_name: self.item_name_groups[lgame]
@@ -592,32 +1040,44 @@ class Context:
 
     def _save(self, exit_save: bool = False) -> bool:
         try:
-            # Does not use Utils.restricted_dumps because we'd rather make a save than not make one
-            encoded_save = pickle.dumps(self.get_save())
-            with open(self.save_filename, "wb") as f:
-                f.write(zlib.compress(encoded_save))
+            if self.save_journal:
+                # shutting down writes a snapshot, so that the savegame is complete without its journal
+                if exit_save or self.save_journal.needs_snapshot():
+                    self.save_journal.write_snapshot(self)
+                else:
+                    self.save_journal.append(self)
+            else:
+                # Does not use Utils.restricted_dumps because we'd rather make a save than not make one
+                encoded_save = pickle.dumps(self.get_save())
+                with open(self.save_filename, "wb") as f:
+                    f.write(zlib.compress(encoded_save))
         except Exception as e:
             self.logger.exception(e)
             return False
         else:
             return True
 
-    def init_save(self, enabled: bool = True):
+    def init_save(self, enabled: bool = True, journal: bool = False):
+        """
+        :param enabled: load the savegame and keep saving the game
+        :param journal: append changes to a SaveJournal instead of rewriting the whole savegame on every save
+        """
         self.saving = enabled
         if self.saving:
             if not self.save_filename:
-                import os
                 name, ext = os.path.splitext(self.data_filename)
                 self.save_filename = name + '.apsave' if ext.lower() in ('.archipelago', '.zip') \
                     else self.data_filename + '_' + 'apsave'
+            save_journal = SaveJournal(self.save_filename)
             try:
-                with open(self.save_filename, 'rb') as f:
-                    save_data = restricted_loads(zlib.decompress(f.read()))
-                    self.set_save(save_data)
+                # a journal left behind by a previous run is replayed even if journaling is disabled now
+                self.set_save(save_journal.load(self.logger))
             except FileNotFoundError:
                 self.logger.error('No save data found, starting a new game')
             except Exception as e:
                 self.logger.exception(e)
+            if journal:
+                self.save_journal = save_journal
             self._start_async_saving()
 
     def _start_async_saving(self, atexit_save: bool = True):
@@ -651,15 +1111,23 @@ class Context:
                 import atexit
                 atexit.register(self._save, True)  # make sure we save on exit too
 
-    def get_save(self) -> dict:
-        self.recheck_hints()
+    def get_save(self) -> typing.Dict[str, typing.Any]:
+        d = self.get_save_remainder()
+        d.update({
+            "received_items": self.received_items,
+            "hints": dict(self.hints),
+            "location_checks": dict(self.location_checks),
+            "stored_data": self.stored_data,
+        })
+        return d
+
+    def get_save_remainder(self) -> typing.Dict[str, typing.Any]:
+        """The savegame without received items, hints, location checks and data storage, which SaveJournal tracks
+        separately as they grow with everything that happened in the room."""
         d = {
             "version": self.save_version,
             "connect_names": self.connect_names,
-            "received_items": self.received_items,
             "hints_used": dict(self.hints_used),
-            "hints": dict(self.hints),
-            "location_checks": dict(self.location_checks),
             "name_aliases": self.name_aliases,
             "client_game_state": dict(self.client_game_state),
             "client_activity_timers": tuple(
@@ -668,7 +1136,6 @@ class Context:
                 (key, value.timestamp()) for key, value in self.client_connection_timers.items()),
             "random_state": self.random.getstate(),
             "group_collected": dict(self.group_collected),
-            "stored_data": self.stored_data,
             "game_options": {"hint_cost": self.hint_cost, "location_check_points": self.location_check_points,
                              "server_password": self.server_password, "password": self.password,
                              "release_mode": self.release_mode,
@@ -717,6 +1184,9 @@ class Context:
 
         if "stored_data" in savedata:
             self.stored_data = savedata["stored_data"]
+        # location checks keep the hints up to date from here on
+        self.recheck_hints()
+        self.index_hints()
         # count items and slots from lists for items_handling = remote
         self.logger.info(
             f'Loaded save file with {sum([len(v) for k, v in self.received_items.items() if k[2]])} received items '
@@ -746,13 +1216,38 @@ class Context:
                 new_hints.add(new_hint)
                 if hint == new_hint:
                     continue
+                self.hints_by_location[hint_team, new_hint.finding_player, new_hint.location] = new_hint
                 for player in self.slot_set(hint.receiving_player) | {hint.finding_player}:
                     if changed is not None:
                         changed.add((hint_team,player))
+                    if self.save_journal:
+                        self.save_journal.set_hints(hint_team, player)
                     if slot is not None and slot != player:
                         self.replace_hint(hint_team, player, hint, new_hint)
             self.hints[hint_team, hint_slot] = new_hints
 
+    def recheck_location_hints(self, team: int, finding_player: int, locations: typing.Iterable[int],
+                               changed: typing.Optional[typing.Set[team_slot]] = None) -> None:
+        """Refreshes only the hints for the specified locations of the finding player. If a set is passed for
+        'changed', each (team,slot) pair that has at least one hint modified will be added to the set.
+        """
+        for location in locations:
+            hint = self.hints_by_location.get((team, finding_player, location))
+            if not hint:
+                continue
+            new_hint = hint.re_check(self, team)
+            if hint == new_hint:
+                continue
+            for player in self.slot_set(hint.receiving_player) | {hint.finding_player}:
+                self.replace_hint(team, player, hint, new_hint)
+                if changed is not None:
+                    changed.add((team, player))
+
+    def index_hints(self) -> None:
+        """Rebuilds hints_by_location from the hint sets, after they were replaced as a whole."""
+        self.hints_by_location = {(team, hint.finding_player, hint.location): hint
+                                  for (team, _), hints in self.hints.items() for hint in hints}
+
     def get_rechecked_hints(self, team: int, slot: int):
         self.recheck_hints(team, slot)
         return self.hints[team, slot]
@@ -823,6 +1318,7 @@ class Context:
                 # we can check once if hint already exists
                 if hint not in self.hints[team, hint.finding_player]:
                     self.hints[team, hint.finding_player].add(hint)
+                    self.hints_by_location[team, hint.finding_player, hint.location] = hint
                     new_hint_events.add(hint.finding_player)
                     for player in self.slot_set(hint.receiving_player):
                         self.hints[team, player].add(hint)
@@ -841,15 +1337,14 @@ class Context:
                     async_start(self.send_msgs(client, client_hints))
 
     def get_hint(self, team: int, finding_player: int, seeked_location: int) -> typing.Optional[Hint]:
-        for hint in self.hints[team, finding_player]:
-            if hint.location == seeked_location and hint.finding_player == finding_player:
-                return hint
-        return None
+        return self.hints_by_location.get((team, finding_player, seeked_location))
     
     def replace_hint(self, team: int, slot: int, old_hint: Hint, new_hint: Hint) -> None:
         if old_hint in self.hints[team, slot]:
             self.hints[team, slot].remove(old_hint)
             self.hints[team, slot].add(new_hint)
+            if self.hints_by_location.get((team, old_hint.finding_player, old_hint.location)) == old_hint:
+                self.hints_by_location[team, new_hint.finding_player, new_hint.location] = new_hint
     
     # "events"
 
@@ -871,6 +1366,8 @@ class Context:
         }])
 
     def on_changed_hints(self, team: int, slot: int):
+        if self.save_journal:
+            self.save_journal.set_hints(team, slot)
         key: str = f"_read_hints_{team}_{slot}"
         targets: typing.Set[Client] = set(self.stored_data_notification_clients[key])
         if targets:
@@ -1042,10 +1539,10 @@ def get_players_string(ctx: Context):
 
 def get_status_string(ctx: Context, team: int, tag: str):
     text = f"Player Status on team {team}:"
-    for slot in ctx.locations:
+    for slot, (checked, total) in ctx.locations.get_counts(ctx.location_checks, team).items():
         connected = len(ctx.clients[team][slot])
         tagged = len([client for client in ctx.clients[team][slot] if tag in client.tags])
-        completion_text = f"({len(ctx.location_checks[team, slot])}/{len(ctx.locations[slot])})"
+        completion_text = f"({checked}/{total})"
         tag_text = f" {tagged} of which are tagged {tag}" if connected and tag else ""
         status_text = (
             " and has finished." if ctx.client_game_state[team, slot] == ClientStatus.CLIENT_GOAL else
@@ -1066,25 +1563,13 @@ def get_start_inventory(ctx: Context, player: int, remote_start_inventory: bool)
 
 
 def send_new_items(ctx: Context):
-    for team, clients in ctx.clients.items():
-        for slot, clients in clients.items():
-            for client in clients:
-                if client.no_items:
-                    continue
-                start_inventory = get_start_inventory(ctx, slot, client.remote_start_inventory)
-                items = get_received_items(ctx, team, slot, client.remote_items)
-                if len(start_inventory) + len(items) > client.send_index:
-                    first_new_item = max(0, client.send_index - len(start_inventory))
-                    async_start(ctx.send_msgs(client, [{
-                        "cmd": "ReceivedItems",
-                        "index": client.send_index,
-                        "items": start_inventory[client.send_index:] + items[first_new_item:]}]))
-                    client.send_index = len(start_inventory) + len(items)
+    """Send the items received by the slots in ctx.dirty_item_slots to their clients, batched per event loop tick."""
+    if ctx.dirty_item_slots:
+        ctx.schedule_outbound()
 
 
 def update_checked_locations(ctx: Context, team: int, slot: int):
-    ctx.broadcast(ctx.clients[team][slot],
-                  [{"cmd": "RoomUpdate", "checked_locations": get_checked_checks(ctx, team, slot)}])
+    ctx.queue_room_update(team, slot, get_checked_checks(ctx, team, slot))
 
 
 def release_player(ctx: Context, team: int, slot: int):
@@ -1127,10 +1612,12 @@ def send_items_to(ctx: Context, team: int, target_slot: int, *items: NetworkItem
             if item.player != target_slot:
                 get_received_items(ctx, team, target, False).append(item)
             get_received_items(ctx, team, target, True).append(item)
+        ctx.dirty_item_slots.add((team, target))
 
 
 def register_location_checks(ctx: Context, team: int, slot: int, locations: typing.Iterable[int],
                              count_activity: bool = True):
+    check_start = time.process_time()
     slot_locations = ctx.locations[slot]
     new_locations = set(locations) - ctx.location_checks[team, slot]
     new_locations.intersection_update(slot_locations)  # ignore location IDs unknown to this multidata
@@ -1165,16 +1652,15 @@ def register_location_checks(ctx: Context, team: int, slot: int, locations: typi
 
         ctx.location_checks[team, slot] |= new_locations
         send_new_items(ctx)
-        ctx.broadcast(ctx.clients[team][slot], [{
-            "cmd": "RoomUpdate",
-            "hint_points": get_slot_points(ctx, team, slot),
-            "checked_locations": new_locations,  # send back new checks only
-        }])
+        # send back new checks only
+        ctx.queue_room_update(team, slot, new_locations, hint_points=True)
         updated_slots: typing.Set[tuple[int, int]] = set()
-        ctx.recheck_hints(team, slot, updated_slots)
+        ctx.recheck_location_hints(team, slot, new_locations, updated_slots)
         for hint_team, hint_slot in updated_slots:
             ctx.on_changed_hints(hint_team, hint_slot)
         ctx.save()
+        ctx.outbound_stats.location_checks += len(new_locations)
+        ctx.outbound_stats.check_time += time.process_time() - check_start
 
 
 def collect_hints(ctx: Context, team: int, slot: int, item: typing.Union[int, str],
@@ -1666,6 +2152,7 @@ class ClientMessageProcessor(CommonCommandProcessor):
                 new_item = NetworkItem(names[item_name], -1, self.client.slot)
                 get_received_items(self.ctx, self.client.team, self.client.slot, False).append(new_item)
                 get_received_items(self.ctx, self.client.team, self.client.slot, True).append(new_item)
+                self.ctx.dirty_item_slots.add((self.client.team, self.client.slot))
                 self.ctx.broadcast_text_all(
                     'Cheat console: sending "' + item_name + '" to ' + self.ctx.get_aliased_name(self.client.team,
                                                                                                  self.client.slot),
@@ -1683,9 +2170,7 @@ class ClientMessageProcessor(CommonCommandProcessor):
         points_available = get_client_points(self.ctx, self.client)
         cost = self.ctx.get_hint_cost(self.client.slot)
         if not input_text:
-            hints = {hint.re_check(self.ctx, self.client.team) for hint in
-                     self.ctx.hints[self.client.team, self.client.slot]}
-            self.ctx.hints[self.client.team, self.client.slot] = hints
+            hints = self.ctx.get_rechecked_hints(self.client.team, self.client.slot)
             self.ctx.notify_hints(self.client.team, list(hints), recipients=(self.client.slot,))
             self.output(f"A hint costs {self.ctx.get_hint_cost(self.client.slot)} points. "
                         f"You have {points_available} points.")
@@ -1935,21 +2420,16 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
         if "games" in args:
             games = {name: game_data for name, game_data in ctx.gamespackage.items()
                      if name in set(args.get("games", []))}
-            await ctx.send_msgs(client, [{"cmd": "DataPackage",
-                                          "data": {"games": games}}])
+            await ctx.send_encoded_msgs(client, NetUtils.encode_data_package_msg(games))
         # TODO: remove exclusions behaviour around 0.5.0
         elif exclusions:
             exclusions = set(exclusions)
             games = {name: game_data for name, game_data in ctx.gamespackage.items()
                      if name not in exclusions}
-
-            package = {"games": games}
-            await ctx.send_msgs(client, [{"cmd": "DataPackage",
-                                          "data": package}])
+            await ctx.send_encoded_msgs(client, NetUtils.encode_data_package_msg(games))
 
         else:
-            await ctx.send_msgs(client, [{"cmd": "DataPackage",
-                                          "data": {"games": ctx.gamespackage}}])
+            await ctx.send_encoded_msgs(client, NetUtils.encode_data_package_msg(ctx.gamespackage))
 
     elif client.auth:
         if cmd == "ConnectUpdate":
@@ -2178,6 +2658,8 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
                 func = modify_functions[operation["operation"]]
                 value = func(value, operation["value"])
             ctx.stored_data[args["key"]] = args["value"] = value
+            if ctx.save_journal:
+                ctx.save_journal.set_stored_data(args["key"])
             targets = set(ctx.stored_data_notification_clients[args["key"]])
             if args.get("want_reply", False):
                 targets.add(client)
@@ -2535,6 +3017,20 @@ class ServerCommandProcessor(CommonCommandProcessor):
             self.ctx.broadcast_all([{"cmd": "RoomUpdate", option_name: getattr(self.ctx, option_name)}])
         return True
 
+    def _cmd_network_stats(self) -> bool:
+        """Debug Tool: show the rate of messages sent and the CPU time used per location check."""
+        self.output(str(self.ctx.outbound_stats))
+        return True
+
+    def _cmd_memory(self) -> bool:
+        """Debug Tool: approximate the memory used by this room, not counting data shared with other rooms."""
+        usage = self.ctx.get_memory_usage()
+        texts = [f"{name}: {Utils.format_SI_prefix(size, power=1024)}B"
+                 for name, size in sorted(usage.items(), key=lambda item: item[1], reverse=True) if size > 1024]
+        texts.insert(0, f"Room uses approximately {Utils.format_SI_prefix(sum(usage.values()), power=1024)}B")
+        self.output("\n".join(texts))
+        return True
+
     def _cmd_datastore(self):
         """Debug Tool: list writable datastorage keys and approximate the size of their values with pickle."""
         total: int = 0
@@ -2580,6 +3076,8 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument('--password', default=defaults["password"])
     parser.add_argument('--savefile', default=defaults["savefile"])
     parser.add_argument('--disable_save', default=defaults["disable_save"], action='store_true')
+    parser.add_argument('--disable_save_journal', default=defaults["disable_save_journal"], action='store_true',
+                        help="Rewrite the whole savegame on every save, instead of appending changes to a journal.")
     parser.add_argument('--cert', help="Path to a SSL Certificate for encryption.")
     parser.add_argument('--cert_key', help="Path to SSL Certificate Key file")
     parser.add_argument('--loglevel', default=defaults["loglevel"],
@@ -2710,7 +3208,7 @@ async def main(args: argparse.Namespace):
         logging.exception(f"Failed to read multiworld data ({e})")
         raise
 
-    ctx.init_save(not args.disable_save)
+    ctx.init_save(not args.disable_save, not args.disable_save_journal)
 
     ssl_context = load_server_cert(args.cert, args.cert_key) if args.cert else None
 
@@ -2738,6 +3236,8 @@ async def main(args: argparse.Namespace):
 client_message_processor = ClientMessageProcessor
 
 if __name__ == '__main__':
+    # only import the worlds of the hosted games, unless overridden
+    os.environ.setdefault("AP_LAZY_WORLDS", "1")
     try:
         asyncio.run(main(parse_args()))
     except asyncio.exceptions.CancelledError:
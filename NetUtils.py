@@ -1,6 +1,11 @@
 from __future__ import annotations
 
+from array import array
+from collections import OrderedDict
 from collections.abc import Mapping, Sequence
+from itertools import filterfalse
+import gzip
+import threading
 import typing
 import enum
 import warnings
@@ -95,7 +100,12 @@ class NetworkItem(typing.NamedTuple):
     flags: int = 0
 
 
+_scalar_types = frozenset((str, int, float, bool, type(None)))
+
+
 def _scan_for_TypedTuples(obj: typing.Any) -> typing.Any:
+    if type(obj) in _scalar_types:  # most common, skip the checks below
+        return obj
     if isinstance(obj, tuple) and hasattr(obj, "_fields"):  # NamedTuple is not actually a parent class
         data = obj._asdict()
         data["class"] = obj.__class__.__name__
@@ -128,15 +138,18 @@ def convert_to_base_types(obj: typing.Any) -> _base_types:
         raise Exception(f"Cannot handle {type(obj)}")
 
 
-_encode = JSONEncoder(
+_json_encode = JSONEncoder(
     ensure_ascii=False,
     check_circular=False,
     separators=(',', ':'),
 ).encode
 
 
-def encode(obj: typing.Any) -> str:
-    return _encode(_scan_for_TypedTuples(obj))
+def _encode(obj: typing.Any) -> str:
+    return _json_encode(_scan_for_TypedTuples(obj))
+
+
+encode = _encode  # replaced by _speedups.encode below, if available
 
 
 def get_any_version(data: dict) -> Version:
@@ -415,8 +428,12 @@ class Hint(typing.NamedTuple):
 
 
 class _LocationStore(dict, typing.MutableMapping[int, typing.Dict[int, typing.Tuple[int, int, int]]]):
+    _item_index: typing.Optional[typing.Dict[int, typing.Dict[int, array]]]
+    """receiving player -> item id -> array of (finding player, location id), built on first use"""
+
     def __init__(self, values: typing.MutableMapping[int, typing.Dict[int, typing.Tuple[int, int, int]]]):
         super().__init__(values)
+        self._item_index = None
 
         if not self:
             raise ValueError(f"Rejecting game with 0 players")
@@ -429,10 +446,17 @@ class _LocationStore(dict, typing.MutableMapping[int, typing.Dict[int, typing.Tu
 
     def find_item(self, slots: typing.Set[int], seeked_item_id: int
                   ) -> typing.Generator[typing.Tuple[int, int, int, int, int], None, None]:
-        for finding_player, check_data in self.items():
-            for location_id, (item_id, receiving_player, item_flags) in check_data.items():
-                if receiving_player in slots and item_id == seeked_item_id:
-                    yield finding_player, location_id, item_id, receiving_player, item_flags
+        item_index = self._get_item_index()
+        found: typing.List[typing.Tuple[int, int, int, int, int]] = []
+        for receiving_player in slots:
+            locations = item_index.get(receiving_player, {}).get(seeked_item_id)
+            if locations:
+                for finding_player, location_id in zip(locations[::2], locations[1::2]):
+                    item_id, _, item_flags = self[finding_player][location_id]
+                    found.append((finding_player, location_id, item_id, receiving_player, item_flags))
+        if len(slots) > 1:
+            found.sort()  # same order as a scan over all locations
+        yield from found
 
     def get_for_player(self, slot: int) -> typing.Dict[int, typing.Set[int]]:
         import collections
@@ -473,6 +497,50 @@ class _LocationStore(dict, typing.MutableMapping[int, typing.Dict[int, typing.Tu
                         location_id in player_locations if
                         location_id not in checked])
 
+    def get_counts(self, state: typing.Dict[typing.Tuple[int, int], typing.Set[int]], team: int
+                   ) -> typing.Dict[int, typing.Tuple[int, int]]:
+        """Returns slot -> (checked locations, total locations) for all slots of team."""
+        counts: typing.Dict[int, typing.Tuple[int, int]] = {}
+        for slot, player_locations in self.items():
+            checked = state.get((team, slot))
+            counts[slot] = (len(checked.intersection(player_locations)) if checked else 0, len(player_locations))
+        return counts
+
+    def get_all_missing(self, state: typing.Dict[typing.Tuple[int, int], typing.Set[int]], team: int
+                        ) -> typing.Dict[int, array]:
+        """Returns slot -> array('q') of missing location ids for all slots of team, in the order of get_missing."""
+        all_missing: typing.Dict[int, array] = {}
+        for slot, player_locations in self.items():
+            checked = state.get((team, slot))
+            all_missing[slot] = array("q", filterfalse(checked.__contains__, player_locations) if checked
+                                      else player_locations)
+        return all_missing
+
+    def get_item_locations(self, slot: int) -> typing.Dict[int, array]:
+        """
+        Returns item id -> array('q') of (finding player, location id) pairs, flattened, for all items sent to slot.
+        The arrays are shared with the item index and must not be modified.
+        """
+        return dict(self._get_item_index().get(slot, {}))
+
+    def _get_item_index(self) -> typing.Dict[int, typing.Dict[int, array]]:
+        """reverse index for find_item, so a hint does not have to scan all locations of the multiworld"""
+        if self._item_index is not None:
+            return self._item_index
+        item_index: typing.Dict[int, typing.Dict[int, array]] = {}
+        for finding_player, check_data in self.items():
+            for location_id, (item_id, receiving_player, item_flags) in check_data.items():
+                receiver_items = item_index.get(receiving_player)
+                if receiver_items is None:
+                    receiver_items = item_index[receiving_player] = {}
+                locations = receiver_items.get(item_id)
+                if locations is None:
+                    locations = receiver_items[item_id] = array("q")
+                locations.append(finding_player)
+                locations.append(location_id)
+        self._item_index = item_index
+        return item_index
+
 
 class MinimumVersions(typing.TypedDict):
     server: tuple[int, int, int]
@@ -491,6 +559,51 @@ class DataPackage(typing.TypedDict):
     games: dict[str, GamesPackage]
 
 
+encoded_game_packages_limit: int = 256
+"""Number of encoded game packages kept per process, shared by all rooms it hosts."""
+_encoded_game_packages: OrderedDict[tuple[str, ...], list[typing.Any]] = OrderedDict()
+"""(checksum, *keys) -> [JSON, gzip compressed JSON or None], least recently used first"""
+_encoded_game_packages_lock = threading.Lock()
+
+
+def _get_encoded_game_package(game_package: GamesPackage) -> list[typing.Any]:
+    checksum = game_package.get("checksum")
+    if not checksum:
+        return [encode(game_package), None]
+    # the groups may have been removed from a package without changing its checksum
+    key = (checksum, *game_package)
+    with _encoded_game_packages_lock:
+        encoded = _encoded_game_packages.get(key)
+        if encoded:
+            _encoded_game_packages.move_to_end(key)
+            return encoded
+    encoded = [encode(game_package), None]
+    with _encoded_game_packages_lock:
+        _encoded_game_packages[key] = encoded
+        while len(_encoded_game_packages) > encoded_game_packages_limit:
+            _encoded_game_packages.popitem(last=False)
+    return encoded
+
+
+def encode_game_package(game_package: GamesPackage) -> str:
+    """Encode a game's package, reusing the result for packages with the same checksum."""
+    return _get_encoded_game_package(game_package)[0]
+
+
+def compress_game_package(game_package: GamesPackage) -> bytes:
+    """Encode and gzip compress a game's package, reusing the result for packages with the same checksum."""
+    encoded = _get_encoded_game_package(game_package)
+    if encoded[1] is None:
+        encoded[1] = gzip.compress(encoded[0].encode(), mtime=0)
+    return encoded[1]
+
+
+def encode_data_package_msg(games: Mapping[str, GamesPackage]) -> str:
+    """Same as encode([{"cmd": "DataPackage", "data": {"games": games}}]), using the encoded game packages."""
+    return '[{"cmd":"DataPackage","data":{"games":{' + ",".join(
+        encode(game) + ":" + encode_game_package(game_package) for game, game_package in games.items()) + "}}}]"
+
+
 class MultiData(typing.TypedDict):
     slot_data: dict[int, Mapping[str, typing.Any]]
     slot_info: dict[int, NetworkSlot]
@@ -532,3 +645,7 @@ else:
             warnings.warn("_speedups not available. Falling back to pure python LocationStore. "
                           "Install a matching C++ compiler for your platform to compile _speedups.")
             LocationStore = _LocationStore
+    try:
+        from _speedups import encode
+    except ImportError:
+        pass  # outdated _speedups, keep pure python encode
@@ -260,6 +260,66 @@ parse_yaml = functools.partial(load, Loader=UniqueKeyLoader)
 parse_yamls = functools.partial(load_all, Loader=UniqueKeyLoader)
 unsafe_parse_yaml = functools.partial(load, Loader=UnsafeLoader)
 
+yaml_cache_max_entries = 1000
+"""Number of parsed yaml files kept by parse_yamls_cached, the least recently used ones are removed."""
+
+
+def parse_yamls_cached(data: typing.Union[str, bytes], use_cache: bool = True) -> typing.Tuple[Any, ...]:
+    """
+    Parse all yaml documents in data like parse_yamls, caching the documents in the cache_path("yaml") folder by the
+    hash of data, so parsing the same data again only loads them. Documents that marshal can't store are not cached.
+    The cache is not limited here, see evict_yaml_cache.
+    """
+    if not use_cache:
+        return tuple(parse_yamls(data))
+    import hashlib
+    import marshal
+
+    # marshal's format depends on the python version and parsing may change with the core version
+    key = hashlib.sha256(f"{__version__} {sys.hexversion >> 16}\n".encode())
+    key.update(data.encode("utf-8") if isinstance(data, str) else data)
+    path = cache_path("yaml", f"{key.hexdigest()}.bin")
+    try:
+        with open(path, "rb") as f:
+            documents = marshal.load(f)
+        os.utime(path)  # mark as recently used
+        return documents
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+
+    documents = tuple(parse_yamls(data))
+    try:
+        encoded = marshal.dumps(documents)
+    except ValueError:  # like dates
+        return documents
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f"{path}.{os.getpid()}.tmp", "wb") as f:
+            f.write(encoded)
+        os.replace(f"{path}.{os.getpid()}.tmp", path)
+    except OSError as e:
+        logging.debug(f"Could not cache parsed yaml: {e}")
+    return documents
+
+
+def evict_yaml_cache() -> None:
+    """
+    Remove the least recently used entries of the yaml cache over yaml_cache_max_entries. This scans the whole cache,
+    so call it once after parsing a batch of files with parse_yamls_cached, not after each of them.
+    """
+    folder = cache_path("yaml")
+    try:
+        entries = [entry for entry in os.scandir(folder) if entry.name.endswith(".bin")]
+    except OSError:
+        return  # nothing cached yet
+    if len(entries) > yaml_cache_max_entries:
+        entries.sort(key=lambda entry: entry.stat().st_mtime_ns)
+        for entry in entries[:len(entries) - yaml_cache_max_entries]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass  # removed by another process
+
 del load, load_all  # should not be used. don't leak their names
 
 
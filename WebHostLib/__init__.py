@@ -40,6 +40,9 @@ app.config["HOSTERS"] = 8  # maximum concurrent room hosters
 app.config["SELFLAUNCH"] = True  # application process is in charge of launching Rooms.
 app.config["SELFLAUNCHCERT"] = None  # can point to a SSL Certificate to encrypt Room websocket connections
 app.config["SELFLAUNCHKEY"] = None  # can point to a SSL Certificate Key to encrypt Room websocket connections
+# after how many seconds without connected clients a hosted Room is saved and unloaded, keeping its port.
+# The next connection loads it again. Can be set to None to keep Rooms loaded until they time out.
+app.config["ROOM_HIBERNATION_DELAY"] = None
 app.config["SELFGEN"] = True  # application process is in charge of scheduling Generations.
 # at what amount of worlds should scheduling be used, instead of rolling in the web-thread
 app.config["JOB_THRESHOLD"] = 1
@@ -58,6 +61,9 @@ app.config["PONY"] = {
     'create_db': True
 }
 app.config["MAX_ROLL"] = 20
+# opt-in: keep parsed options files in the user cache dir by content hash, so the same files are not parsed for every
+# generation. Uploaded files are stored until evicted, so only enable this if the host may keep them.
+app.config["YAML_CACHE"] = False
 app.config["CACHE_TYPE"] = "SimpleCache"
 app.config["HOST_ADDRESS"] = ""
 app.config["ASSET_RIGHTS"] = False
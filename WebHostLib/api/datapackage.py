@@ -1,5 +1,8 @@
-from flask import abort
+from typing import Optional
 
+from flask import Response, abort, request
+
+from NetUtils import GamesPackage, compress_game_package, encode_game_package
 from Utils import restricted_loads
 from WebHostLib import cache
 from WebHostLib.models import GameDataPackage
@@ -13,13 +16,27 @@ def get_datapackage():
     return network_data_package
 
 
-@api_endpoints.route('/datapackage/<string:checksum>')
 @cache.memoize(timeout=3600)
-def get_datapackage_by_checksum(checksum: str):
+def get_game_data_package(checksum: str) -> Optional[GamesPackage]:
     package = GameDataPackage.get(checksum=checksum)
     if package:
         return restricted_loads(package.data)
-    return abort(404)
+    return None
+
+
+@api_endpoints.route('/datapackage/<string:checksum>')
+def get_datapackage_by_checksum(checksum: str):
+    package = get_game_data_package(checksum)
+    if not package:
+        return abort(404)
+    # serve the encoded package shared with the room servers of this process, precompressed if possible
+    if request.accept_encodings["gzip"]:
+        response = Response(compress_game_package(package), mimetype="application/json")
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        response = Response(encode_game_package(package), mimetype="application/json")
+    response.vary.add("Accept-Encoding")
+    return response
 
 
 @api_endpoints.route('/datapackage_checksum')
@@ -10,7 +10,7 @@ from WebHostLib import app
 from WebHostLib.upload import allowed_options, allowed_options_extensions, banned_file
 
 from Generate import roll_settings, PlandoOptions
-from Utils import parse_yamls
+from Utils import evict_yaml_cache, parse_yamls_cached
 
 
 @app.route('/check', methods=['GET', 'POST'])
@@ -85,8 +85,8 @@ def get_yaml_data(files) -> dict[str, str] | str | Markup:
 
 
 def roll_options(options: dict[str, dict | str],
-                 plando_options: Set[str] = frozenset({"bosses", "items", "connections", "texts"})) -> \
-        tuple[dict[str, str | bool], dict[str, dict]]:
+                 plando_options: Set[str] = frozenset({"bosses", "items", "connections", "texts"}),
+                 use_yaml_cache: bool = False) -> tuple[dict[str, str | bool], dict[str, dict]]:
     plando_options = PlandoOptions.from_set(set(plando_options))
     results: dict[str, str | bool] = {}
     rolled_results: dict[str, dict] = {}
@@ -95,7 +95,7 @@ def roll_options(options: dict[str, dict | str],
             if type(text) is dict:
                 yaml_datas = (text, )
             else:
-                yaml_datas = tuple(parse_yamls(text))
+                yaml_datas = parse_yamls_cached(text, use_yaml_cache)
         except Exception as e:
             results[filename] = f"Failed to parse YAML data in {filename}: {e}"
         else:
@@ -115,4 +115,6 @@ def roll_options(options: dict[str, dict | str],
                     results[filename] = f"Failed to generate options in {filename}: {e}"
             else:
                 results[filename] = True
+    if use_yaml_cache:
+        evict_yaml_cache()
     return results, rolled_results
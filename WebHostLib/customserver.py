@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import asyncio
 import collections
+import contextlib
 import datetime
 import functools
 import logging
@@ -131,11 +132,10 @@ class WebHostContext(Context):
                     # games package could be dropped from static data once all rooms embed data package
                     del multidata["datapackage"][game]
                 else:
-                    row = GameDataPackage.get(checksum=game_data["checksum"])
-                    if row:  # None if rolled on >= 0.3.9 but uploaded to <= 0.3.8. multidata should be complete
-                        game_data_packages[game] = restricted_loads(row.data)
+                    try:
+                        game_data_packages[game] = load_game_data_package(game_data["checksum"])
                         continue
-                    else:
+                    except KeyError:  # rolled on >= 0.3.9 but uploaded to <= 0.3.8. multidata should be complete
                         self.logger.warning(f"Did not find game_data_package for {game}: {game_data['checksum']}")
             else:
                 missing_checksum = True  # Game rolled on old AP and will load data package from multidata
@@ -176,6 +176,110 @@ class WebHostContext(Context):
         return d
 
 
+class RoomHost:
+    """
+    Serves a room's websocket port. With a hibernation delay, the room's Context is saved and dropped once no client has
+    been connected for that many seconds, keeping the port open. The next connection loads it again before the handshake
+    is handled.
+    """
+    room_id: int
+    static_server_data: dict
+    logger: logging.Logger
+    hibernation_delay: typing.Optional[float]
+    ctx: typing.Optional[WebHostContext]
+    """None while hibernating"""
+    server: typing.Any
+    """websockets server, kept across activations"""
+    activated: asyncio.Event
+    hibernation_timer: typing.Optional[asyncio.TimerHandle]
+    last_shutdown_check: float
+    """time.monotonic() of the last activation, or the newest client activity of a hibernating room"""
+    activation_times: typing.List[float]
+
+    def __init__(self, room_id: int, static_server_data: dict, logger: logging.Logger,
+                 hibernation_delay: typing.Optional[float]) -> None:
+        self.room_id = room_id
+        self.static_server_data = static_server_data
+        self.logger = logger
+        self.hibernation_delay = hibernation_delay
+        self.ctx = None
+        self.server = None
+        self.activated = asyncio.Event()
+        self.hibernation_timer = None
+        self.last_shutdown_check = time.monotonic()
+        self.activation_times = []
+
+    def activate(self) -> WebHostContext:
+        start = time.perf_counter()
+        ctx = WebHostContext(self.static_server_data, self.logger)
+        ctx.load(self.room_id)
+        ctx.init_save()
+        ctx.server = self.server
+        with db_session:
+            ctx.auto_shutdown = Room.get(id=self.room_id).timeout
+        self.ctx = ctx
+        self.last_shutdown_check = time.monotonic()
+        self.activated.set()
+        self.activation_times.append(time.perf_counter() - start)
+        return ctx
+
+    async def serve(self, websocket, path: str = "/") -> None:
+        if self.hibernation_timer:
+            self.hibernation_timer.cancel()
+            self.hibernation_timer = None
+        ctx = self.ctx
+        if not ctx:
+            ctx = self.activate()
+            ctx.logger.info(f"Woke up from hibernation in {self.activation_times[-1] * 1000:.0f}ms.")
+        try:
+            await server(websocket, path, ctx=ctx)
+        finally:
+            if self.ctx is ctx and not ctx.endpoints:
+                self.schedule_hibernation()
+
+    def schedule_hibernation(self) -> None:
+        if self.hibernation_delay is not None and self.ctx and not self.ctx.exit_event.is_set():
+            self.hibernation_timer = asyncio.get_running_loop().call_later(self.hibernation_delay, self.hibernate)
+
+    def hibernate(self) -> None:
+        self.hibernation_timer = None
+        ctx = self.ctx
+        if not ctx or ctx.endpoints or ctx.exit_event.is_set():
+            return
+        if ctx.saving:
+            ctx._save(True)
+        if ctx.client_activity_timers:
+            newest_activity = max(ctx.client_activity_timers.values())
+            idle = (datetime.datetime.now(datetime.timezone.utc) - newest_activity).total_seconds()
+            self.last_shutdown_check = time.monotonic() - idle
+        self.ctx = None
+        self.activated.clear()
+        ctx.save_dirty = False  # make sure the saving thread does not write to DB after final wakeup
+        ctx.exit_event.set()  # stops the saving and command threads and auto_shutdown
+        ctx.logger.info("Hibernating, no clients connected.")
+
+    async def wait_for_activation(self, timeout: float) -> typing.Optional[WebHostContext]:
+        """Wait for a hibernating room to be activated, returns None if the room timed out instead."""
+        remaining = max(timeout - (time.monotonic() - self.last_shutdown_check), 0) if timeout else None
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self.activated.wait(), remaining)
+        return self.ctx
+
+    def get_activation_stats(self) -> str:
+        times = self.activation_times
+        return (f"activated {len(times)} times, taking {sum(times) / len(times) * 1000:.0f}ms on average "
+                f"and {max(times) * 1000:.0f}ms at most")
+
+
+@functools.lru_cache(maxsize=128)
+def load_game_data_package(checksum: str) -> typing.Dict[str, typing.Any]:
+    """Load a custom game's data package once per process, to share it between rooms. It must not be modified."""
+    row = GameDataPackage.get(checksum=checksum)
+    if not row:
+        raise KeyError(checksum)
+    return restricted_loads(row.data)
+
+
 def get_random_port():
     return random.randint(49152, 65535)
 
@@ -231,7 +335,8 @@ def set_up_logging(room_id) -> logging.Logger:
 
 def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                        cert_file: typing.Optional[str], cert_key_file: typing.Optional[str],
-                       host: str, rooms_to_run: multiprocessing.Queue, rooms_shutting_down: multiprocessing.Queue):
+                       host: str, rooms_to_run: multiprocessing.Queue, rooms_shutting_down: multiprocessing.Queue,
+                       hibernation_delay: typing.Optional[float] = None):
     from setproctitle import setproctitle
 
     setproctitle(name)
@@ -278,15 +383,16 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
 
     async def start_room(room_id):
         with Locker(f"RoomLocker {room_id}"):
+            room_host: typing.Optional[RoomHost] = None
+            ctx: typing.Optional[WebHostContext] = None
             try:
                 logger = set_up_logging(room_id)
-                ctx = WebHostContext(static_server_data, logger)
-                ctx.load(room_id)
-                ctx.init_save()
+                room_host = RoomHost(room_id, static_server_data, logger, hibernation_delay)
+                ctx = room_host.activate()
                 assert ctx.server is None
                 try:
                     ctx.server = websockets.serve(
-                        functools.partial(server, ctx=ctx),
+                        room_host.serve,
                         ctx.host,
                         ctx.port,
                         ssl=get_ssl_context(),
@@ -295,9 +401,10 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                     await ctx.server
                 except OSError:  # likely port in use
                     ctx.server = websockets.serve(
-                        functools.partial(server, ctx=ctx), ctx.host, 0, ssl=get_ssl_context())
+                        room_host.serve, ctx.host, 0, ssl=get_ssl_context())
 
                     await ctx.server
+                room_host.server = ctx.server
                 port = 0
                 for wssocket in ctx.server.ws_server.sockets:
                     socketname = wssocket.getsockname()
@@ -315,16 +422,28 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                     del room
                 else:
                     ctx.logger.exception("Could not determine port. Likely hosting failure.")
-                with db_session:
-                    ctx.auto_shutdown = Room.get(id=room_id).timeout
-                if ctx.saving:
-                    setattr(asyncio.current_task(), "save", lambda: ctx._save(True))
-                assert ctx.shutdown_task is None
-                ctx.shutdown_task = asyncio.create_task(auto_shutdown(ctx, []))
-                await ctx.shutdown_task
+                ctx.logger.info(f"Room uses approximately "
+                                f"{Utils.format_SI_prefix(sum(ctx.get_memory_usage().values()), 1024)}B of memory, "
+                                f"not counting static data shared with other rooms.")
+                room_host.schedule_hibernation()
+                setattr(asyncio.current_task(), "save", lambda: room_host.ctx and room_host.ctx.saving
+                        and room_host.ctx._save(True))
+                while True:
+                    assert ctx.shutdown_task is None
+                    ctx.shutdown_task = asyncio.create_task(auto_shutdown(ctx, []))
+                    await ctx.shutdown_task
+                    if room_host.ctx:
+                        break  # shut down, not hibernating
+                    timeout = ctx.auto_shutdown
+                    ctx = None  # free the hibernating room
+                    ctx = await room_host.wait_for_activation(timeout)
+                    if not ctx:
+                        room_host.server.ws_server.close()
+                        logger.info("Shutting down due to inactivity.")
+                        break
 
             except (KeyboardInterrupt, SystemExit):
-                if ctx.saving:
+                if ctx and ctx.saving:
                     ctx._save(True)
                     setattr(asyncio.current_task(), "save", None)
             except Exception as e:
@@ -335,13 +454,19 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                 logger.exception(e)
                 raise
             else:
-                if ctx.saving:
+                if ctx and ctx.saving:
                     ctx._save(True)
-                    setattr(asyncio.current_task(), "save", None)
+                setattr(asyncio.current_task(), "save", None)
             finally:
                 try:
-                    ctx.save_dirty = False  # make sure the saving thread does not write to DB after final wakeup
-                    ctx.exit_event.set()  # make sure the saving thread stops at some point
+                    if room_host:
+                        if room_host.hibernation_timer:
+                            room_host.hibernation_timer.cancel()
+                        if room_host.activation_times:
+                            logger.info(f"Room {room_host.get_activation_stats()}.")
+                    if ctx:
+                        ctx.save_dirty = False  # make sure the saving thread does not write to DB after final wakeup
+                        ctx.exit_event.set()  # make sure the saving thread stops at some point
                     # NOTE: async saving should probably be an async task and could be merged with shutdown_task
                     with db_session:
                         # ensure the Room does not spin up again on its own, minute of safety buffer
@@ -78,7 +78,7 @@ def format_exception(e: BaseException) -> str:
 
 
 def start_generation(options: dict[str, dict | str], meta: dict[str, Any]):
-    results, gen_options = roll_options(options, set(meta["plando_options"]))
+    results, gen_options = roll_options(options, set(meta["plando_options"]), app.config["YAML_CACHE"])
 
     if any(type(result) == str for result in results.values()):
         return render_template("checkResult.html", results=results)
@@ -1,6 +1,5 @@
 #cython: language_level=3
 #distutils: language = c
-#distutils: depends = intset.h
 
 """
 Provides faster implementation of some core parts.
@@ -8,9 +7,10 @@ This is deliberately .pyx because using a non-compiled "pure python" may be slow
 """
 
 # pip install cython cymem
+import array
 import cython
 import warnings
-from cpython cimport PyObject
+from cpython cimport PyObject, array
 from typing import Any, Dict, Iterable, Iterator, Generator, Sequence, Tuple, TypeVar, Union, Set, List, TYPE_CHECKING
 from cymem.cymem cimport Pool
 from libc.stdint cimport int64_t, uint32_t
@@ -31,27 +31,6 @@ ctypedef int64_t ap_id_t
 cdef ap_player_t MAX_PLAYER_ID = 1000000  # limit the size of indexing array
 cdef size_t INVALID_SIZE = <size_t>(-1)  # this is all 0xff... adding 1 results in 0, but it's not negative
 
-# configure INTSET for player
-cdef extern from *:
-    """
-    #define INTSET_NAME ap_player_set
-    #define INTSET_TYPE uint32_t  // has to match ap_player_t
-    """
-
-# create INTSET for player
-cdef extern from "intset.h":
-    """
-    #undef INTSET_NAME
-    #undef INTSET_TYPE
-    """
-    ctypedef struct ap_player_set:
-        pass
-
-    ap_player_set* ap_player_set_new(size_t bucket_count) nogil
-    void ap_player_set_free(ap_player_set* set) nogil
-    bint ap_player_set_add(ap_player_set* set, ap_player_t val) nogil
-    bint ap_player_set_contains(ap_player_set* set, ap_player_t val) nogil
-
 
 cdef struct LocationEntry:
     # layout is so that
@@ -96,6 +75,7 @@ cdef class LocationStore:
     cdef list _items  # ~64KB/1000 players, speed up items (56 per tuple + 8 per list entry)
     cdef list _proxies  # ~92KB/1000 players, speed up self[player] (56 per struct + 28 per len + 8 per list entry)
     cdef PyObject** _raw_proxies  # 8K/1000 players, faster access to _proxies, but does not keep a ref
+    cdef dict _item_index  # receiver -> item -> array of (sender, location), built on first use. ~16 per location
 
     def get_size(self):
         from sys import getsizeof
@@ -106,6 +86,10 @@ cdef class LocationStore:
         size += sum(sizeof(item) for item in self._items)
         size += sum(sizeof(proxy) for proxy in self._proxies)
         size += sizeof(self._raw_proxies[0]) * self.sender_index_size
+        if self._item_index is not None:
+            size += getsizeof(self._item_index)
+            for receiver_items in self._item_index.values():
+                size += getsizeof(receiver_items) + sum(getsizeof(locations) for locations in receiver_items.values())
         return size
 
     def __init__(self, locations_dict: Dict[int, Dict[int, Sequence[int]]]) -> None:
@@ -216,34 +200,25 @@ cdef class LocationStore:
 
     # specialized accessors
     def find_item(self, slots: Set[int], seeked_item_id: int) -> Generator[Tuple[int, int, int, int, int], None, None]:
-        cdef ap_id_t item = seeked_item_id
-        cdef ap_player_t receiver
-        cdef ap_player_set* receivers
-        cdef size_t slot_count = len(slots)
-        if slot_count == 1:
-            # specialized implementation for single slot
-            receiver = list(slots)[0]
-            with nogil:
-                for entry in self.entries[:self.entry_count]:
-                    if entry.item == item and entry.receiver == receiver:
-                        with gil:
-                            yield entry.sender, entry.location, entry.item, entry.receiver, entry.flags
-        elif slot_count:
-            # generic implementation with lookup in set
-            receivers = ap_player_set_new(min(1023, slot_count))  # limit top level struct to 16KB
-            if not receivers:
-                raise MemoryError()
-            try:
-                for receiver in slots:
-                    if not ap_player_set_add(receivers, receiver):
-                        raise MemoryError()
-                with nogil:
-                    for entry in self.entries[:self.entry_count]:
-                        if entry.item == item and ap_player_set_contains(receivers, entry.receiver):
-                            with gil:
-                                yield entry.sender, entry.location, entry.item, entry.receiver, entry.flags
-            finally:
-                ap_player_set_free(receivers)
+        cdef array.array locations
+        cdef Py_ssize_t i
+        cdef LocationEntry* entry
+        cdef dict item_index = self._get_item_index()
+        found: List[Tuple[int, int, int, int, int]] = []
+        for receiver in slots:
+            receiver_items = item_index.get(receiver)
+            if receiver_items is None:
+                continue
+            locations = receiver_items.get(seeked_item_id)
+            if locations is None:
+                continue
+            for i in range(0, len(locations), 2):
+                entry = (<PlayerLocationProxy>self._raw_proxies[locations.data.as_longlongs[i]])._get(
+                    locations.data.as_longlongs[i + 1])
+                found.append((entry.sender, entry.location, entry.item, entry.receiver, entry.flags))
+        if len(slots) > 1:
+            found.sort()  # same order as a scan over all locations
+        yield from found
 
     def get_for_player(self, slot: int) -> Dict[int, Set[int]]:
         cdef ap_player_t receiver = slot
@@ -311,6 +286,73 @@ cdef class LocationStore:
                         entry in self.entries[start:start+count] if
                         entry.location not in checked])
 
+    # bulk accessors, answering for all slots in a single call
+    def get_counts(self, state: State, team: int) -> Dict[int, Tuple[int, int]]:
+        """Returns slot -> (checked locations, total locations) for all slots of team."""
+        cdef size_t sender, start, count, checked_count
+        cdef set checked
+        counts: Dict[int, Tuple[int, int]] = {}
+        for sender in range(1, self.sender_index_size):
+            start = self.sender_index[sender].start
+            count = self.sender_index[sender].count
+            checked = state.get((team, sender))
+            checked_count = 0
+            if checked:
+                for entry in self.entries[start:start + count]:
+                    if entry.location in checked:
+                        checked_count += 1
+            counts[sender] = (checked_count, count)
+        return counts
+
+    def get_all_missing(self, state: State, team: int) -> Dict[int, array.array]:
+        """Returns slot -> array('q') of missing location ids for all slots of team, in the order of get_missing."""
+        cdef size_t sender, start, count, missing_count
+        cdef set checked
+        cdef array.array template = array.array("q")
+        cdef array.array missing
+        all_missing: Dict[int, array.array] = {}
+        for sender in range(1, self.sender_index_size):
+            start = self.sender_index[sender].start
+            count = self.sender_index[sender].count
+            checked = state.get((team, sender))
+            missing = array.clone(template, count, False)
+            missing_count = 0
+            for entry in self.entries[start:start + count]:
+                if not checked or entry.location not in checked:
+                    missing.data.as_longlongs[missing_count] = entry.location
+                    missing_count += 1
+            array.resize(missing, missing_count)
+            all_missing[sender] = missing
+        return all_missing
+
+    def get_item_locations(self, slot: int) -> Dict[int, array.array]:
+        """
+        Returns item id -> array('q') of (finding player, location id) pairs, flattened, for all items sent to slot.
+        The arrays are shared with the item index and must not be modified.
+        """
+        receiver_items = self._get_item_index().get(slot)
+        return dict(receiver_items) if receiver_items else {}
+
+    cdef dict _get_item_index(self):
+        # reverse index for find_item, so a hint does not have to scan all locations of the multiworld
+        cdef array.array locations
+        cdef dict receiver_items
+        if self._item_index is not None:
+            return self._item_index
+        item_index: Dict[int, Dict[int, array.array]] = {}
+        for entry in self.entries[:self.entry_count]:
+            receiver_items = item_index.get(entry.receiver)
+            if receiver_items is None:
+                receiver_items = item_index[entry.receiver] = {}
+            locations = receiver_items.get(entry.item)
+            if locations is None:
+                locations = receiver_items[entry.item] = array.array("q")
+            array.resize_smart(locations, len(locations) + 2)
+            locations.data.as_longlongs[len(locations) - 2] = entry.sender
+            locations.data.as_longlongs[len(locations) - 1] = entry.location
+        self._item_index = item_index
+        return item_index
+
 
 @cython.auto_pickle(False)
 @cython.internal  # unsafe. disable direct import
@@ -376,3 +418,116 @@ cdef class PlayerLocationProxy:
         count = self._store.sender_index[self._player].count
         for entry in self._store.entries[start:start+count]:
             yield entry.location, (entry.item, entry.receiver, entry.flags)
+
+
+# JSON encoding of network messages, matching NetUtils.encode's output exactly
+
+from json.encoder import encode_basestring as _encode_str  # C implementation from _json, if available
+
+cdef double _INFINITY = float("inf")
+cdef dict _tuple_fields = {}  # type -> tuple of '"field":' per field and '"class":"Name"}', None if not a NamedTuple
+
+
+cdef str _str(str obj):
+    cdef Py_UCS4 char
+    for char in obj:
+        if char < 0x20 or char == '"' or char == '\\':
+            return _encode_str(obj)
+    return '"' + obj + '"'
+
+
+cdef str _float_str(object obj):
+    # same as json.encoder's floatstr with allow_nan
+    if obj != obj:
+        return "NaN"
+    if obj == _INFINITY:
+        return "Infinity"
+    if obj == -_INFINITY:
+        return "-Infinity"
+    return float.__repr__(obj)
+
+
+cdef str _key_str(object key):
+    # same key conversion as the json encoder with skipkeys=False, in the same order
+    if type(key) is str:
+        return _str(key)
+    if isinstance(key, str):
+        return _encode_str(key)
+    if isinstance(key, float):
+        return '"' + _float_str(key) + '"'
+    if key is True:
+        return '"true"'
+    if key is False:
+        return '"false"'
+    if key is None:
+        return '"null"'
+    if isinstance(key, int):
+        return '"' + int.__repr__(key) + '"'
+    raise TypeError(f"keys must be str, int, float, bool or None, not {key.__class__.__name__}")
+
+
+cdef tuple _get_tuple_fields(object obj):
+    cls = type(obj)
+    try:
+        return _tuple_fields[cls]
+    except KeyError:
+        pass
+    fields = None
+    if hasattr(obj, "_fields"):
+        fields = tuple(_str(field) + ":" for field in obj._fields) + ('"class":' + _str(cls.__name__) + "}",)
+    _tuple_fields[cls] = fields
+    return fields
+
+
+cdef void _encode_obj(object obj, list chunks, bint scan) except *:
+    # scan: convert NamedTuples, sets and frozensets like NetUtils._scan_for_TypedTuples does, which doesn't recurse
+    # into the fields of NamedTuples
+    cdef bint first = True
+    cdef tuple fields
+    cdef object value
+    cdef Py_ssize_t i
+    if type(obj) is str:
+        chunks.append(_str(obj))
+    elif isinstance(obj, str):
+        chunks.append(_encode_str(obj))
+    elif obj is None:
+        chunks.append("null")
+    elif obj is True:
+        chunks.append("true")
+    elif obj is False:
+        chunks.append("false")
+    elif isinstance(obj, int):
+        chunks.append(str(obj) if type(obj) is int else int.__repr__(obj))
+    elif isinstance(obj, float):
+        chunks.append(_float_str(obj))
+    elif isinstance(obj, tuple) and scan and (fields := _get_tuple_fields(obj)) is not None:
+        chunks.append("{")
+        for i in range(len(obj)):
+            chunks.append(fields[i] if i == 0 else "," + fields[i])
+            _encode_obj(obj[i], chunks, False)
+        chunks.append(fields[-1] if len(obj) == 0 else "," + fields[-1])
+    elif isinstance(obj, (list, tuple)) or (scan and isinstance(obj, (set, frozenset))):
+        chunks.append("[")
+        for value in obj:
+            if first:
+                first = False
+            else:
+                chunks.append(",")
+            _encode_obj(value, chunks, scan)
+        chunks.append("]")
+    elif isinstance(obj, dict):
+        chunks.append("{")
+        for key, value in obj.items():
+            chunks.append(_key_str(key) + ":" if first else "," + _key_str(key) + ":")
+            first = False
+            _encode_obj(value, chunks, scan)
+        chunks.append("}")
+    else:
+        raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
+
+
+def encode(obj: Any) -> str:
+    """Encode a network message to JSON, serializing NamedTuples like NetworkItem directly."""
+    cdef list chunks = []
+    _encode_obj(obj, chunks, True)
+    return "".join(chunks)
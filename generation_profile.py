@@ -0,0 +1,285 @@
+"""
+Opt-in profiling of a generation, enabled by Generate.py's --profile_report.
+
+While a GenerationProfile is active it records the time and traced memory of every world stage method, every fill
+step, the number of can_reach calls and the time spent in each access rule. It is then written out as a JSON report and
+an HTML page showing the same data, to find the worlds and rules that make a large generation slow.
+
+Access rules are timed by worlds.generic.Rules.RuleStatistics, the same counting used by --profile_rules, and grouped
+by the function they were defined in.
+Profiling patches the can_reach methods of Location, Entrance and Region and traces memory allocations, which slows down
+generation considerably, so the absolute numbers are only meaningful relative to each other.
+"""
+from __future__ import annotations
+
+import html
+import json
+import os
+import time
+import tracemalloc
+import typing
+from collections import Counter
+
+if typing.TYPE_CHECKING:
+    from BaseClasses import CollectionState, MultiWorld
+    from worlds.generic.Rules import RuleStatistics
+
+__all__ = ["GenerationProfile", "active"]
+
+active: typing.Optional[GenerationProfile] = None
+"""The profile currently recording, if any."""
+
+
+class StageRecord(typing.TypedDict):
+    stage: str
+    game: typing.Optional[str]
+    player: typing.Optional[int]
+    player_name: typing.Optional[str]
+    time: float
+    memory_peak: int
+    memory_retained: int
+
+
+class FillStepRecord(typing.TypedDict):
+    name: str
+    items: int
+    placements: int
+    swaps: int
+    unplaced: int
+    time: float
+
+
+class RuleRecord(typing.TypedDict):
+    rule: str
+    calls: int
+    time: float
+    self_time: float
+
+
+def _rule_name(key: typing.Any) -> str:
+    if hasattr(key, "co_filename"):
+        try:
+            filename = os.path.relpath(key.co_filename)
+        except ValueError:
+            filename = key.co_filename  # on a different drive
+        return f"{key.co_qualname} ({filename}:{key.co_firstlineno})"
+    return key.__qualname__
+
+
+class GenerationProfile:
+    """Collects profiling data of a single generation. Only one profile can be active at a time."""
+    top_rules: int
+    stages: typing.List[StageRecord]
+    fill_steps: typing.List[FillStepRecord]
+    can_reach_calls: typing.Counter[str]
+    rule_statistics: RuleStatistics
+    """counts the access rules while the profile is active"""
+    start_time: float
+    total_time: float
+    _original_methods: typing.Dict[typing.Tuple[type, str], typing.Callable[..., typing.Any]]
+    _previous_rule_statistics: typing.Optional[RuleStatistics]
+    _started_tracing: bool
+    """whether start started tracemalloc, so stop only stops tracing it started"""
+
+    def __init__(self, top_rules: int = 50, rule_statistics: typing.Optional[RuleStatistics] = None) -> None:
+        """
+        :param top_rules: number of access rules to include in the report, ordered by cumulative time
+        :param rule_statistics: statistics to read the access rules from, to share them with --profile_rules
+        """
+        from worlds.generic.Rules import RuleStatistics
+
+        self.top_rules = top_rules
+        self.stages = []
+        self.fill_steps = []
+        self.can_reach_calls = Counter()
+        self.rule_statistics = rule_statistics or RuleStatistics()
+        self.start_time = self.total_time = 0.
+        self._original_methods = {}
+        self._previous_rule_statistics = None
+        self._started_tracing = False
+
+    def __enter__(self) -> GenerationProfile:
+        self.start()
+        return self
+
+    def __exit__(self, *args: typing.Any) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        global active
+        if active:
+            raise RuntimeError("Another generation profile is already active.")
+        from BaseClasses import Entrance, Location, Region
+        from worlds.generic import Rules
+
+        active = self
+        self.start_time = time.perf_counter()
+        self._started_tracing = not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start()
+        self._previous_rule_statistics, Rules.rule_statistics = Rules.rule_statistics, self.rule_statistics
+
+        can_reach_calls = self.can_reach_calls
+        region_can_reach = Region.can_reach
+        entrance_can_reach = Entrance.can_reach
+        location_can_reach = Location.can_reach
+
+        def profiled_region_can_reach(region: Region, state: CollectionState) -> bool:
+            can_reach_calls["Region"] += 1
+            return region_can_reach(region, state)
+
+        def profiled_entrance_can_reach(entrance: Entrance, state: CollectionState) -> bool:
+            can_reach_calls["Entrance"] += 1
+            return entrance_can_reach(entrance, state)
+
+        def profiled_location_can_reach(location: Location, state: CollectionState) -> bool:
+            can_reach_calls["Location"] += 1
+            return location_can_reach(location, state)
+
+        for cls, method in ((Region, profiled_region_can_reach), (Entrance, profiled_entrance_can_reach),
+                            (Location, profiled_location_can_reach)):
+            self._original_methods[cls, "can_reach"] = cls.can_reach
+            cls.can_reach = method
+
+    def stop(self) -> None:
+        global active
+        if active is not self:
+            return
+        from worlds.generic import Rules
+
+        for (cls, name), method in self._original_methods.items():
+            setattr(cls, name, method)
+        self._original_methods.clear()
+        Rules.rule_statistics, self._previous_rule_statistics = self._previous_rule_statistics, None
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        self.total_time = time.perf_counter() - self.start_time
+        active = None
+
+    def record_stage(self, method: typing.Callable[..., typing.Any], args: typing.Tuple[typing.Any, ...],
+                     multiworld: typing.Optional[MultiWorld], player: typing.Optional[int]) -> typing.Any:
+        """Call a world's stage method like AutoWorld._timed_call, recording its time and memory."""
+        # generate_output runs in threads, so the memory of concurrent calls overlaps
+        memory_before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            taken = time.perf_counter() - start
+            memory_after, memory_peak = tracemalloc.get_traced_memory()
+            owner = getattr(method, "__self__", None)
+            self.stages.append({
+                "stage": method.__name__,
+                "game": getattr(owner, "game", None),
+                "player": player,
+                "player_name": multiworld.player_name[player] if multiworld and player else None,
+                "time": taken,
+                "memory_peak": max(memory_peak - memory_before, 0),
+                "memory_retained": memory_after - memory_before,
+            })
+
+    def record_fill_step(self, name: str, items: int, placements: int, swaps: int, unplaced: int,
+                         taken: float) -> None:
+        self.fill_steps.append({
+            "name": name,
+            "items": items,
+            "placements": placements,
+            "swaps": swaps,
+            "unplaced": unplaced,
+            "time": taken,
+        })
+
+    def get_rule_stats(self) -> typing.Dict[typing.Any, typing.List[float]]:
+        """
+        The access rule statistics summed up per code object (or type of callable object) of the rule,
+        as [calls, cumulative time, self time]. Rules calling state.can_reach include those nested rules' time.
+        """
+        from worlds.generic.Rules import unwrap_rule
+
+        rule_stats: typing.Dict[typing.Any, typing.List[float]] = {}
+        for spot, (calls, total_time, self_time) in self.rule_statistics.spots.items():
+            if not calls:
+                continue
+            rule = unwrap_rule(spot.access_rule)
+            key = getattr(rule, "__code__", None) or type(rule)
+            stats = rule_stats.get(key)
+            if stats:
+                stats[0] += calls
+                stats[1] += total_time
+                stats[2] += self_time
+            else:
+                rule_stats[key] = [calls, total_time, self_time]
+        return rule_stats
+
+    def get_top_rules(self) -> typing.List[RuleRecord]:
+        top = sorted(self.get_rule_stats().items(), key=lambda key_stats: key_stats[1][1],
+                     reverse=True)[:self.top_rules]
+        return [{"rule": _rule_name(key), "calls": int(calls), "time": taken, "self_time": self_taken}
+                for key, (calls, taken, self_taken) in top]
+
+    def to_dict(self, multiworld: typing.Optional[MultiWorld] = None) -> typing.Dict[str, typing.Any]:
+        from Utils import __version__
+        games: typing.Dict[str, typing.Dict[str, float]] = {}
+        for stage in self.stages:
+            if stage["game"]:
+                game_stages = games.setdefault(stage["game"], {})
+                game_stages[stage["stage"]] = game_stages.get(stage["stage"], 0.) + stage["time"]
+        return {
+            "version": __version__,
+            "seed": multiworld.seed_name if multiworld else None,
+            "players": multiworld.players if multiworld else None,
+            "total_time": self.total_time,
+            "games": games,
+            "stages": self.stages,
+            "fill_steps": self.fill_steps,
+            "can_reach_calls": dict(self.can_reach_calls),
+            "access_rules": self.get_top_rules(),
+        }
+
+    def write(self, path: str, multiworld: typing.Optional[MultiWorld] = None) -> None:
+        """Write the report as JSON to path, and as HTML to the same path with an .html extension."""
+        report = self.to_dict(multiworld)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1)
+        html_path = os.path.splitext(path)[0] + ".html"
+        if html_path != path:
+            with open(html_path, "w", encoding="utf-8") as f:
+                f.write(_render_html(report))
+
+
+def _render_table(title: str, rows: typing.Sequence[typing.Mapping[str, typing.Any]]) -> str:
+    if not rows:
+        return f"<h2>{html.escape(title)}</h2><p>None recorded.</p>"
+    columns = list(rows[0])
+
+    def cell(value: typing.Any) -> str:
+        if isinstance(value, float):
+            return f"{value:.4f}"
+        return html.escape(str(value)) if value is not None else ""
+
+    header = "".join(f"<th>{html.escape(column)}</th>" for column in columns)
+    body = "".join("<tr>" + "".join(f"<td>{cell(row[column])}</td>" for column in columns) + "</tr>" for row in rows)
+    return f"<h2>{html.escape(title)}</h2><table><thead><tr>{header}</tr></thead><tbody>{body}</tbody></table>"
+
+
+def _render_html(report: typing.Mapping[str, typing.Any]) -> str:
+    game_rows = [{"game": game, **{stage: taken for stage, taken in stages.items()}}
+                 for game, stages in sorted(report["games"].items())]
+    stage_names = sorted({stage for row in game_rows for stage in row if stage != "game"})
+    game_rows = [{"game": row["game"], **{stage: row.get(stage, 0.) for stage in stage_names}} for row in game_rows]
+    slowest_stages = sorted(report["stages"], key=lambda stage: stage["time"], reverse=True)
+    sections = (
+        _render_table("Time per game and stage (seconds)", game_rows),
+        _render_table("Stage calls by time", slowest_stages),
+        _render_table("Fill steps", report["fill_steps"]),
+        _render_table("can_reach calls", [report["can_reach_calls"]] if report["can_reach_calls"] else []),
+        _render_table("Access rules by cumulative time", report["access_rules"]),
+    )
+    return (f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>Generation Profile {report['seed']}</title>"
+            "<style>table{border-collapse:collapse}td,th{border:1px solid #888;padding:2px 6px;text-align:left}"
+            "</style></head><body>"
+            f"<h1>Generation Profile {html.escape(str(report['seed']))}</h1>"
+            f"<p>Archipelago {html.escape(report['version'])}, {report['players']} players, "
+            f"{report['total_time']:.2f} seconds total.</p>" + "".join(sections) + "</body></html>")
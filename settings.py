@@ -30,18 +30,14 @@ _lock = Lock()
 
 
 def _update_cache() -> None:
-    """Load all worlds and update world_settings_name_cache"""
+    """Update world_settings_name_cache from all worlds, including the ones that are not imported yet"""
     global _world_settings_name_cache_updated
     if _world_settings_name_cache_updated:
         return
 
     try:
-        from worlds.AutoWorld import AutoWorldRegister
-        for world in AutoWorldRegister.world_types.values():
-            annotation = world.__annotations__.get("settings", None)
-            if annotation is None or annotation == "ClassVar[Optional['Group']]":
-                continue
-            _world_settings_name_cache[world.settings_key] = f"{world.__module__}.{world.__name__}"
+        from worlds import get_world_settings_names
+        _world_settings_name_cache.update(get_world_settings_names())
     finally:
         _world_settings_name_cache_updated = True
 
@@ -535,6 +531,12 @@ class ServerOptions(Group):
     class DisableItemCheat(Bool):
         """Disallow !getitem"""
 
+    class DisableSaveJournal(Bool):
+        """
+        Rewrite the whole savegame on every autosave, instead of appending the changes to a journal next to it.
+        The journal is merged into the savegame once it grows larger than the savegame, and on shutdown.
+        """
+
     class LocationCheckPoints(int):
         """
         Client hint system
@@ -615,6 +617,7 @@ class ServerOptions(Group):
     multidata: str | None = None
     savefile: str | None = None
     disable_save: bool = False
+    disable_save_journal: DisableSaveJournal | bool = False
     loglevel: str = "info"
     logtime: bool = False
     server_password: ServerPassword | None = None
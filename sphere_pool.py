@@ -0,0 +1,130 @@
+"""
+Location reachability checks for sphere calculation, split by player across forked worker processes.
+
+Access rules are closures over world objects and can't be sent to another process, so the workers are forked from the
+generating process and inherit the whole multiworld. Each worker owns the locations of a subset of players and keeps
+its own CollectionState, into which every location collected by the caller is replayed between spheres. No mutable state
+is shared, and rules that depend on other players' items still see them.
+"""
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import typing
+from multiprocessing.connection import Connection
+
+if typing.TYPE_CHECKING:
+    from BaseClasses import CollectionState, Location
+
+
+def can_fork() -> bool:
+    return "fork" in multiprocessing.get_all_start_methods()
+
+
+def _work(connection: Connection, locations: typing.List[Location], state: CollectionState) -> None:
+    while True:
+        message: typing.Optional[typing.Tuple[typing.List[int], typing.List[int]]] = connection.recv()
+        if message is None:
+            break
+        collect, candidates = message
+        try:
+            for index in collect:
+                location = locations[index]
+                state.collect(location.item, True, location)
+            connection.send([index for index in candidates if locations[index].can_reach(state)])
+        except BaseException as e:
+            connection.send(RuntimeError(f"Sphere worker failed: {e!r}"))
+            raise
+
+
+class SpherePool:
+    """
+    Forked worker processes that find the reachable locations of each sphere in parallel.
+
+    Usage mirrors a serial sphere loop: call reachable() to get the reachable locations out of the candidates, then pass
+    the locations whose items were collected into the caller's state to collect() before the next reachable() call.
+    """
+    locations: typing.List[Location]
+    location_indices: typing.Dict[Location, int]
+    player_workers: typing.Dict[int, int]
+    connections: typing.List[Connection]
+    processes: typing.List[multiprocessing.Process]
+    pending: typing.List[int]
+
+    def __init__(self, state: CollectionState, candidates: typing.Iterable[Location], processes: int) -> None:
+        """
+        Fork the workers. Candidates are only used to balance the players between the workers.
+
+        :param state: The state to start from. Each worker continues from its own copy of it.
+        :param candidates: The locations that are going to be checked for reachability.
+        :param processes: The number of worker processes to fork.
+        """
+        multiworld = state.multiworld
+        self.locations = list(multiworld.get_locations())
+        self.location_indices = {location: index for index, location in enumerate(self.locations)}
+
+        location_counts: typing.Dict[int, int] = {player: 0 for player in multiworld.get_all_ids()}
+        for location in candidates:
+            location_counts[location.player] += 1
+        processes = max(1, min(processes, len(location_counts)))
+        loads = [0] * processes
+        self.player_workers = {}
+        # greedily give the player with the most locations to the least loaded worker
+        for player, count in sorted(location_counts.items(), key=lambda player_count: (-player_count[1],
+                                                                                       player_count[0])):
+            worker = loads.index(min(loads))
+            self.player_workers[player] = worker
+            loads[worker] += count
+
+        context = multiprocessing.get_context("fork")
+        self.connections = []
+        self.processes = []
+        for _ in range(processes):
+            connection, worker_connection = context.Pipe()
+            # arguments of forked processes are inherited instead of pickled, so each worker mutates its own state
+            process = context.Process(target=_work, args=(worker_connection, self.locations, state), daemon=True)
+            process.start()
+            worker_connection.close()
+            self.connections.append(connection)
+            self.processes.append(process)
+        self.pending = []
+        logging.debug(f"Started {processes} sphere worker processes.")
+
+    def __enter__(self) -> SpherePool:
+        return self
+
+    def __exit__(self, *args: typing.Any) -> None:
+        self.close()
+
+    def collect(self, locations: typing.Iterable[Location]) -> None:
+        """Queue locations whose items got collected, to be replayed in every worker before the next reachable()."""
+        self.pending.extend(self.location_indices[location] for location in locations)
+
+    def reachable(self, candidates: typing.Iterable[Location]) -> typing.List[Location]:
+        """Return the candidates that are reachable, in no particular order."""
+        worker_candidates: typing.List[typing.List[int]] = [[] for _ in self.connections]
+        for location in candidates:
+            worker_candidates[self.player_workers[location.player]].append(self.location_indices[location])
+        for connection, indices in zip(self.connections, worker_candidates):
+            connection.send((self.pending, indices))
+        self.pending = []
+
+        reachable: typing.List[Location] = []
+        for connection in self.connections:
+            result: typing.Union[typing.List[int], BaseException] = connection.recv()
+            if isinstance(result, BaseException):
+                raise result
+            reachable.extend(self.locations[index] for index in result)
+        return reachable
+
+    def close(self) -> None:
+        for connection in self.connections:
+            try:
+                connection.send(None)
+            except OSError:
+                pass  # worker already gone
+            connection.close()
+        for process in self.processes:
+            process.join()
+        self.connections.clear()
+        self.processes.clear()
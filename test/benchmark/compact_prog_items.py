@@ -0,0 +1,101 @@
+def run_compact_prog_items_benchmark(players: int = 20, games: tuple[str, ...] = (), copies: int = 1000,
+                                     sweeps: int = 20) -> None:
+    """
+    Benchmark worlds with compact_prog_items, comparing ItemCounts against a Counter for copying states, evaluating
+    every location's access rule, CollectionState.has and a full fill.
+
+    :param players: Number of players in the benchmarked multiworld.
+    :param games: Games to cycle through when assigning players. Defaults to games with compact_prog_items.
+    :param copies: Number of copies taken of the all_state for the copy benchmark.
+    :param sweeps: Number of times every location's access rule and item name are checked against the all_state.
+    """
+    import logging
+    import tracemalloc
+    import typing
+
+    from multiworld import create_multiworld
+    from time_it import TimeIt
+
+    from Fill import distribute_items_restrictive
+    from Utils import init_logging
+    from worlds import AutoWorldRegister
+    from worlds.AutoWorld import call_all
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    if not games:
+        games = ("Timespinner", "Super Mario 64")
+    world_types = [AutoWorldRegister.world_types[game] for game in games]
+    if not all(world_type.compact_prog_items for world_type in world_types):
+        logger.warning("Not all benchmarked games use compact_prog_items.")
+    original = [world_type.__dict__.get("compact_prog_items") for world_type in world_types]
+
+    results: typing.Dict[str, typing.Dict[str, float]] = {}
+    for name, compact in (("Counter", False), ("ItemCounts", True)):
+        for world_type in world_types:
+            world_type.compact_prog_items = compact
+        result = results[name] = {}
+
+        multiworld = create_multiworld(players, games)
+        all_state = multiworld.get_all_state(False)
+        for player in multiworld.player_ids:
+            all_state.update_reachable_regions(player)
+
+        tracemalloc.start()
+        with TimeIt(f"{copies} {name} copies of all_state", logger) as t:
+            # touch one player's items, as a fill step usually does
+            copied_states = [all_state.copy() for _ in range(copies)]
+            for copied_state in copied_states:
+                copied_state.add_item("Benchmark Item", 1)
+        result["copy"] = t.dif
+        result["memory"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        del copied_states
+
+        locations = multiworld.get_locations()
+        with TimeIt(f"{sweeps} {name} evaluations of {len(locations)} access rules", logger) as t:
+            for _ in range(sweeps):
+                for location in locations:
+                    location.access_rule(all_state)
+        result["rules"] = t.dif
+
+        item_names = [(item_name, player) for player, world in multiworld.worlds.items()
+                      for item_name in world.item_name_to_id]
+        with TimeIt(f"{sweeps} {name} checks of {len(item_names)} item names", logger) as t:
+            for _ in range(sweeps):
+                for item_name, player in item_names:
+                    all_state.has(item_name, player)
+        result["has"] = t.dif
+
+        fill_multiworld = create_multiworld(players, games)
+        with TimeIt(f"{name} fill of {players} players", logger) as t:
+            distribute_items_restrictive(fill_multiworld)
+            call_all(fill_multiworld, "post_fill")
+        result["fill"] = t.dif
+
+    for world_type, compact in zip(world_types, original):
+        if compact is None:
+            del world_type.compact_prog_items  # inherited from World
+        else:
+            world_type.compact_prog_items = compact
+    counter, item_counts = results["Counter"], results["ItemCounts"]
+    for metric in ("copy", "rules", "has", "fill"):
+        logger.info(f"{metric}: ItemCounts speedup {counter[metric] / item_counts[metric]:.2f}x")
+    logger.info(f"copy peak memory: {counter['memory'] / 1024 / 1024:.2f} MiB with Counter, "
+                f"{item_counts['memory'] / 1024 / 1024:.2f} MiB with ItemCounts")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from path_change import change_home
+    change_home()
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--players", type=int, default=20)
+    parser.add_argument("--copies", type=int, default=1000)
+    parser.add_argument("--sweeps", type=int, default=20)
+    parser.add_argument("--games", nargs="*", default=())
+    args = parser.parse_args()
+    run_compact_prog_items_benchmark(args.players, tuple(args.games), args.copies, args.sweeps)
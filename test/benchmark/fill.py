@@ -0,0 +1,92 @@
+def run_fill_benchmark(players: int = 50, games: tuple[str, ...] = (), seed: int = 0) -> None:
+    """
+    Benchmark distribute_items_restrictive on a large multiworld, comparing fill_restrictive replaying the previous
+    maximum exploration state's sweep order against sweeping each maximum exploration state from scratch.
+    Both fills have to place every item at the same location.
+
+    :param players: Number of players in the benchmarked multiworld.
+    :param games: Games to cycle through when assigning players. Defaults to a set of fast-generating games.
+    :param seed: Seed of the benchmarked multiworld.
+    """
+    import logging
+    import typing
+
+    from multiworld import create_multiworld, default_games
+    from time_it import TimeIt
+
+    import Fill
+    from BaseClasses import CollectionState, Item, Location
+    from Utils import init_logging
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    if not games:
+        games = default_games
+
+    replaying_sweep_from_pool = Fill.sweep_from_pool
+
+    def sweep_from_scratch(base_state: CollectionState, itempool: typing.Sequence[Item] = tuple(),
+                           locations: typing.Optional[typing.List[Location]] = None,
+                           sweep_order: typing.Optional[typing.List[typing.List[Location]]] = None) -> CollectionState:
+        return replaying_sweep_from_pool(base_state, itempool, locations)
+
+    implementations = {
+        "sweep from scratch": sweep_from_scratch,
+        "replayed sweep order": replaying_sweep_from_pool,
+    }
+
+    with TimeIt(f"Creating a {players} player multiworld", logger):
+        multiworld = create_multiworld(players, games, seed)
+    # creating the same large multiworld twice isn't guaranteed to give the same result, so the same multiworld is
+    # filled by both implementations, undoing the first fill in between
+    start_state = multiworld.state.copy()
+    start_items = {location: location.item for location in multiworld.get_locations()}
+    start_locked = {location: location.locked for location in start_items}
+    start_itempool = multiworld.itempool.copy()
+    start_random_states = [multiworld.random.getstate()] + [world.random.getstate()
+                                                            for world in multiworld.worlds.values()]
+
+    fill_times: typing.Dict[str, float] = {}
+    placements: typing.Dict[str, typing.Dict[typing.Tuple[int, str], typing.Optional[typing.Tuple[int, str]]]] = {}
+    for name, implementation in implementations.items():
+        multiworld.state = start_state.copy()
+        for location, item in start_items.items():
+            location.item = item
+            location.locked = start_locked[location]
+            if item:
+                item.location = location
+        for item in start_itempool:
+            item.location = None
+        multiworld.itempool = start_itempool.copy()
+        multiworld.random.setstate(start_random_states[0])
+        for world, random_state in zip(multiworld.worlds.values(), start_random_states[1:]):
+            world.random.setstate(random_state)
+
+        Fill.sweep_from_pool = implementation
+        try:
+            with TimeIt(f"{name} fill of {players} players", logger) as t:
+                Fill.distribute_items_restrictive(multiworld)
+        finally:
+            Fill.sweep_from_pool = replaying_sweep_from_pool
+        fill_times[name] = t.dif
+        placements[name] = {(location.player, location.name): (location.item.player, location.item.name)
+                            if location.item else None for location in multiworld.get_locations()}
+
+    if placements["sweep from scratch"] != placements["replayed sweep order"]:
+        logger.error("Fills placed items differently.")
+    logger.info(f"fill speedup: {fill_times['sweep from scratch'] / fill_times['replayed sweep order']:.2f}x")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from path_change import change_home
+    change_home()
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--players", type=int, default=50)
+    parser.add_argument("--games", nargs="*", default=())
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    run_fill_benchmark(args.players, tuple(args.games), args.seed)
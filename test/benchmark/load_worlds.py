@@ -1,27 +1,199 @@
-def run_load_worlds_benchmark():
-    """List worlds and their load time.
-    Note that any first-time imports will be attributed to that world, as it is cached afterwards.
-    Likely best used with isolated worlds to measure their time alone."""
-    import logging
+"""
+Startup benchmark for worlds.
+Imports each world source in a fresh process, with only the core modules imported before, and reports its import time,
+number of modules it imported, memory it allocated and the time to build its data package, as well as the same for
+importing the core with all worlds at once. Results can be saved as a baseline and later runs compared against it,
+failing if a world got slower or bigger than its baseline or takes longer than a fixed budget to import.
+
+Run with `python test/benchmark/load_worlds.py --baseline load_worlds.json --save` once from the AP folder,
+then `python test/benchmark/load_worlds.py --baseline load_worlds.json` to check for regressions.
+"""
+import typing
+
+Measurement = typing.Dict[str, float]
+"""import: seconds, modules: count, memory: bytes, data_package: seconds"""
+
+all_worlds = "(all worlds)"
+"""Name of the measurement of importing the core with all worlds, like Launcher, Generate and the WebHost do."""
 
-    from Utils import init_logging
+metrics = ("import", "modules", "memory", "data_package")
+noise: Measurement = {"import": .05, "modules": 2, "memory": 512 * 1024, "data_package": .01}
+"""Differences to the baseline that are not reported as regressions, whatever the tolerance."""
 
-    # get some general imports cached, to prevent it from being attributed to one world.
+
+def _import_core() -> None:
+    """Import what all worlds use, to not attribute it to the first world that imports it."""
     import orjson
     orjson.loads("{}")  # orjson runs initialization on first use
 
-    import BaseClasses, Launcher, Fill
+    import BaseClasses, Fill  # noqa
 
-    from worlds import world_sources
+
+def _measure(path: typing.Optional[str], trace_memory: bool) -> typing.Optional[Measurement]:
+    """Import the world source at path, or all worlds if None, and measure it. Run in a new process.
+    Memory is only measured if trace_memory, as tracing slows down everything else."""
+    import os
+    import sys
+    import time
+    import tracemalloc
+    import warnings
+
+    warnings.simplefilter("ignore")
+    if path:
+        os.environ["AP_LAZY_WORLDS"] = "1"  # only import the core, so the world source can be imported on its own
+        _import_core()
+        import worlds
+        import Launcher  # noqa
+        loaded_before = set(worlds.get_loaded_world_types())
+        world_source = next(world_source for world_source in worlds.world_sources if world_source.path == path)
+    else:
+        os.environ.pop("AP_LAZY_WORLDS", None)  # the core imports all worlds, so it is part of the measurement
+
+    modules = len(sys.modules)
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    if path:
+        if not world_source.load():
+            return None
+    else:
+        _import_core()
+        import worlds
+        loaded_before = set()
+    import_time = time.perf_counter() - start
+    if trace_memory:
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return {"memory": memory}
+
+    new_worlds = [world for game, world in worlds.get_loaded_world_types().items() if game not in loaded_before]
+    start = time.perf_counter()
+    for world in new_worlds:
+        world.get_data_package_data()
+    return {"import": import_time, "modules": len(sys.modules) - modules,
+            "data_package": time.perf_counter() - start}
+
+
+def measure(path: typing.Optional[str], repeat: int = 1) -> typing.Optional[Measurement]:
+    """Measure the world source at path, or all worlds if None, each in a new process.
+    Times are the minimum of repeat runs. None if the world could not be imported."""
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing import get_context
+
+    result: typing.Optional[Measurement] = None
+    for trace_memory in [False] * repeat + [True]:
+        with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as pool:
+            run = pool.submit(_measure, path, trace_memory).result()
+        if run is None:
+            return None
+        if result is None:
+            result = run
+        else:
+            result = {metric: min(value, result[metric]) if metric in result else value
+                      for metric, value in {**result, **run}.items()}
+    return result
+
+
+def compare(name: str, current: Measurement, baseline: typing.Optional[Measurement], tolerance: float,
+            budget: typing.Optional[float]) -> typing.List[str]:
+    """Regressions of current against baseline and budget, as messages."""
+    regressions: typing.List[str] = []
+    if budget is not None and name != all_worlds and current["import"] > budget:
+        regressions.append(f"{name} took {current['import']:.3f} seconds to import, budget is {budget:.3f}.")
+    if baseline:
+        for metric in metrics:
+            if metric in baseline and current[metric] > baseline[metric] * (1 + tolerance) + noise[metric]:
+                regressions.append(f"{name} {metric} went from {baseline[metric]:.6g} to {current[metric]:.6g}.")
+    return regressions
+
+
+def run_load_worlds_benchmark(baseline_path: typing.Optional[str] = None, save: bool = False,
+                              tolerance: float = .25, budget: typing.Optional[float] = None,
+                              repeat: int = 1, only: typing.Sequence[str] = ()) -> bool:
+    """List worlds and their startup cost.
+    Note that any first-time imports besides the core will be attributed to that world, like other worlds it imports.
+
+    :param baseline_path: JSON file of a previous run to compare against.
+    :param save: Write the results to baseline_path instead of comparing against it.
+    :param tolerance: Relative increase over the baseline that is reported as a regression.
+    :param budget: Seconds any single world may take to import.
+    :param repeat: Runs per world, times are the fastest run.
+    :param only: Names of world sources to measure, all if empty.
+    :return: If there were no regressions.
+    """
+    import json
+    import logging
+    import os
+
+    from Utils import format_SI_prefix, init_logging, tuplize_version, version_tuple
 
     init_logging("Benchmark Runner")
     logger = logging.getLogger("Benchmark")
 
-    for module in world_sources:
-        logger.info(f"{module} took {module.time_taken:.4f} seconds.")
+    baseline: typing.Dict[str, Measurement] = {}
+    if baseline_path and not save and os.path.exists(baseline_path):
+        with open(baseline_path, encoding="utf-8") as f:
+            data = json.load(f)
+        baseline = data["worlds"]
+        if tuplize_version(data["version"]) != version_tuple:
+            logger.warning(f"Baseline is from version {data['version']}.")
+
+    results: typing.Dict[str, Measurement] = {}
+    failed: typing.List[str] = []
+    # importing all worlds also indexes them, so each can then be imported on its own
+    all_result = measure(None, 1 if only else repeat)
+    if all_result is None:
+        raise RuntimeError("Could not import worlds")
+    if not only:
+        results[all_worlds] = all_result
+
+    os.environ["AP_LAZY_WORLDS"] = "1"  # to only list world sources here
+    from worlds import world_sources
+
+    for world_source in world_sources:
+        name = os.path.basename(world_source.path)
+        if only and name not in only:
+            continue
+        result = measure(world_source.path, repeat)
+        if result is None:
+            failed.append(name)
+        else:
+            results[name] = result
+
+    logger.info(f"{'World':<40} {'import':>9} {'modules':>7} {'memory':>9} {'datapackage':>11}")
+    for name, result in sorted(results.items(), key=lambda item: item[1]["import"], reverse=True):
+        logger.info(f"{name:<40} {result['import']:8.3f}s {int(result['modules']):7} "
+                    f"{format_SI_prefix(result['memory'], 1024):>7}iB {result['data_package']:10.4f}s")
+    if failed:
+        logger.warning(f"Could not import {', '.join(failed)}.")
+
+    regressions = [regression for name, result in results.items()
+                   for regression in compare(name, result, baseline.get(name), tolerance, budget)]
+    for regression in regressions:
+        logger.warning(regression)
+
+    if baseline_path and save:
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump({"version": ".".join(str(part) for part in version_tuple), "worlds": results}, f, indent=1)
+        logger.info(f"Saved baseline to {baseline_path}.")
+    return not regressions
 
 
 if __name__ == "__main__":
+    import argparse
+    import sys
+
     from path_change import change_home
     change_home()
-    run_load_worlds_benchmark()
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--baseline", help="JSON file of results to compare against")
+    parser.add_argument("--save", action="store_true", help="save the results to --baseline instead")
+    parser.add_argument("--tolerance", type=float, default=.25,
+                        help="relative increase over the baseline that is a regression")
+    parser.add_argument("--budget", type=float, help="seconds any single world may take to import")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per world, times are the fastest run")
+    parser.add_argument("worlds", nargs="*", help="world sources to measure, like 'apquest' or 'clique.apworld'")
+    args = parser.parse_args()
+    sys.exit(not run_load_worlds_benchmark(args.baseline, args.save, args.tolerance, args.budget, args.repeat,
+                                           args.worlds))
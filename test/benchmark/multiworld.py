@@ -0,0 +1,42 @@
+import typing
+
+if typing.TYPE_CHECKING:
+    from BaseClasses import MultiWorld
+
+default_games = ("Hollow Knight", "Timespinner", "Super Mario 64", "Stardew Valley")
+"""Games that generate quickly and have a good amount of logic, used by benchmarks that need a large multiworld."""
+
+
+def create_multiworld(players: int, games: typing.Sequence[str] = default_games, seed: int = 0,
+                      steps: typing.Sequence[str] = ("generate_early", "create_regions", "create_items", "set_rules",
+                                                     "connect_entrances", "generate_basic", "pre_fill")
+                      ) -> "MultiWorld":
+    """
+    Create a multiworld with default options, cycling through games when assigning players, and run steps on it.
+
+    :param players: Number of players in the multiworld.
+    :param games: Games to cycle through.
+    :param seed: Seed of the multiworld.
+    :param steps: Generation steps to call on the multiworld.
+    """
+    import argparse
+
+    from BaseClasses import CollectionState, MultiWorld
+    from worlds.AutoWorld import AutoWorldRegister, call_all
+
+    multiworld = MultiWorld(players)
+    multiworld.game = {player: games[player % len(games)] for player in multiworld.player_ids}
+    multiworld.player_name = {player: f"Tester{player}" for player in multiworld.player_ids}
+    multiworld.set_seed(seed)
+    args = argparse.Namespace()
+    for player in multiworld.player_ids:
+        world_type = AutoWorldRegister.world_types[multiworld.game[player]]
+        for name, option in world_type.options_dataclass.type_hints.items():
+            player_options = getattr(args, name, {})
+            player_options[player] = option.from_any(option.default)
+            setattr(args, name, player_options)
+    multiworld.set_options(args)
+    multiworld.state = CollectionState(multiworld)
+    for step in steps:
+        call_all(multiworld, step)
+    return multiworld
@@ -0,0 +1,109 @@
+def run_encode_benchmark(traffic_log: str = "", repeat: int = 20) -> None:
+    """
+    Benchmark the NetUtils.encode in use (_speedups.encode if it is available) against the pure python encode, and the
+    decode of the same messages, on recorded or generated server traffic.
+
+    :param traffic_log: Server log written with --log_network, whose outgoing messages are re-encoded. If not given,
+        traffic is generated: ItemSend PrintJSON floods, ReceivedItems, hints and the full DataPackage.
+    :param repeat: Number of times each message is encoded and decoded.
+    """
+    import logging
+    import random
+    import typing
+
+    from time_it import TimeIt
+
+    import NetUtils
+    from NetUtils import Hint, JSONTypes, NetworkItem, add_json_item, add_json_location, add_json_text, decode
+    from Utils import init_logging
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    def generate_traffic() -> typing.List[typing.Any]:
+        import worlds
+
+        rng = random.Random(0)
+        traffic: typing.List[typing.Any] = []
+        for _ in range(200):
+            print_jsons = []
+            for _ in range(140):  # chunk size used by register_location_checks
+                item = NetworkItem(rng.randrange(1 << 20), rng.randrange(1 << 20), rng.randint(1, 100), 1)
+                receiving = rng.randint(1, 100)
+                parts: typing.List[NetUtils.JSONMessagePart] = []
+                add_json_text(parts, item.player, type=JSONTypes.player_id)
+                add_json_text(parts, " sent ")
+                add_json_item(parts, item.item, receiving, item.flags)
+                add_json_text(parts, " to ")
+                add_json_text(parts, receiving, type=JSONTypes.player_id)
+                add_json_text(parts, " (")
+                add_json_location(parts, item.location, item.player)
+                add_json_text(parts, ")")
+                print_jsons.append({"cmd": "PrintJSON", "data": parts, "type": "ItemSend",
+                                    "receiving": receiving, "item": item})
+            traffic.append(print_jsons)
+        for _ in range(200):
+            traffic.append([{"cmd": "ReceivedItems", "index": 0,
+                             "items": [NetworkItem(rng.randrange(1 << 20), rng.randrange(1 << 20), rng.randint(1, 100))
+                                       for _ in range(300)]}])
+        traffic.append([{"cmd": "SetReply", "key": "_read_hints_0_1", "value": {
+            Hint(rng.randint(1, 100), rng.randint(1, 100), location, rng.randrange(1 << 20), rng.random() < 0.5)
+            for location in range(500)}}])
+        traffic.append([{"cmd": "DataPackage", "data": worlds.network_data_package}])
+        return traffic
+
+    def load_traffic(path: str) -> typing.List[typing.Any]:
+        traffic = []
+        with open(path, encoding="utf-8-sig") as f:
+            for line in f:
+                for marker in ("Outgoing message: ", "Outgoing broadcast: "):
+                    _, found, message = line.partition(marker)
+                    if found:
+                        traffic.append(decode(message))
+                        break
+        return traffic
+
+    if traffic_log:
+        with TimeIt(f"Loading traffic from {traffic_log}", logger):
+            traffic = load_traffic(traffic_log)
+    else:
+        with TimeIt("Generating traffic", logger):
+            traffic = generate_traffic()
+
+    implementations = {"pure python encode": NetUtils._encode}
+    if NetUtils.encode is not NetUtils._encode:
+        implementations["_speedups encode"] = NetUtils.encode
+    else:
+        logger.warning("_speedups not available, only benchmarking the pure python encode.")
+
+    encode_times: typing.Dict[str, float] = {}
+    encoded: typing.Dict[str, typing.List[str]] = {}
+    for name, encode in implementations.items():
+        with TimeIt(f"{repeat} times {name} of {len(traffic)} messages", logger) as t:
+            for _ in range(repeat):
+                encoded[name] = [encode(message) for message in traffic]
+        encode_times[name] = t.dif
+
+    if len(set(map(tuple, encoded.values()))) > 1:
+        logger.error("Encoded messages differ between implementations.")
+    data = encoded["pure python encode"]
+    logger.info(f"{sum(map(len, data)) / 1024 / 1024:.2f} MiB of JSON in {len(data)} messages.")
+    with TimeIt(f"{repeat} times decode of {len(traffic)} messages", logger):
+        for _ in range(repeat):
+            for message in data:
+                decode(message)
+    if "_speedups encode" in encode_times:
+        logger.info(f"encode speedup: {encode_times['pure python encode'] / encode_times['_speedups encode']:.2f}x")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from path_change import change_home
+    change_home()
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--traffic_log", default="", help="server log written with --log_network")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    run_encode_benchmark(args.traffic_log, args.repeat)
@@ -0,0 +1,87 @@
+def run_remove_items_benchmark(players: int = 20, games: tuple[str, ...] = (), removals: int = 500) -> None:
+    """
+    Benchmark updating reachable regions after CollectionState.remove, comparing the re-verification of the previously
+    reachable regions against discarding them and searching the region graph again, like remove did before.
+
+    :param players: Number of players in the benchmarked multiworld.
+    :param games: Games to cycle through when assigning players. Defaults to a set of fast-generating games.
+    :param removals: Number of advancement items removed, each from a fresh copy of the state.
+    """
+    import logging
+    import random
+    import typing
+
+    from multiworld import create_multiworld, default_games
+    from time_it import TimeIt
+
+    from BaseClasses import CollectionState, Item, Region
+    from Utils import init_logging
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    if not games:
+        games = default_games
+
+    recheck_remove = CollectionState.remove
+
+    def discarding_remove(self: CollectionState, item: Item) -> None:
+        changed = self.multiworld.worlds[item.player].remove(self, item)
+        if changed:
+            self.reachable_regions[item.player] = set()
+            self.blocked_connections[item.player] = set()
+            self.stale[item.player] = True
+
+    implementations: typing.Dict[str, typing.Callable[[CollectionState, Item], None]] = {
+        "full search": discarding_remove,
+        "re-verify": recheck_remove,
+    }
+
+    with TimeIt(f"Creating a {players} player multiworld", logger):
+        multiworld = create_multiworld(players, games)
+    items = [item for item in multiworld.itempool if item.advancement]
+    rng = random.Random(0)
+    removed_items = [rng.choice(items) for _ in range(removals)]
+
+    scenarios = (("all_state", items, False), ("half the items", items[::2], False),
+                 ("items collected between searches", items, True))
+    for name, collected, search_between in scenarios:
+        state = CollectionState(multiworld)
+        for item in collected:
+            state.collect(item, True)
+            if search_between:
+                state.update_reachable_regions(item.player)
+        for player in multiworld.player_ids:
+            state.update_reachable_regions(player)
+        to_remove = [item for item in removed_items if state.has(item.name, item.player)]
+        copies = [[state.copy() for _ in to_remove] for _ in implementations]
+
+        times: typing.Dict[str, float] = {}
+        results: typing.Dict[str, typing.List[typing.Set[Region]]] = {}
+        for (implementation_name, implementation), states in zip(implementations.items(), copies):
+            CollectionState.remove = implementation  # type: ignore[method-assign]
+            with TimeIt(f"{len(to_remove)} removals from {name} with {implementation_name}", logger) as t:
+                for copied_state, item in zip(states, to_remove):
+                    copied_state.remove(item)
+                    copied_state.update_reachable_regions(item.player)
+            times[implementation_name] = t.dif
+            results[implementation_name] = [copied_state.reachable_regions[item.player]
+                                            for copied_state, item in zip(states, to_remove)]
+        CollectionState.remove = recheck_remove  # type: ignore[method-assign]
+
+        assert results["full search"] == results["re-verify"], "Implementations reached different regions"
+        logger.info(f"{name}: re-verify speedup {times['full search'] / times['re-verify']:.2f}x")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from path_change import change_home
+    change_home()
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--players", type=int, default=20)
+    parser.add_argument("--removals", type=int, default=500)
+    parser.add_argument("--games", nargs="*", default=())
+    args = parser.parse_args()
+    run_remove_items_benchmark(args.players, tuple(args.games), args.removals)
@@ -0,0 +1,301 @@
+"""
+Load benchmark for MultiServer.
+Generates a multiworld, hosts it in a separate MultiServer process and connects simulated clients to it, which send
+LocationChecks, hints (LocationScouts with create_as_hint) and data storage Set/Get at fixed rates.
+Reports latency percentiles per request type, message throughput and the CPU time the server process used.
+
+Run with `python test/benchmark/server_load.py --players 50 --duration 30` from the AP folder.
+"""
+import asyncio
+import collections
+import json
+import random
+import sys
+import time
+import typing
+from pathlib import Path
+
+if typing.TYPE_CHECKING:
+    from multiprocessing.managers import DictProxy  # noqa
+    from threading import Event
+
+
+def _generate(game: str, players: int, output_dir: str) -> Path:
+    """Generate a multiworld with players slots of game, named Player1 to PlayerN."""
+    from tempfile import TemporaryDirectory
+
+    import Generate
+    import Main
+
+    with TemporaryDirectory() as players_dir:
+        for n in range(1, players + 1):
+            with open(Path(players_dir) / f"{n}.yaml", "w", encoding="utf-8") as f:
+                f.write(json.dumps({"name": f"Player{n}", "game": game, game: {}}))
+        original_argv = sys.argv
+        sys.argv = [sys.argv[0], "--seed", "0", "--player_files_path", players_dir, "--outputpath", output_dir]
+        try:
+            Main.main(*Generate.main())
+        finally:
+            sys.argv = original_argv
+    return next(Path(output_dir).glob("*.zip"))
+
+
+def _serve(multidata: Path, port: int, ready: "Event", start: "Event", stop: "Event",
+           results: "DictProxy[str, float]") -> None:
+    """Run MultiServer until stop is set and store the CPU time it used between start and stop in results."""
+    import os
+    import warnings
+
+    warnings.simplefilter("ignore")
+    from MultiServer import main, parse_args
+
+    sys.argv = [sys.argv[0], str(multidata), "--host", "127.0.0.1", "--port", str(port), "--loglevel", "warning"]
+    r, w = os.pipe()
+    sys.stdin = os.fdopen(r, "r")
+
+    async def measure() -> None:
+        await asyncio.sleep(.01)  # switch back to main() once more so the server is listening
+        ready.set()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, start.wait)
+        cpu_start = time.process_time()
+        await loop.run_in_executor(None, stop.wait)
+        results["cpu"] = time.process_time() - cpu_start
+        os.fdopen(w, "w").write("/exit")
+
+    async def run() -> None:
+        await asyncio.gather(main(parse_args()), measure())
+
+    asyncio.run(run())
+
+
+class LoadClient:
+    """Simulated game client, which keeps requests of every type in flight at a fixed rate and records the time
+    until the server answered each of them."""
+
+    def __init__(self, address: str, game: str, slot: str, rng: random.Random) -> None:
+        self.address = address
+        self.game = game
+        self.slot = slot
+        self.rng = rng
+        self.latencies: typing.Dict[str, typing.List[float]] = {"check": [], "hint": [], "set": [], "get": []}
+        self.messages_sent = 0
+        self.messages_received = 0
+        self.missing_locations: typing.List[int] = []
+        self.all_locations: typing.List[int] = []
+        self._socket: typing.Any = None
+        self._pending_checks: typing.Dict[int, float] = {}
+        self._pending_hints: typing.Deque[float] = collections.deque()
+        self._pending_data: typing.Dict[str, float] = {}
+        self._request_id = 0
+
+    async def connect(self) -> None:
+        import websockets
+
+        self._socket = await websockets.connect(f"ws://{self.address}", ping_timeout=None, ping_interval=None,
+                                                max_size=None)
+        await self._socket.recv()  # RoomInfo
+        await self._send({"cmd": "Connect", "game": self.game, "name": self.slot, "password": None, "uuid": "",
+                          "version": {"class": "Version", "major": 0, "minor": 6, "build": 0},
+                          "items_handling": 0b111, "tags": [], "slot_data": False})
+        while True:
+            for msg in json.loads(await self._socket.recv()):
+                if msg["cmd"] == "Connected":
+                    self.missing_locations = list(msg["missing_locations"])
+                    self.all_locations = self.missing_locations + list(msg["checked_locations"])
+                    self.rng.shuffle(self.missing_locations)
+                    return
+                if msg["cmd"] == "ConnectionRefused":
+                    raise ConnectionError(", ".join(msg["errors"]))
+
+    async def _send(self, msg: typing.Dict[str, typing.Any]) -> None:
+        await self._socket.send(json.dumps([msg]))
+        self.messages_sent += 1
+
+    def _next_id(self) -> str:
+        self._request_id += 1
+        return f"{self.slot}_{self._request_id}"
+
+    async def receive(self) -> None:
+        import websockets
+
+        try:
+            async for data in self._socket:
+                now = time.perf_counter()
+                for msg in json.loads(data):
+                    self.messages_received += 1
+                    cmd = msg["cmd"]
+                    if cmd == "RoomUpdate":
+                        for location in msg.get("checked_locations", ()):
+                            sent = self._pending_checks.pop(location, None)
+                            if sent is not None:
+                                self.latencies["check"].append(now - sent)
+                    elif cmd == "LocationInfo":
+                        if self._pending_hints:
+                            self.latencies["hint"].append(now - self._pending_hints.popleft())
+                    elif cmd in ("SetReply", "Retrieved"):
+                        sent = self._pending_data.pop(msg.get("benchmark_id", ""), None)
+                        if sent is not None:
+                            self.latencies["set" if cmd == "SetReply" else "get"].append(now - sent)
+        except websockets.ConnectionClosed:
+            pass
+
+    async def _check(self) -> None:
+        if self.missing_locations:
+            location = self.missing_locations.pop()
+            self._pending_checks[location] = time.perf_counter()
+            await self._send({"cmd": "LocationChecks", "locations": [location]})
+
+    async def _hint(self) -> None:
+        self._pending_hints.append(time.perf_counter())
+        await self._send({"cmd": "LocationScouts", "locations": [self.rng.choice(self.all_locations)],
+                          "create_as_hint": 2})
+
+    async def _set(self) -> None:
+        request_id = self._next_id()
+        self._pending_data[request_id] = time.perf_counter()
+        await self._send({"cmd": "Set", "key": f"benchmark_{self.slot}", "default": 0, "want_reply": True,
+                          "operations": [{"operation": "add", "value": 1}], "benchmark_id": request_id})
+
+    async def _get(self) -> None:
+        request_id = self._next_id()
+        self._pending_data[request_id] = time.perf_counter()
+        await self._send({"cmd": "Get", "keys": [f"benchmark_{self.slot}", "_read_hints_0_1"],
+                          "benchmark_id": request_id})
+
+    async def _repeat(self, action: typing.Callable[[], typing.Awaitable[None]], rate: float, end: float) -> None:
+        if rate <= 0:
+            return
+        interval = 1 / rate
+        next_time = time.perf_counter() + self.rng.random() * interval  # spread clients out over the interval
+        while next_time < end:
+            await asyncio.sleep(max(0., next_time - time.perf_counter()))
+            await action()
+            next_time += interval
+
+    async def run(self, duration: float, check_rate: float, hint_rate: float, data_rate: float) -> None:
+        end = time.perf_counter() + duration
+        await asyncio.gather(
+            self._repeat(self._check, check_rate, end),
+            self._repeat(self._hint, hint_rate, end),
+            self._repeat(self._set, data_rate / 2, end),
+            self._repeat(self._get, data_rate / 2, end),
+        )
+
+    async def close(self) -> None:
+        await self._socket.close()
+
+    @property
+    def unanswered(self) -> int:
+        return len(self._pending_checks) + len(self._pending_hints) + len(self._pending_data)
+
+
+def percentile(values: typing.Sequence[float], p: float) -> float:
+    """Nearest-rank percentile of sorted values."""
+    return values[min(len(values) - 1, max(0, int(round(p / 100 * len(values))) - 1))]
+
+
+def run_server_load_benchmark(players: int = 20, game: str = "APQuest", duration: float = 10.,
+                              check_rate: float = 2., hint_rate: float = .2, data_rate: float = 1.,
+                              port: int = 38281, seed: int = 0) -> None:
+    """
+    :param players: Number of slots generated and simulated clients connected, one per slot.
+    :param game: Game of every slot.
+    :param duration: Seconds each client sends requests for.
+    :param check_rate: LocationChecks per second per client, each for one location, until all are checked.
+    :param hint_rate: LocationScouts with create_as_hint per second per client.
+    :param data_rate: Data storage requests per second per client, half Set and half Get.
+    :param port: Port the server listens on.
+    :param seed: Seed of the clients' choices.
+    """
+    import logging
+    from multiprocessing import Manager, Process, set_start_method
+    from tempfile import TemporaryDirectory
+
+    from time_it import TimeIt
+
+    from Utils import init_logging
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    try:
+        set_start_method("spawn")
+    except RuntimeError:
+        pass
+
+    with TemporaryDirectory() as tempdir:
+        with TimeIt(f"Generating {players} players of {game}", logger):
+            multidata = _generate(game, players, tempdir)
+
+        manager = Manager()
+        ready, start, stop = manager.Event(), manager.Event(), manager.Event()
+        results: "DictProxy[str, float]" = manager.dict()
+        server = Process(target=_serve, args=(multidata, port, ready, start, stop, results))
+        server.start()
+        try:
+            if not ready.wait(60):
+                raise TimeoutError("Server did not start")
+            rng = random.Random(seed)
+            clients = [LoadClient(f"127.0.0.1:{port}", game, f"Player{n}", random.Random(rng.getrandbits(64)))
+                       for n in range(1, players + 1)]
+
+            async def run() -> float:
+                with TimeIt(f"Connecting {players} clients", logger):
+                    await asyncio.gather(*(client.connect() for client in clients))
+                receivers = [asyncio.create_task(client.receive()) for client in clients]
+                start.set()
+                with TimeIt(f"Sending load for {duration} seconds", logger) as t:
+                    await asyncio.gather(*(client.run(duration, check_rate, hint_rate, data_rate)
+                                           for client in clients))
+                    await asyncio.sleep(1)  # let answers to the last requests arrive
+                stop.set()
+                for client in clients:
+                    await client.close()
+                await asyncio.gather(*receivers)
+                return t.dif
+
+            elapsed = asyncio.run(run())
+        finally:
+            stop.set()
+            server.join(30)
+            if server.is_alive():
+                server.terminate()
+                server.join()
+
+    for kind in ("check", "hint", "set", "get"):
+        latencies = sorted(latency for client in clients for latency in client.latencies[kind])
+        if latencies:
+            logger.info(f"{kind:>5}: {len(latencies):7} answered, "
+                        f"p50 {percentile(latencies, 50) * 1000:8.2f} ms, "
+                        f"p99 {percentile(latencies, 99) * 1000:8.2f} ms, "
+                        f"max {latencies[-1] * 1000:8.2f} ms")
+    unanswered = sum(client.unanswered for client in clients)
+    if unanswered:
+        logger.warning(f"{unanswered} requests were not answered.")
+    sent = sum(client.messages_sent for client in clients)
+    received = sum(client.messages_received for client in clients)
+    logger.info(f"{sent / elapsed:.1f} messages/s sent, {received / elapsed:.1f} messages/s received.")
+    if "cpu" in results:
+        cpu = results["cpu"]
+        logger.info(f"Server used {cpu:.2f} seconds of CPU in {elapsed:.2f} seconds ({cpu / elapsed:.1%}).")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from path_change import change_home
+    change_home()
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--players", type=int, default=20)
+    parser.add_argument("--game", default="APQuest")
+    parser.add_argument("--duration", type=float, default=10.)
+    parser.add_argument("--check_rate", type=float, default=2., help="LocationChecks per second per client")
+    parser.add_argument("--hint_rate", type=float, default=.2, help="hints per second per client")
+    parser.add_argument("--data_rate", type=float, default=1., help="data storage Set/Get per second per client")
+    parser.add_argument("--port", type=int, default=38281)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    run_server_load_benchmark(args.players, args.game, args.duration, args.check_rate, args.hint_rate,
+                              args.data_rate, args.port, args.seed)
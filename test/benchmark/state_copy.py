@@ -0,0 +1,99 @@
+def run_state_copy_benchmark(players: int = 100, games: tuple[str, ...] = (), copies: int = 1000) -> None:
+    """
+    Benchmark CollectionState.copy and a full fill on a large multiworld, comparing the copy-on-write implementation
+    against eagerly copying every player's containers like CollectionState.copy did before.
+
+    :param players: Number of players in the benchmarked multiworld.
+    :param games: Games to cycle through when assigning players. Defaults to a set of fast-generating games.
+    :param copies: Number of copies taken of the all_state for the copy benchmark.
+    """
+    import logging
+    import tracemalloc
+    import typing
+
+    from multiworld import create_multiworld, default_games
+    from time_it import TimeIt
+
+    from BaseClasses import CollectionState
+    from Fill import distribute_items_restrictive
+    from Utils import init_logging
+    from worlds.AutoWorld import call_all
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    if not games:
+        games = default_games
+
+    cow_copy = CollectionState.copy
+
+    def eager_copy(self: CollectionState) -> CollectionState:
+        ret = CollectionState(self.multiworld)
+        ret.prog_items = {player: counter.copy() for player, counter in self.prog_items.items()}
+        ret.reachable_regions = {player: region_set.copy() for player, region_set in
+                                 self.reachable_regions.items()}
+        ret.blocked_connections = {player: entrance_set.copy() for player, entrance_set in
+                                   self.blocked_connections.items()}
+        ret.advancements = self.advancements.copy()
+        ret.path = self.path.copy()
+        ret.locations_checked = self.locations_checked.copy()
+        ret.allow_partial_entrances = self.allow_partial_entrances
+        for function in self.additional_copy_functions:
+            ret = function(self, ret)
+        return ret
+
+    implementations: typing.Dict[str, typing.Callable[[CollectionState], CollectionState]] = {
+        "eager": eager_copy,
+        "copy-on-write": cow_copy,
+    }
+
+    with TimeIt(f"Creating a {players} player multiworld", logger):
+        multiworld = create_multiworld(players, games)
+    all_state = multiworld.get_all_state(False)
+    # fill the reachability caches, like a swept state in fill would have them
+    for player in multiworld.player_ids:
+        all_state.update_reachable_regions(player)
+
+    results: typing.Dict[str, typing.Tuple[float, int]] = {}
+    for name, implementation in implementations.items():
+        CollectionState.copy = implementation
+        tracemalloc.start()
+        with TimeIt(f"{copies} {name} copies of all_state", logger) as t:
+            # keep the copies alive so the memory cost is visible
+            copied_states = [all_state.copy() for _ in range(copies)]
+            # touch one player's items, as a fill step usually does
+            for copied_state in copied_states:
+                copied_state.add_item("Benchmark Item", 1)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        del copied_states
+        results[name] = t.dif, peak
+        logger.info(f"{name}: peak memory {peak / 1024 / 1024:.2f} MiB")
+
+    fill_times: typing.Dict[str, float] = {}
+    for name, implementation in implementations.items():
+        CollectionState.copy = implementation
+        fill_multiworld = create_multiworld(players, games)
+        with TimeIt(f"{name} fill of {players} players", logger) as t:
+            distribute_items_restrictive(fill_multiworld)
+            call_all(fill_multiworld, "post_fill")
+        fill_times[name] = t.dif
+    CollectionState.copy = cow_copy
+
+    logger.info(f"copy speedup: {results['eager'][0] / results['copy-on-write'][0]:.2f}x, "
+                f"memory: {results['eager'][1] / max(results['copy-on-write'][1], 1):.2f}x less, "
+                f"fill speedup: {fill_times['eager'] / fill_times['copy-on-write']:.2f}x")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from path_change import change_home
+    change_home()
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--players", type=int, default=100)
+    parser.add_argument("--copies", type=int, default=1000)
+    parser.add_argument("--games", nargs="*", default=())
+    args = parser.parse_args()
+    run_state_copy_benchmark(args.players, tuple(args.games), args.copies)
@@ -0,0 +1,45 @@
+import unittest
+from unittest import mock
+
+import worlds
+from worlds import AutoWorldRegister, LazyGamesPackages
+from worlds.AutoWorld import LazyWorldTypes
+
+
+class TestDataPackageCache(unittest.TestCase):
+    game = "APQuest"
+
+    def setUp(self) -> None:
+        if worlds._read_cached_data_package(self.game) is None:
+            self.skipTest("Data package cache could not be written")
+
+    def test_cached_package_matches(self) -> None:
+        """Test that the cached data package is the one the world builds"""
+        world = AutoWorldRegister.world_types[self.game]
+        self.assertEqual(worlds._get_cached_data_package(self.game), world.get_data_package_data())
+
+    def test_changed_source_is_not_used(self) -> None:
+        """Test that the cached data package is not used once its world source changed"""
+        path = worlds._data_package_cache[self.game][0]
+        with mock.patch.dict(worlds._stamps, {path: [0, 0]}):
+            self.assertIsNone(worlds._get_cached_data_package(self.game))
+
+    def test_unreadable_package_is_not_used(self) -> None:
+        """Test that a cut off or corrupted cached data package is not used"""
+        data = worlds._read_cached_data_package(self.game)
+        assert data is not None
+        for broken in (data[:-1], b"\0" * len(data)):
+            with mock.patch.object(worlds, "_read_cached_data_package", return_value=broken):
+                self.assertIsNone(worlds._get_cached_data_package(self.game))
+
+    def test_lazy_packages_only_use_cache_for_deferred_worlds(self) -> None:
+        """Test that lazily loaded data packages come from the cache only while the world is not imported"""
+        world = AutoWorldRegister.world_types[self.game]
+        world_types = LazyWorldTypes()
+        world_types.defer(self.game, mock.Mock(game=self.game, world_version=None))
+        cached = {"checksum": "cached"}
+        with mock.patch.object(AutoWorldRegister, "world_types", world_types), \
+                mock.patch.object(worlds, "_get_cached_data_package", return_value=cached):
+            self.assertIs(LazyGamesPackages({})[self.game], cached)
+            world_types[self.game] = world  # imported
+            self.assertEqual(LazyGamesPackages({})[self.game], world.get_data_package_data())
@@ -3,9 +3,9 @@ import unittest
 
 from Options import Accessibility
 from test.general import generate_items, generate_locations, generate_test_multiworld
-from Fill import FillError, balance_multiworld_progression, fill_restrictive, \
+from Fill import FillError, SphereTracker, balance_multiworld_progression, fill_restrictive, \
     distribute_early_items, distribute_items_restrictive
-from BaseClasses import Entrance, LocationProgressType, MultiWorld, Region, Item, Location, \
+from BaseClasses import CollectionState, Entrance, LocationProgressType, MultiWorld, Region, Item, Location, \
     ItemClassification
 from worlds.generic.Rules import CollectionRule, add_item_rule, locality_rules, set_rule
 
@@ -448,6 +448,40 @@ class TestFillRestrictive(unittest.TestCase):
         self.assertTrue(multiworld.state.prog_items[item.player][item.name], "Sweep did not collect - Test flawed")
         self.assertEqual(multiworld.state.prog_items[item.player][item.name], 1, "Sweep collected multiple times")
 
+    def test_sweep_order_replay(self):
+        """Test that replaying a recorded sweep order collects the same items as sweeping from scratch"""
+        multiworld = generate_test_multiworld()
+        player1 = generate_player_data(multiworld, 1, 0, 3)
+        item0, item1, item2 = player1.prog_items
+        region1 = player1.generate_region(player1.menu, 2)
+        region2 = player1.generate_region(region1, 2, lambda state: state.has(item0.name, player1.id))
+        region3 = player1.generate_region(region2, 2, lambda state: state.has(item1.name, player1.id))
+        for region, item in ((region1, item0), (region2, item1), (region3, item2)):
+            location = region.locations[0]
+            location.place_locked_item(item)
+            multiworld.itempool.remove(item)
+
+        sweep_order: List[List[Location]] = []
+        recording_state = multiworld.state.copy()
+        recording_state.sweep_for_advancements(sweep_order=sweep_order)
+        self.assertEqual(len(sweep_order), 3, "Sweep did not record its iterations - Test flawed")
+
+        replaying_state = multiworld.state.copy()
+        replaying_state.sweep_for_advancements(sweep_order=sweep_order)
+        fresh_state = multiworld.state.copy()
+        fresh_state.sweep_for_advancements()
+        self.assertEqual(replaying_state.prog_items, fresh_state.prog_items)
+        self.assertEqual(set(replaying_state.advancements), set(fresh_state.advancements))
+        self.assertEqual(len(sweep_order), 3)
+
+        # a replayed order must not collect locations that are no longer reachable without an item
+        region2.entrances[0].access_rule = lambda state: state.has(item2.name, player1.id)
+        replaying_state = multiworld.state.copy()
+        replaying_state.sweep_for_advancements(sweep_order=sweep_order)
+        self.assertTrue(replaying_state.has(item0.name, player1.id))
+        self.assertFalse(replaying_state.has(item1.name, player1.id))
+        self.assertFalse(replaying_state.has(item2.name, player1.id))
+
     def test_correct_item_instance_removed_from_pool(self):
         """Test that a placed item gets removed from the submitted pool"""
         multiworld = generate_test_multiworld()
@@ -880,3 +914,25 @@ class TestBalanceMultiworldProgression(unittest.TestCase):
 
         self.assertRegionContains(
             self.player1.regions[2], self.player2.prog_items[0])
+
+    def test_sphere_tracker(self) -> None:
+        """Test that recorded spheres are reused until they get discarded"""
+        spheres = SphereTracker()
+        state = CollectionState(self.multiworld)
+        unchecked_locations = set(self.multiworld.get_locations())
+
+        sphere_1 = spheres.get_sphere(1, state, unchecked_locations)
+        self.assertEqual(sphere_1, set(self.player1.regions[1].locations))
+        unchecked_locations -= sphere_1
+        for location in sphere_1:
+            if location.advancement:
+                state.collect(location.item, True, location)
+        sphere_2 = spheres.get_sphere(2, state, unchecked_locations)
+        self.assertEqual(sphere_2, set(self.player1.regions[2].locations))
+
+        # recorded spheres are returned without checking the locations in the given state again
+        empty_state = CollectionState(self.multiworld)
+        self.assertIs(spheres.get_sphere(2, empty_state, unchecked_locations), sphere_2)
+        spheres.discard_after(1)
+        self.assertIs(spheres.get_sphere(1, empty_state, unchecked_locations), sphere_1)
+        self.assertEqual(spheres.get_sphere(2, empty_state, unchecked_locations), set())
@@ -4,6 +4,8 @@ from typing import Callable, Dict, Optional
 from typing_extensions import override
 
 from BaseClasses import CollectionState, MultiWorld, Region
+from worlds.generic import Rules
+from . import generate_items, generate_locations, generate_test_multiworld
 
 
 class TestHelpers(unittest.TestCase):
@@ -84,3 +86,31 @@ class TestHelpers(unittest.TestCase):
                 for reg_exit in reg_exit_set[region]:
                     self.assertTrue(f"{region} -> {reg_exit}" in exit_names,
                                     f"{region} -> {reg_exit} not in {exit_names}")
+
+    def test_rule_statistics(self) -> None:
+        """Tests that access rules set while rule statistics are enabled are counted per spot"""
+        multiworld = generate_test_multiworld()
+        region = multiworld.get_region("Menu", self.player)
+        location_1, location_2 = generate_locations(2, self.player, region)
+        item_1, item_2 = generate_items(2, self.player, True)
+
+        Rules.rule_statistics = statistics = Rules.RuleStatistics()
+        try:
+            Rules.set_rule(location_1, lambda state: state.has(item_1.name, self.player))
+            Rules.add_rule(location_1, lambda state: state.has(item_2.name, self.player), "or")
+            location_2.access_rule = lambda state: True
+            statistics.wrap_remaining(multiworld)
+        finally:
+            Rules.rule_statistics = None
+
+        state = CollectionState(multiworld)
+        self.assertFalse(location_1.can_reach(state))
+        state.collect(item_2)
+        self.assertTrue(location_1.can_reach(state))
+        self.assertTrue(location_2.can_reach(state))
+
+        self.assertEqual(set(statistics.spots), {location_1, location_2})
+        # adding a rule replaces the counting wrapper instead of nesting it, so each evaluation counts once
+        self.assertEqual(statistics.spots[location_1][0], 2)
+        self.assertEqual(statistics.spots[location_2][0], 1)
+        self.assertEqual(len(statistics.get_folded_stacks()), 2)
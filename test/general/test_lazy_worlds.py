@@ -0,0 +1,150 @@
+import os
+import sys
+import tempfile
+import unittest
+from typing import Any, Dict, List, Optional
+from unittest import mock
+
+import worlds
+from Utils import Version
+from worlds import WorldSource
+from worlds.AutoWorld import AutoWorldRegister, LazyWorldTypes, World
+
+
+class FakeSource:
+    def __init__(self, world_types: LazyWorldTypes, game: str, world: Optional[type],
+                 world_version: Optional[Version] = None) -> None:
+        self.world_types = world_types
+        self.game = game
+        self.world = world
+        self.world_version = world_version
+        self.loads = 0
+
+    def load(self) -> bool:
+        self.loads += 1
+        if self.world is None:
+            return False
+        self.world_types[self.game] = self.world  # what AutoWorldRegister does when the world class is created
+        return True
+
+
+class TestLazyWorldTypes(unittest.TestCase):
+    def test_deferred_game_is_listed_without_loading(self) -> None:
+        world_types = LazyWorldTypes()
+        source = FakeSource(world_types, "Lazy Game", type("LazyWorld", (World,), {}))
+        world_types.defer("Lazy Game", source)  # type: ignore[arg-type]
+        self.assertIn("Lazy Game", world_types)
+        self.assertEqual(list(world_types), ["Lazy Game"])
+        self.assertEqual(len(world_types), 1)
+        self.assertTrue(world_types.is_deferred("Lazy Game"))
+        self.assertEqual(world_types.loaded, {})
+        self.assertEqual(source.loads, 0)
+
+    def test_lookup_loads_once(self) -> None:
+        world_types = LazyWorldTypes()
+        world = type("LazyWorld", (World,), {})
+        source = FakeSource(world_types, "Lazy Game", world, Version(1, 2, 3))
+        world_types.defer("Lazy Game", source)  # type: ignore[arg-type]
+        self.assertIs(world_types["Lazy Game"], world)
+        self.assertIs(world_types["Lazy Game"], world)
+        self.assertEqual(source.loads, 1)
+        self.assertFalse(world_types.is_deferred("Lazy Game"))
+        self.assertEqual(world_types.loaded, {"Lazy Game": world})
+        self.assertEqual(world.world_version, Version(1, 2, 3))
+
+    def test_failed_load(self) -> None:
+        world_types = LazyWorldTypes()
+        source = FakeSource(world_types, "Broken Game", None)
+        world_types.defer("Broken Game", source)  # type: ignore[arg-type]
+        self.assertIsNone(world_types.get("Broken Game"))
+        self.assertNotIn("Broken Game", world_types)
+        self.assertEqual(source.loads, 1)
+
+
+class TestLazyWorldIndex(unittest.TestCase):
+    """Tests the world index of worlds/__init__.py with a world source in a temporary folder."""
+    game = "Lazy Index Test Game"
+    module_name = "lazy_index_test_world"
+    world_source: WorldSource
+    world_types: LazyWorldTypes
+    written: List[Dict[str, Any]]
+
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, self.module_name)
+        os.makedirs(path)
+        self.world_source = WorldSource(path, relative=False)
+
+        self.world_types = LazyWorldTypes()
+        self.written = []
+        for patcher in (
+            mock.patch.object(worlds, "__path__", [*worlds.__path__, directory.name]),
+            mock.patch.object(AutoWorldRegister, "world_types", self.world_types),
+            mock.patch.object(worlds, "lazy_load", True),
+            mock.patch.object(worlds, "world_sources", [self.world_source]),
+            mock.patch.object(worlds, "failed_world_loads", []),
+            mock.patch.object(worlds, "_world_index", {}),
+            mock.patch.object(worlds, "_stamps", {}),
+            mock.patch.object(worlds, "_deferred_world_settings", {}),
+            mock.patch.object(worlds, "_write_world_index", self.written.append),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(sys.modules.pop, self.world_source.module_name, None)
+
+    def set_world(self, source: str) -> None:
+        with open(os.path.join(self.world_source.resolved_path, "__init__.py"), "w", encoding="utf-8") as f:
+            f.write(source)
+
+    def set_working_world(self) -> None:
+        self.set_world("from worlds.AutoWorld import World\n\n\n"
+                       "class LazyIndexTestWorld(World):\n"
+                       f"    game = {self.game!r}\n"
+                       "    item_name_to_id = {}\n"
+                       "    location_name_to_id = {}\n")
+
+    def index(self, stamp: List[int]) -> None:
+        worlds._world_index[self.world_source.resolved_path] = {"stamp": stamp, "games": {self.game: None}}
+
+    def test_indexed_source_is_deferred(self) -> None:
+        """An unchanged indexed world source is only imported when its game is first looked up."""
+        self.set_working_world()
+        self.index(self.world_source.get_stamp())
+        worlds._load_world_source(self.world_source)
+
+        self.assertTrue(self.world_types.is_deferred(self.game))
+        self.assertNotIn(self.world_source.module_name, sys.modules)
+        world = self.world_types[self.game]
+        self.assertEqual(world.__module__, self.world_source.module_name)
+        self.assertFalse(self.world_types.is_deferred(self.game))
+
+        worlds._update_world_index()
+        self.assertEqual(self.written, [], "Unchanged index was written")
+
+    def test_changed_source_is_imported(self) -> None:
+        """A world source whose stamp differs from the index is imported at startup and indexed again."""
+        self.set_working_world()
+        self.index([0, 0])
+        worlds._load_world_source(self.world_source)
+
+        self.assertIn(self.world_source.module_name, sys.modules)
+        self.assertFalse(self.world_types.is_deferred(self.game))
+        self.assertIn(self.game, self.world_types.loaded)
+
+        worlds._update_world_index()
+        self.assertEqual(self.written, [{self.world_source.resolved_path: {
+            "stamp": self.world_source.get_stamp(), "games": {self.game: None}}}])
+
+    def test_failed_import_is_not_indexed(self) -> None:
+        """A world source that fails to import is never indexed, and a stale entry of it is removed."""
+        self.set_world("raise Exception('broken world')\n")
+        self.index([0, 0])
+        with self.assertLogs(level="ERROR"):
+            worlds._load_world_source(self.world_source)
+
+        self.assertNotIn(self.game, self.world_types)
+        self.assertEqual(worlds.failed_world_loads, [self.module_name])
+
+        worlds._update_world_index()
+        self.assertEqual(self.written, [{}])
@@ -79,3 +79,52 @@ class TestBase(unittest.TestCase):
                             locations.add(location)
                     self.assertGreater(len(locations), 0,
                                        msg="Need to be able to reach at least one location to get started.")
+
+    def test_remove_updates_reachable_regions(self):
+        """Ensure removing items from a state reaches the same regions as collecting only the remaining items"""
+        for game_name, world_type in AutoWorldRegister.world_types.items():
+            with self.subTest("Game", game=game_name):
+                multiworld = setup_solo_multiworld(world_type)
+                items = [item for item in multiworld.itempool if item.advancement]
+                kept_items = items[::2]
+                state = CollectionState(multiworld)
+                for item in items:
+                    state.collect(item, True)
+                for region in multiworld.get_regions():
+                    region.can_reach(state)
+                for item in items[1::2]:
+                    state.remove(item)
+
+                expected_state = CollectionState(multiworld)
+                for item in kept_items:
+                    expected_state.collect(item, True)
+                if state.prog_items != expected_state.prog_items:
+                    continue  # world's collect and remove are not symmetric, so the states are not comparable
+                for region in multiworld.get_regions():
+                    with self.subTest("Region", region=region.name):
+                        self.assertEqual(region.can_reach(state), region.can_reach(expected_state))
+
+    def test_remove_after_searching_between_collects(self):
+        """Ensure removing items collected between searches reaches the same regions as never collecting them"""
+        for game_name, world_type in AutoWorldRegister.world_types.items():
+            with self.subTest("Game", game=game_name):
+                multiworld = setup_solo_multiworld(world_type)
+                items = [item for item in multiworld.itempool if item.advancement]
+                kept_items = items[::2]
+                state = CollectionState(multiworld)
+                for item in items:
+                    state.collect(item, True)
+                    state.update_reachable_regions(item.player)
+                for item in reversed(items[1::2]):
+                    state.remove(item)
+                    if item.code is not None and item.code % 2:
+                        state.update_reachable_regions(item.player)
+
+                expected_state = CollectionState(multiworld)
+                for item in kept_items:
+                    expected_state.collect(item, True)
+                if state.prog_items != expected_state.prog_items:
+                    continue  # world's collect and remove are not symmetric, so the states are not comparable
+                for region in multiworld.get_regions():
+                    with self.subTest("Region", region=region.name):
+                        self.assertEqual(region.can_reach(state), region.can_reach(expected_state))
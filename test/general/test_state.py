@@ -1,7 +1,12 @@
 import unittest
+from collections import Counter
+from unittest import mock
 
+import sphere_pool
+from BaseClasses import CollectionState, Item, ItemClassification, ItemCounts
+from Fill import distribute_items_restrictive
 from worlds.AutoWorld import AutoWorldRegister, call_all
-from . import setup_solo_multiworld
+from . import generate_locations, generate_test_multiworld, setup_multiworld, setup_solo_multiworld
 
 
 class TestBase(unittest.TestCase):
@@ -27,3 +32,130 @@ class TestBase(unittest.TestCase):
                     with self.subTest("Step", step=step):
                         call_all(multiworld, step)
                         self.assertTrue(multiworld.get_all_state(False, allow_partial_entrances=True))
+
+    def test_copy_on_write(self):
+        """Ensure a copied state shares per-player data until it is modified, and modifications stay separate."""
+        multiworld = generate_test_multiworld(2)
+        state = multiworld.state
+        state.add_item("Item", 1)
+        copied_state = state.copy()
+        self.assertIs(dict.__getitem__(copied_state.prog_items, 2), dict.__getitem__(state.prog_items, 2))
+        self.assertTrue(copied_state.has("Item", 1))
+
+        copied_state.add_item("Other Item", 1)
+        state.remove_item("Item", 1)
+        self.assertTrue(copied_state.has_all(("Item", "Other Item"), 1))
+        self.assertFalse(state.has_any(("Item", "Other Item"), 1))
+        self.assertIs(dict.__getitem__(copied_state.prog_items, 2), dict.__getitem__(state.prog_items, 2))
+
+        state.prog_items[2]["Item"] = 1
+        self.assertEqual(state.count("Item", 2), 1)
+        self.assertEqual(copied_state.count("Item", 2), 0)
+
+    def test_copy_on_write_collection_marks(self):
+        """Ensure removing an item from a copied state doesn't remove its collection mark from the original state."""
+        multiworld = generate_test_multiworld()
+        state = CollectionState(multiworld)
+        item = Item("Item", ItemClassification.progression, None, 1)
+        state.collect(item, True)
+        state.collect(item, True)
+        copied_state = state.copy()
+        copied_state.remove(item)
+        copied_state.remove(item)
+        self.assertEqual(state.collection_marks[1]["Item"], [0, 0])
+        self.assertEqual(copied_state.collection_marks[1]["Item"], [])
+
+    def test_compact_prog_items(self):
+        """Ensure a world using compact_prog_items behaves like one using a Counter."""
+        multiworld = generate_test_multiworld(2)
+        multiworld.worlds[1].compact_prog_items = True
+        state = CollectionState(multiworld)
+        self.assertIsInstance(state.prog_items[1], ItemCounts)
+        self.assertIsInstance(state.prog_items[2], Counter)
+
+        for player in (1, 2):
+            state.add_item("Item", player, 2)
+            state.add_item("Other Item", player)
+            state.remove_item("Other Item", player)
+            self.assertTrue(state.has("Item", player, 2))
+            self.assertFalse(state.has("Item", player, 3))
+            self.assertFalse(state.has_any(("Other Item", "Unknown Item"), player))
+            self.assertEqual(state.count_from_list(("Item", "Other Item"), player), 2)
+        self.assertEqual(state.prog_items[1], state.prog_items[2])
+        self.assertEqual(len(state.prog_items[1]), 1)
+        self.assertEqual(state.prog_items[1].total(), 2)
+
+        copied_state = state.copy()
+        copied_state.set_item("Item", 1, 5)
+        self.assertEqual(state.count("Item", 1), 2)
+        self.assertEqual(copied_state.count("Item", 1), 5)
+        copied_state.set_item("Item", 1, 0)
+        self.assertEqual(dict(copied_state.prog_items[1]), {})
+
+    def test_compact_prog_items_has(self):
+        """Ensure the has methods read ItemCounts like a Counter, including names added to the index later."""
+        multiworld = generate_test_multiworld(2)
+        multiworld.worlds[1].compact_prog_items = True
+        state = CollectionState(multiworld)
+        for player in (1, 2):
+            state.add_item("Item", player, 2)
+        # appends "Late Item" to the shared index, past the end of the first state's array
+        other_state = CollectionState(multiworld)
+        other_state.add_item("Late Item", 1)
+
+        for player in (1, 2):
+            with self.subTest(player=player):
+                self.assertTrue(state.has("Item", player, 2))
+                self.assertFalse(state.has("Late Item", player))
+                self.assertEqual(state.count("Late Item", player), 0)
+                self.assertTrue(state.has_all(("Item",), player))
+                self.assertFalse(state.has_all(("Item", "Late Item"), player))
+                self.assertTrue(state.has_any(("Late Item", "Item"), player))
+                self.assertFalse(state.has_any(("Late Item", "Unknown Item"), player))
+                self.assertTrue(state.has_all_counts({"Item": 2, "Late Item": 0}, player))
+                self.assertFalse(state.has_all_counts({"Item": 2, "Late Item": 1}, player))
+                self.assertTrue(state.has_any_count({"Late Item": 1, "Item": 2}, player))
+                self.assertFalse(state.has_any_count({"Late Item": 1, "Item": 3}, player))
+        self.assertTrue(other_state.has("Late Item", 1))
+
+    def test_dense_location_sets(self):
+        """Ensure the location sets of a state behave like sets and are independent after copying."""
+        multiworld = generate_test_multiworld()
+        region = multiworld.get_region("Menu", 1)
+        locations = generate_locations(3, 1, region)
+        state = multiworld.state
+        state.advancements.add(locations[2])
+        state.advancements.add(locations[0])
+        state.advancements.add(locations[0])
+        self.assertEqual(len(state.advancements), 2)
+        self.assertEqual(set(state.advancements), {locations[0], locations[2]})
+        self.assertNotIn(locations[1], state.advancements)
+
+        copied_state = state.copy()
+        copied_state.advancements.remove(locations[0])
+        copied_state.advancements.add(locations[1])
+        self.assertEqual(set(state.advancements), {locations[0], locations[2]})
+        self.assertEqual(set(copied_state.advancements), {locations[1], locations[2]})
+        self.assertEqual(copied_state.advancements - {locations[1]}, {locations[2]})
+        with self.assertRaises(KeyError):
+            state.advancements.remove(locations[1])
+
+    @unittest.skipUnless(sphere_pool.can_fork(), "Parallel sphere evaluation requires fork")
+    def test_parallel_spheres(self):
+        """Ensure spheres calculated in worker processes match the spheres calculated in-process."""
+        games = ("Hollow Knight", "Timespinner", "Super Mario 64")
+        multiworld = setup_multiworld([AutoWorldRegister.world_types[game] for game in games], seed=0)
+        distribute_items_restrictive(multiworld)
+        call_all(multiworld, "post_fill")
+
+        self.assertEqual(list(multiworld.get_spheres(processes=2)), list(multiworld.get_spheres()))
+        self.assertEqual(list(multiworld.get_sendable_spheres(processes=2)),
+                         list(multiworld.get_sendable_spheres()))
+        self.assertEqual(multiworld.fulfills_accessibility(processes=2), multiworld.fulfills_accessibility())
+
+    def test_sphere_pool_in_daemon(self):
+        """Ensure spheres are calculated in-process in daemonic processes, which can't start worker processes."""
+        multiworld = generate_test_multiworld()
+        with mock.patch("multiprocessing.current_process", return_value=mock.Mock(daemon=True)):
+            self.assertIsNone(multiworld.get_sphere_pool(multiworld.state, multiworld.get_locations(), 2))
+            self.assertEqual(len(list(multiworld.get_spheres(processes=2))), len(list(multiworld.get_spheres())))
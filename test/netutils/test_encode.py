@@ -0,0 +1,82 @@
+# Tests for _speedups.encode, NetUtils._encode and the encoded game package cache
+import collections
+import gzip
+import os
+import typing
+import unittest
+
+from NetUtils import ClientStatus, Hint, HintStatus, JSONTypes, NetworkItem, NetworkPlayer, NetworkSlot, SlotType, \
+    _encode, compress_game_package, decode, encode, encode_data_package_msg, encode_game_package
+from Utils import Version
+
+ci = bool(os.environ.get("CI"))  # always set in GitHub actions
+
+sample_messages: typing.List[typing.Any] = [
+    [{"cmd": "ReceivedItems", "index": 3, "items": [NetworkItem(1, 2, 3, 4), NetworkItem(-1, -2, 0)]}],
+    [{"cmd": "RoomUpdate", "checked_locations": {1, 2, 3}, "hint_points": 0},
+     {"cmd": "RoomUpdate", "players": [NetworkPlayer(0, 1, "Back\\slash\t", "Näme \"quoted\"\n")]}],
+    [{"cmd": "Connected", "slot_info": {1: NetworkSlot("Player", "Game", SlotType.player),
+                                        2: NetworkSlot("Group", "Game", SlotType.group, [1, 3])}}],
+    [{"cmd": "SetReply", "key": "_read_hints_0_1", "value": {Hint(1, 2, 3, 4, False, "", 1, HintStatus.HINT_FOUND)}}],
+    [{"cmd": "RoomInfo", "version": Version(0, 5, 1), "tags": frozenset(("AP",)), "time": 1.5}],
+    {"status": ClientStatus.CLIENT_GOAL, "nested": NetworkItem(1, 2, 3, (4, 5))},
+    {"type": JSONTypes.player_id, JSONTypes.item_id: "enum key"},
+    {1: None, True: "t", False: "f", None: "n", 1.5: 2.0, "inf": float("inf"), "-inf": float("-inf")},
+    collections.OrderedDict(empty_list=[], empty_dict={}, empty_tuple=(), emoji="\U0001F600"),
+    "text", 0, -7, True, None, 1e100, [[[]]],
+]
+
+
+class Base:
+    class TestEncode(unittest.TestCase):
+        encode: typing.Callable[[typing.Any], str]
+
+        def test_matches_pure_python(self) -> None:
+            for message in sample_messages:
+                with self.subTest(message=message):
+                    self.assertEqual(self.encode(message), _encode(message))
+
+        def test_round_trip(self) -> None:
+            message = [{"cmd": "ReceivedItems", "index": 0, "items": [NetworkItem(1, 2, 3, 0)]}]
+            self.assertEqual(decode(self.encode(message)), message)
+
+        def test_unserializable(self) -> None:
+            for message in ({"value": object()}, {(1, 2): "tuple key"}, NetworkItem(1, 2, 3, {4})):
+                with self.subTest(message=message), self.assertRaises(TypeError):
+                    self.encode(message)
+
+
+class TestPurePythonEncode(Base.TestEncode):
+    """Run base tests for the pure python implementation."""
+    encode = staticmethod(_encode)
+
+
+@unittest.skipIf(encode is _encode and not ci, "_speedups not available")
+class TestSpeedupsEncode(Base.TestEncode):
+    """Run base tests for the cython implementation."""
+    encode = staticmethod(encode)
+
+    def setUp(self) -> None:
+        self.assertFalse(encode is _encode, "Failed to load _speedups")
+
+
+class TestEncodedGamePackages(unittest.TestCase):
+    def test_data_package_msg(self) -> None:
+        """Test that spliced DataPackage messages match encoding them as a whole"""
+        games = {
+            "Game": {"item_name_to_id": {"Item": 1}, "location_name_to_id": {"Location": 2}, "checksum": "1234"},
+            "Other \"Game\"": {"item_name_to_id": {}, "location_name_to_id": {"Ö": 3}},
+        }
+        for packages in (games, {}, {"Game": games["Game"]}):
+            with self.subTest(games=list(packages)):
+                self.assertEqual(encode_data_package_msg(packages),
+                                 encode([{"cmd": "DataPackage", "data": {"games": packages}}]))
+        self.assertEqual(gzip.decompress(compress_game_package(games["Game"])).decode(), encode(games["Game"]))
+
+    def test_same_checksum(self) -> None:
+        """Test that packages are reused by checksum, unless they have different keys"""
+        package = {"item_name_groups": {"Group": ["Item"]}, "item_name_to_id": {"Item": 1}, "checksum": "5678"}
+        without_groups = {key: value for key, value in package.items() if key != "item_name_groups"}
+        encoded = encode_game_package(package)
+        self.assertIs(encode_game_package(dict(package)), encoded)
+        self.assertEqual(encode_game_package(without_groups), encode(without_groups))
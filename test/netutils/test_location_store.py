@@ -3,6 +3,8 @@ import os
 import typing
 import unittest
 import warnings
+from array import array
+from random import Random
 from NetUtils import LocationStore, _LocationStore
 
 State = typing.Dict[typing.Tuple[int, int], typing.Set[int]]
@@ -112,6 +114,27 @@ class Base:
             self.assertEqual(sorted(self.store.find_item(set(range(2048)), 13)),
                              [(1, 13, 13, 1, 0)])
 
+        def test_find_item_matches_scan(self) -> None:
+            store_type = type(self.store)
+            random = Random(0)
+            data: RawLocations = {
+                player: {location: (random.randrange(10), random.randrange(1, 9), random.randrange(8))
+                         for location in random.sample(range(100), 40)}
+                for player in range(1, 9)
+            }
+            store = store_type(data)
+            for slots in ({1}, {2, 5}, {8, 9}, set(range(1, 9)), set()):
+                for item_id in range(11):
+                    expected = sorted((finding_player, location_id, *values)
+                                      for finding_player, locations in data.items()
+                                      for location_id, values in locations.items()
+                                      if values[0] == item_id and values[1] in slots)
+                    found = list(store.find_item(slots, item_id))
+                    if len(slots) > 1:
+                        self.assertEqual(found, expected)  # in location order for groups
+                    else:
+                        self.assertEqual(sorted(found), expected)
+
         def test_get_for_player(self) -> None:
             self.assertEqual(self.store.get_for_player(3), {4: {9}})
             self.assertEqual(self.store.get_for_player(1), {1: {13}, 2: {22, 23}})
@@ -165,6 +188,43 @@ class Base:
             with self.assertRaises(KeyError):
                 self.store.get_remaining(bad_state, 0, 9999)
 
+        def test_get_counts(self) -> None:
+            self.assertEqual(self.store.get_counts(full_state, 0), {1: (3, 3), 2: (3, 3), 3: (1, 1), 4: (1, 1),
+                                                                    5: (1, 1)})
+            self.assertEqual(self.store.get_counts(one_state, 0), {1: (1, 3), 2: (0, 3), 3: (0, 1), 4: (0, 1),
+                                                                   5: (0, 1)})
+            self.assertEqual(self.store.get_counts(empty_state, 0), {1: (0, 3), 2: (0, 3), 3: (0, 1), 4: (0, 1),
+                                                                     5: (0, 1)})
+            # checks of locations that are not in the store are not counted
+            self.assertEqual(self.store.get_counts({(0, 1): {12, 14}}, 0)[1], (1, 3))
+            self.assertEqual(self.store.get_counts(full_state, 1)[1], (0, 3))
+
+        def test_get_all_missing(self) -> None:
+            for state in (full_state, one_state, empty_state):
+                all_missing = self.store.get_all_missing(state, 0)
+                self.assertEqual(sorted(all_missing), [1, 2, 3, 4, 5])
+                for slot, missing in all_missing.items():
+                    self.assertIsInstance(missing, array)
+                    self.assertEqual(missing.typecode, "q")
+                    self.assertEqual(list(missing), self.store.get_missing({**empty_state, **state}, 0, slot))
+            self.assertEqual(list(self.store.get_all_missing(one_state, 0)[1]), [11, 13])
+
+        def test_get_item_locations(self) -> None:
+            def pairs(locations: array) -> typing.List[typing.Tuple[int, int]]:
+                return sorted(zip(locations[::2], locations[1::2]))
+
+            item_locations = self.store.get_item_locations(1)
+            self.assertEqual(sorted(item_locations), [11, 12, 13])
+            self.assertEqual(pairs(item_locations[13]), [(1, 13)])
+            self.assertEqual(pairs(item_locations[12]), [(2, 22)])
+            self.assertEqual({item: pairs(locations) for item, locations in self.store.get_item_locations(3).items()},
+                             {99: [(4, 9)]})
+            self.assertEqual(self.store.get_item_locations(9999), {})
+            for slot in range(1, 6):
+                for item, locations in self.store.get_item_locations(slot).items():
+                    self.assertEqual(pairs(locations),
+                                     sorted(entry[:2] for entry in self.store.find_item({slot}, item)))
+
         def test_location_set_intersection(self) -> None:
             locations = {10, 11, 12}
             locations.intersection_update(self.store[1])
@@ -222,6 +282,9 @@ class Base:
                 self.assertEqual(store.get_missing(full_state, 0, 1), [])
                 self.assertEqual(store.get_remaining(empty_state, 0, 1), [])
                 self.assertEqual(store.get_remaining(full_state, 0, 1), [])
+                self.assertEqual(store.get_counts(full_state, 0), {1: (0, 0)})
+                self.assertEqual(list(store.get_all_missing(empty_state, 0)[1]), [])
+                self.assertEqual(store.get_item_locations(1), {})
 
         def test_no_locations_for_1(self) -> None:
             store = self.type({
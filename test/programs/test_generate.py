@@ -1,5 +1,6 @@
 # Tests for Generate.py (ArchipelagoGenerate.exe)
 
+import json
 import unittest
 import os
 import os.path
@@ -7,6 +8,7 @@ import sys
 
 from pathlib import Path
 from tempfile import TemporaryDirectory
+from unittest import mock
 
 import Generate
 import Main
@@ -72,6 +74,42 @@ class TestGenerateMain(unittest.TestCase):
 
         self.assertOutput(self.output_tempdir.name)
 
+    def test_generate_profile_report(self):
+        report_path = os.path.join(self.output_tempdir.name, "profile.json")
+        sys.argv = [sys.argv[0], '--seed', '0',
+                    '--player_files_path', str(self.abs_input_dir),
+                    '--outputpath', self.output_tempdir.name,
+                    '--profile_report', report_path, '--profile_rules']
+        Main.main(*Generate.main())
+
+        self.assertOutput(self.output_tempdir.name)
+        with open(report_path) as f:
+            report = json.load(f)
+        self.assertTrue(os.path.exists(os.path.join(self.output_tempdir.name, "profile.html")))
+        stages = {stage["stage"] for stage in report["stages"]}
+        self.assertTrue({"generate_early", "create_regions", "set_rules", "post_fill"} <= stages, stages)
+        self.assertTrue(report["fill_steps"])
+        self.assertGreater(report["can_reach_calls"]["Location"], 0)
+        self.assertTrue(report["access_rules"])
+        # both read the same rule statistics
+        self.assertTrue(all(rule["time"] >= rule["self_time"] for rule in report["access_rules"]))
+        self.assertEqual(len(list(Path(self.output_tempdir.name).glob('*_Rules.folded'))), 1)
+
+    def test_generate_batch(self):
+        sys.argv = [sys.argv[0], '--seed', '0',
+                    '--player_files_path', str(self.abs_input_dir),
+                    '--outputpath', self.output_tempdir.name,
+                    '--batch', '3', '--batch_processes', '2']
+        with mock.patch.object(Generate, "import_rolled_worlds", wraps=Generate.import_rolled_worlds) as import_worlds:
+            results = Generate.generate_batch(Generate.mystery_argparse())
+
+        # the rolled games are imported before forking, also when worlds are imported lazily
+        import_worlds.assert_called_once()
+        self.assertEqual([yaml["game"] for yaml in import_worlds.call_args.args[0]], [{"APQuest": 1}])
+        self.assertEqual([error for seed, error in results], [None] * 3)
+        self.assertEqual(len({seed for seed, error in results}), 3)
+        self.assertEqual(len(list(Path(self.output_tempdir.name).glob('*.zip'))), 3)
+
     def test_generate_yaml(self):
         # override host.yaml
         from settings import get_settings
@@ -108,8 +146,10 @@ class TestGenerateWeights(TestGenerateMain):
     # don't need to run these tests
     test_generate_absolute = None
     test_generate_relative = None
+    test_generate_profile_report = None
+    test_generate_batch = None
 
-    def test_generate_yaml(self):
+    def generate_weights(self, *args: str):
         from settings import get_settings
         from Utils import user_path, local_path
         settings = get_settings()
@@ -119,15 +159,18 @@ class TestGenerateWeights(TestGenerateMain):
         user_path_backup = user_path.cached_path
         user_path.cached_path = local_path()
         try:
-            sys.argv = [sys.argv[0], "--seed", "1"]
-            namespace, seed = Generate.main()
+            sys.argv = [sys.argv[0], "--seed", "1", *args]
+            return Generate.main()
         finally:
             user_path.cached_path = user_path_backup
 
+    def test_generate_yaml(self):
+        namespace, seed = self.generate_weights()
+
         # there's likely a better way to do this, but hardcode the results from seed 1 to ensure they're always this
         expected_results = {
-            "accessibility": [0, 2, 0, 2, 2],
-            "progression_balancing": [0, 50, 99, 0, 50],
+            "accessibility": [0, 2, 0, 2, 0],
+            "progression_balancing": [50, 50, 50, 99, 0],
         }
 
         self.assertEqual(seed, 1)
@@ -137,3 +180,18 @@ class TestGenerateWeights(TestGenerateMain):
                     result, getattr(namespace, option_name)[player].value,
                     "Generated results from weights file did not match expected value."
                 )
+
+    def test_generate_yaml_processes(self):
+        """Test that rolling in multiple processes gives the same results as rolling in this one."""
+        serial, _ = self.generate_weights()
+        parallel, _ = self.generate_weights("--yaml_processes", "2")
+        rolled_options = [option_name for option_name, value in vars(serial).items()
+                          if isinstance(value, dict) and value and set(value) <= set(serial.name)]
+        self.assertIn("accessibility", rolled_options)
+        self.assertIn("progression_balancing", rolled_options)
+        for option_name in rolled_options:
+            with self.subTest(option=option_name):
+                self.assertEqual({player: getattr(value, "value", value)
+                                  for player, value in getattr(serial, option_name).items()},
+                                 {player: getattr(value, "value", value)
+                                  for player, value in getattr(parallel, option_name).items()})
@@ -1,5 +1,15 @@
+import asyncio
+import os
+import sys
+import tempfile
+import typing
 import unittest
-from MultiServer import Context, ServerCommandProcessor
+
+from MultiServer import Client, Context, SaveJournal, ServerCommandProcessor, send_items_to, send_new_items
+from NetUtils import Hint, NetworkItem, encode
+
+if typing.TYPE_CHECKING:
+    from NetUtils import ServerConnection
 
 
 class TestResolvePlayerName(unittest.TestCase):
@@ -38,3 +48,185 @@ class TestResolvePlayerName(unittest.TestCase):
         assert p.resolve_player("ABC") == (1, 2, "abc"), "case insensitive resolves when 1 match"
         assert p.resolve_player("abcd") == (1, 3, "abCD"), "case insensitive resolves when 1 match"
         assert not p.resolve_player("aB"), "partial name shouldn't resolve to player"
+
+
+class TestSaveJournal(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.save_filename = os.path.join(self.directory.name, "test.apsave")
+        self.ctx = self.create_context()
+        self.ctx.save_journal = SaveJournal(self.save_filename)
+        self.ctx.received_items[0, 1, True] = [NetworkItem(1, 1, 1, 0)]
+        self.ctx.location_checks[0, 1] = {1}
+        self.assertTrue(self.ctx.save(now=True))
+        self.snapshot_size = os.path.getsize(self.save_filename)
+
+    def create_context(self) -> Context:
+        ctx = Context("", 0, "", "", 0, 0, False)
+        ctx.connect_names = {"Player1": (0, 1)}
+        ctx.save_filename = self.save_filename
+        ctx.saving = True
+        return ctx
+
+    def load(self) -> Context:
+        ctx = self.create_context()
+        ctx.set_save(SaveJournal(self.save_filename).load(ctx.logger))
+        return ctx
+
+    def change(self) -> None:
+        self.ctx.received_items[0, 1, True].append(NetworkItem(2, 2, 1, 0))
+        self.ctx.location_checks[0, 1].add(2)
+        self.ctx.hints[0, 1].add(Hint(1, 1, 3, 3, False))
+        self.ctx.on_changed_hints(0, 1)
+        self.ctx.hints_used[0, 1] += 1
+        self.ctx.stored_data["key"] = [1, 2]
+        self.ctx.save_journal.set_stored_data("key")
+
+    def assertSaveEqual(self, first: Context, second: Context) -> None:
+        self.assertEqual(first.received_items, second.received_items)
+        self.assertEqual(first.location_checks, second.location_checks)
+        self.assertEqual(first.hints, second.hints)
+        self.assertEqual(first.hints_used, second.hints_used)
+        self.assertEqual(first.stored_data, second.stored_data)
+
+    def test_replay(self) -> None:
+        """Test that changes are appended to the journal and replayed onto the snapshot"""
+        self.change()
+        self.assertTrue(self.ctx.save(now=True))
+        self.assertEqual(os.path.getsize(self.save_filename), self.snapshot_size, "Snapshot was rewritten")
+        self.ctx.received_items[0, 1, True].append(NetworkItem(3, 3, 1, 0))
+        self.assertTrue(self.ctx.save(now=True))
+        self.assertSaveEqual(self.load(), self.ctx)
+
+    def test_changed_hints(self) -> None:
+        """Test that only the hints of slots that changed since the previous save are journaled"""
+        self.ctx.hints[0, 2].add(Hint(2, 2, 5, 5, False))
+        self.ctx.on_changed_hints(0, 2)
+        self.change()
+        self.assertTrue(self.ctx.save(now=True))
+        self.ctx.hints[0, 2].add(Hint(2, 2, 6, 6, False))
+        self.ctx.on_changed_hints(0, 2)
+        self.assertTrue(self.ctx.save(now=True))
+        with open(self.ctx.save_journal.path, "rb") as f:
+            frames = list(SaveJournal.decode_frames(f.read()))
+        hint_records = [{record[1]: record[2] for record in records if record[0] == "hints"}
+                        for records in frames[1:]]
+        self.assertEqual(hint_records, [{(0, 1): self.ctx.hints[0, 1], (0, 2): {Hint(2, 2, 5, 5, False)}},
+                                        {(0, 2): self.ctx.hints[0, 2]}])
+        self.assertEqual(self.load().hints, self.ctx.hints)
+
+    def test_incomplete_frame(self) -> None:
+        """Test that a journal cut off while saving only loses the last save"""
+        first_save = self.load()
+        self.change()
+        self.assertTrue(self.ctx.save(now=True))
+        with open(self.ctx.save_journal.path, "rb+") as f:
+            f.truncate(os.path.getsize(self.ctx.save_journal.path) - 1)
+        with self.assertLogs(level="WARNING"):
+            self.assertSaveEqual(self.load(), first_save)
+
+    def test_exit_snapshot(self) -> None:
+        """Test that saving on exit writes a snapshot that doesn't need the journal"""
+        self.change()
+        self.assertTrue(self.ctx._save(True))  # pyright: ignore[reportPrivateUsage]
+        os.remove(self.ctx.save_journal.path)
+        self.assertSaveEqual(self.load(), self.ctx)
+
+
+class TestHintIndex(unittest.TestCase):
+    def test_recheck_location_hints(self) -> None:
+        """Test that checking a hinted location updates the hint for every player holding it, and only those"""
+        ctx = Context("", 0, "", "", 0, 0, False)
+        ctx.connect_names = {"Player1": (0, 1), "Player2": (0, 2), "Player3": (0, 3)}
+        hint = Hint(2, 1, 3, 3, False)
+        other_hint = Hint(3, 3, 4, 4, False)
+        save = ctx.get_save()
+        save["hints"] = {(0, 1): {hint}, (0, 2): {hint}, (0, 3): {other_hint}}
+        ctx.set_save(save)
+        self.assertEqual(ctx.get_hint(0, 1, 3), hint)
+
+        changed: typing.Set[typing.Tuple[int, int]] = set()
+        ctx.location_checks[0, 1].add(2)
+        ctx.recheck_location_hints(0, 1, [2], changed)
+        self.assertEqual(changed, set(), "Checking an unhinted location changed hints")
+
+        ctx.location_checks[0, 1].add(3)
+        ctx.recheck_location_hints(0, 1, [3], changed)
+        self.assertEqual(changed, {(0, 1), (0, 2)})
+        found_hint = ctx.get_hint(0, 1, 3)
+        assert found_hint
+        self.assertTrue(found_hint.found)
+        self.assertEqual(ctx.hints[0, 1], {found_hint})
+        self.assertEqual(ctx.hints[0, 2], {found_hint})
+        self.assertTrue(all(hint.found for hint in ctx.hints[0, 2]))
+        self.assertEqual(ctx.hints[0, 3], {other_hint})
+
+
+class TestOutboundBatching(unittest.IsolatedAsyncioTestCase):
+    async def test_batched_frame(self) -> None:
+        """Test that the items and room updates of one event loop tick are sent as one frame, encoded once per slot"""
+        ctx = Context("", 0, "", "", 0, 0, False)
+        ctx.location_check_points = 1
+        # clients without a connection, only the encoded frames are of interest
+        clients = [Client(typing.cast("ServerConnection", None), ctx) for _ in range(2)]
+        for client in clients:
+            client.team, client.slot = 0, 1
+        ctx.clients = {0: {1: clients}}
+        encoded: typing.List[typing.List[typing.Dict[str, typing.Any]]] = []
+
+        def dumper(msgs: typing.List[typing.Dict[str, typing.Any]]) -> str:
+            encoded.append(msgs)
+            return encode(msgs)
+
+        ctx.dumper = dumper
+        send_items_to(ctx, 0, 1, NetworkItem(1, 1, 2, 0))
+        send_new_items(ctx)
+        ctx.location_checks[0, 1] = {1}
+        ctx.queue_room_update(0, 1, [1], hint_points=True)
+        ctx.location_checks[0, 1].add(2)
+        ctx.queue_room_update(0, 1, [2])
+        self.assertEqual(encoded, [], "Messages were sent before the end of the tick")
+        await asyncio.sleep(0)
+
+        # hint points are those at the end of the tick, including checks made after they were queued
+        self.assertEqual(encoded, [[
+            {"cmd": "ReceivedItems", "index": 0, "items": [NetworkItem(1, 1, 2, 0)]},
+            {"cmd": "RoomUpdate", "checked_locations": {1, 2}, "hint_points": 2},
+        ]])
+        self.assertEqual([client.send_index for client in clients], [1, 1])
+        self.assertEqual(ctx.outbound_stats.batch_encodes, 1)
+        self.assertEqual(ctx.outbound_stats.batched_messages, 4)
+
+
+class TestSharedGameData(unittest.TestCase):
+    def test_interned_name_tables(self) -> None:
+        """Test that rooms share the name lookup tables of games, and don't count them as their own memory"""
+        multidata_path = os.path.join(os.path.dirname(__file__), "..", "webhost", "data", "One_Archipelago.archipelago")
+        first, second = Context("", 0, "", "", 0, 0, False), Context("", 0, "", "", 0, 0, False)
+        first.load(multidata_path)
+        second.load(multidata_path)
+        game = next(game for game in first.gamespackage if game != "Archipelago")
+        self.assertIs(first.item_names[game], second.item_names[game])
+        self.assertIs(first.all_location_and_group_names[game], second.all_location_and_group_names[game])
+        for item_name, item_id in first.gamespackage["Archipelago"]["item_name_to_id"].items():
+            self.assertEqual(first.item_names[game][item_id], item_name)
+
+        usage = first.get_memory_usage()
+        self.assertLess(usage["item_names"], sys.getsizeof(first.item_names[game]) * len(first.item_names))
+
+    def test_unknown_id_keeps_interned_tables(self) -> None:
+        """Test that looking up an unknown ID in one room doesn't modify the name lookup tables shared with others"""
+        multidata_path = os.path.join(os.path.dirname(__file__), "..", "webhost", "data", "One_Archipelago.archipelago")
+        first, second = Context("", 0, "", "", 0, 0, False), Context("", 0, "", "", 0, 0, False)
+        first.load(multidata_path)
+        second.load(multidata_path)
+        game = next(game for game in first.gamespackage if game != "Archipelago")
+        item_names = dict(second.item_names[game])
+        location_names = dict(second.location_names[game])
+        unknown_id = max(*item_names, *location_names) + 1
+        self.assertEqual(first.item_names[game][unknown_id], f"Unknown item (ID:{unknown_id})")
+        self.assertEqual(first.location_names[game][unknown_id], f"Unknown location (ID:{unknown_id})")
+        self.assertEqual(second.item_names[game], item_names)
+        self.assertEqual(second.location_names[game], location_names)
+        self.assertNotIn(unknown_id, second.item_names[game])
@@ -1,10 +1,14 @@
 # Tests that yaml wrappers in Utils.py do what they should
 
+import os
 import unittest
+from tempfile import TemporaryDirectory
 from typing import cast, Any, ClassVar, Dict
+from unittest import mock
 
+import Utils
 from Utils import dump, Dumper  # type: ignore[attr-defined]
-from Utils import parse_yaml, parse_yamls, unsafe_parse_yaml
+from Utils import evict_yaml_cache, parse_yaml, parse_yamls, parse_yamls_cached, unsafe_parse_yaml
 
 
 class AClass:
@@ -66,3 +70,53 @@ class TestYaml(unittest.TestCase):
             parse_yaml(s)
         with self.assertRaises(Exception):
             next(parse_yamls(s))
+
+
+class TestYamlCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tempdir = TemporaryDirectory()
+        self.original_cache_path = getattr(Utils.cache_path, "cached_path", None)
+        Utils.cache_path.cached_path = self.tempdir.name  # type: ignore[attr-defined]
+
+    def tearDown(self) -> None:
+        if self.original_cache_path is None:
+            del Utils.cache_path.cached_path  # type: ignore[attr-defined]
+        else:
+            Utils.cache_path.cached_path = self.original_cache_path  # type: ignore[attr-defined]
+        self.tempdir.cleanup()
+
+    def cache_entries(self) -> int:
+        folder = os.path.join(self.tempdir.name, "yaml")
+        return len(os.listdir(folder)) if os.path.exists(folder) else 0
+
+    def test_cached(self) -> None:
+        """Test that parsing the same data again loads it from the cache"""
+        data = "name: Player\n---\ngame: {A: 1, B: 0}\n"
+        parsed = parse_yamls_cached(data)
+        self.assertEqual(parsed, tuple(parse_yamls(data)))
+        self.assertEqual(self.cache_entries(), 1)
+        with mock.patch("Utils.parse_yamls", side_effect=AssertionError("parsed again")):
+            self.assertEqual(parse_yamls_cached(data), parsed)
+            self.assertEqual(parse_yamls_cached(data.encode("utf-8")), parsed)
+
+    def test_disabled(self) -> None:
+        self.assertEqual(parse_yamls_cached("a: 1", use_cache=False), ({"a": 1},))
+        self.assertEqual(self.cache_entries(), 0)
+
+    def test_not_marshallable(self) -> None:
+        """Test that documents marshal can't store are parsed, but not cached"""
+        self.assertEqual(len(parse_yamls_cached("date: 2024-01-01")), 1)
+        self.assertEqual(self.cache_entries(), 0)
+
+    def test_eviction(self) -> None:
+        with mock.patch("Utils.yaml_cache_max_entries", 2):
+            for n in range(4):
+                parse_yamls_cached(f"a: {n}")
+            self.assertEqual(self.cache_entries(), 4)
+            evict_yaml_cache()
+        self.assertEqual(self.cache_entries(), 2)
+
+    def test_invalid(self) -> None:
+        with self.assertRaises(Exception):
+            parse_yamls_cached("a: 1\na: 2")
+        self.assertEqual(self.cache_entries(), 0)
@@ -1,4 +1,11 @@
+import asyncio
+import datetime
+import logging
 import os
+import unittest
+from pathlib import Path
+from typing import Any, ClassVar
+from unittest import mock
 from uuid import UUID, uuid4, uuid5
 
 from flask import url_for
@@ -191,3 +198,144 @@ class TestHostFakeRoom(TestBase):
         with db_session:
             commands = select(command for command in Command if command.room.id == self.room_id)  # type: ignore
             self.assertNotIn("/help", (command.commandtext for command in commands))
+
+
+class TestRoomHost(TestBase, unittest.IsolatedAsyncioTestCase):
+    """Tests hibernation of a hosted room, with the room's server running in the test's event loop."""
+    room_id: UUID
+    data: ClassVar[bytes]
+    hibernation_delay: ClassVar[float] = .1
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        with (Path(__file__).parent / "data" / "One_Archipelago.archipelago").open("rb") as f:
+            cls.data = f.read()
+
+    def setUp(self) -> None:
+        from pony.orm import db_session
+        from WebHostLib.customserver import WebHostContext
+        from WebHostLib.models import Room, Seed
+
+        super().setUp()
+        # the in-memory database only exists for this thread, so the command thread would find no tables
+        patcher = mock.patch.object(WebHostContext, "listen_to_db_commands")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        with db_session:
+            owner = uuid4()
+            room = Room(seed=Seed(multidata=self.data, owner=owner), owner=owner, tracker=uuid4())
+            self.room_id = room.id
+
+    def tearDown(self) -> None:
+        from pony.orm import db_session
+        from WebHostLib.models import Room
+
+        with db_session:
+            room: Room = Room.get(id=self.room_id)
+            room.seed.delete()
+            room.delete()
+
+    async def start_room_host(self) -> Any:
+        """Activate and serve the room on a free port, like start_room does, and schedule its hibernation."""
+        import websockets
+        from WebHostLib.customserver import RoomHost, get_static_server_data
+
+        room_host = RoomHost(self.room_id, get_static_server_data(), logging.getLogger("RoomHost Test"),
+                             self.hibernation_delay)
+        ctx = room_host.activate()
+        room_host.server = ctx.server = websockets.serve(room_host.serve, "localhost", 0)
+        await room_host.server
+        self.addAsyncCleanup(self.stop_room_host, room_host)
+        room_host.schedule_hibernation()
+        return room_host
+
+    @staticmethod
+    async def stop_room_host(room_host: Any) -> None:
+        if room_host.hibernation_timer:
+            room_host.hibernation_timer.cancel()
+        if room_host.ctx:
+            room_host.ctx.exit_event.set()
+        room_host.server.ws_server.close()
+        await room_host.server.ws_server.wait_closed()
+
+    @staticmethod
+    def get_port(room_host: Any) -> int:
+        return room_host.server.ws_server.sockets[0].getsockname()[1]
+
+    def get_save(self) -> Any:
+        from pony.orm import db_session
+        from Utils import restricted_loads
+        from WebHostLib.models import Room
+
+        with db_session:
+            return restricted_loads(Room.get(id=self.room_id).multisave)
+
+    async def hibernate(self, room_host: Any) -> None:
+        await asyncio.sleep(self.hibernation_delay * 3)
+        self.assertIsNone(room_host.ctx, "Room did not hibernate")
+
+    async def test_hibernation_saves(self) -> None:
+        """Verify that a room without clients hibernates after the delay and its save reaches the database."""
+        room_host = await self.start_room_host()
+        ctx = room_host.ctx
+        ctx.location_checks[0, 1].add(1)
+        await self.hibernate(room_host)
+
+        self.assertTrue(ctx.exit_event.is_set())
+        self.assertFalse(room_host.activated.is_set())
+        self.assertIn(1, self.get_save()["location_checks"][0, 1])
+
+    async def test_wake_up(self) -> None:
+        """Verify that a connection to a hibernating room loads it again on the same port, with its state intact."""
+        import websockets
+
+        room_host = await self.start_room_host()
+        port = self.get_port(room_host)
+        old_ctx = room_host.ctx
+        old_ctx.location_checks[0, 1].add(1)
+        old_ctx.hints_used[0, 1] = 2
+        await self.hibernate(room_host)
+
+        activation = asyncio.create_task(room_host.wait_for_activation(60))
+        async with websockets.connect(f"ws://localhost:{port}") as websocket:
+            room_info = await websocket.recv()
+            self.assertIn("RoomInfo", room_info)
+            ctx = await activation
+            self.assertIsNotNone(ctx)
+            self.assertIsNot(ctx, old_ctx)
+            self.assertIs(ctx, room_host.ctx)
+            self.assertEqual(self.get_port(room_host), port)
+            self.assertEqual(ctx.location_checks[0, 1], {1})
+            self.assertEqual(ctx.hints_used[0, 1], 2)
+            self.assertEqual(len(room_host.activation_times), 2)
+        # hibernates again once the client left
+        await self.hibernate(room_host)
+
+    async def test_hibernating_timeout(self) -> None:
+        """Verify that a hibernating room shuts down once its timeout passed without a connection."""
+        room_host = await self.start_room_host()
+        await self.hibernate(room_host)
+
+        self.assertIsNone(await room_host.wait_for_activation(self.hibernation_delay))
+        self.assertIsNone(room_host.ctx)
+
+    async def test_saving_thread_stops(self) -> None:
+        """Verify that the saving thread of a hibernated room stops without saving again."""
+        def get_saving_second(seed_name: str, interval: int = 60) -> float:
+            # wake the saving thread up a second after it started, instead of up to a minute
+            now = datetime.datetime.now()
+            return (now.second + now.microsecond / 1_000_000 + 1) % interval
+
+        with mock.patch("MultiServer.get_saving_second", get_saving_second):
+            room_host = await self.start_room_host()
+        ctx = room_host.ctx
+        saving_thread = ctx.auto_saver_thread
+        self.assertTrue(saving_thread.is_alive())
+        ctx.save_dirty = True
+        await self.hibernate(room_host)
+
+        with mock.patch.object(ctx, "_save") as save:
+            await asyncio.get_running_loop().run_in_executor(None, saving_thread.join, 5)
+        self.assertFalse(saving_thread.is_alive(), "Saving thread did not stop")
+        save.assert_not_called()
@@ -7,9 +7,10 @@ import sys
 import time
 from random import Random
 from dataclasses import make_dataclass
-from typing import (Any, Callable, ClassVar, Dict, FrozenSet, Iterable, List, Mapping, Optional, Set, TextIO, Tuple,
-                    TYPE_CHECKING, Type, Union)
+from typing import (Any, Callable, ClassVar, Dict, FrozenSet, Iterable, Iterator, List, Mapping, MutableMapping,
+                    Optional, Set, TextIO, Tuple, TYPE_CHECKING, Type, Union)
 
+import generation_profile
 from Options import item_and_loc_options, ItemsAccessibility, OptionGroup, PerGameCommonOptions
 from BaseClasses import CollectionState
 from Utils import Version
@@ -18,6 +19,7 @@ if TYPE_CHECKING:
     from BaseClasses import MultiWorld, Item, Location, Tutorial, Region, Entrance
     from NetUtils import GamesPackage, MultiData
     from settings import Group
+    from worlds import WorldSource
 
 perf_logger = logging.getLogger("performance")
 
@@ -26,8 +28,68 @@ class InvalidItemError(KeyError):
     pass
 
 
+class LazyWorldTypes(MutableMapping[str, "Type[World]"]):
+    """
+    AutoWorldRegister.world_types when worlds are loaded lazily.
+    Games of deferred world sources are listed without importing them. A deferred world is imported the first time its
+    game is looked up, or when something imports its module directly.
+    """
+    _worlds: Dict[str, Optional[Type[World]]]
+    """world types in registration order, None while deferred"""
+    _sources: Dict[str, WorldSource]
+
+    def __init__(self) -> None:
+        self._worlds = {}
+        self._sources = {}
+
+    def defer(self, game: str, source: WorldSource) -> None:
+        """List game without importing it, until it is looked up."""
+        if game not in self._worlds:
+            self._worlds[game] = None
+            self._sources[game] = source
+
+    @property
+    def loaded(self) -> Dict[str, Type[World]]:
+        """The world types that are imported already."""
+        return {game: world for game, world in self._worlds.items() if world is not None}
+
+    def is_deferred(self, game: str) -> bool:
+        return game in self._sources
+
+    def __getitem__(self, game: str) -> Type[World]:
+        world = self._worlds[game]
+        if world is None:
+            self._sources[game].load()
+            world = self._worlds[game]
+            if world is None:
+                # import failed or the world source no longer registers this game
+                del self._worlds[game]
+                del self._sources[game]
+                raise KeyError(game)
+        return world
+
+    def __setitem__(self, game: str, world: Type[World]) -> None:
+        source = self._sources.pop(game, None)
+        if source and source.game == game and source.world_version:
+            world.world_version = source.world_version
+        self._worlds[game] = world
+
+    def __delitem__(self, game: str) -> None:
+        del self._worlds[game]
+        self._sources.pop(game, None)
+
+    def __contains__(self, game: object) -> bool:
+        return game in self._worlds
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._worlds)
+
+    def __len__(self) -> int:
+        return len(self._worlds)
+
+
 class AutoWorldRegister(type):
-    world_types: Dict[str, Type[World]] = {}
+    world_types: Union[Dict[str, Type[World]], LazyWorldTypes] = {}
     __file__: str
     zip_path: Optional[str]
     settings_key: str
@@ -88,7 +150,9 @@ class AutoWorldRegister(type):
         new_class = super().__new__(mcs, name, bases, dct)
         new_class.__file__ = sys.modules[new_class.__module__].__file__
         if "game" in dct:
-            if dct["game"] in AutoWorldRegister.world_types:
+            world_types = AutoWorldRegister.world_types
+            if dct["game"] in world_types and not (isinstance(world_types, LazyWorldTypes)
+                                                   and world_types.is_deferred(dct["game"])):
                 raise RuntimeError(f"""Game {dct["game"]} already registered in 
                 {AutoWorldRegister.world_types[dct["game"]].__file__} when attempting to register from
                 {new_class.__file__}.""")
@@ -165,7 +229,10 @@ class WebWorldRegister(type):
 def _timed_call(method: Callable[..., Any], *args: Any,
                 multiworld: Optional["MultiWorld"] = None, player: Optional[int] = None) -> Any:
     start = time.perf_counter()
-    ret = method(*args)
+    if generation_profile.active:
+        ret = generation_profile.active.record_stage(method, args, multiworld, player)
+    else:
+        ret = method(*args)
     taken = time.perf_counter() - start
     if taken > 1.0:
         if player and multiworld:
@@ -318,6 +385,11 @@ class World(metaclass=AutoWorldRegister):
     If False, everything is rechecked at every step, which is slower computationally, 
     but may be desirable in complex/dynamic worlds."""
 
+    compact_prog_items: ClassVar[bool] = False
+    """If True, this world's items in CollectionState.prog_items are stored as BaseClasses.ItemCounts instead of a
+    Counter, which is cheaper to copy. Only use this if the world only stores positive integer counts up to 65535 in
+    prog_items and doesn't rely on Counter-specific methods other than total() and update()."""
+
     multiworld: "MultiWorld"
     """autoset on creation. The MultiWorld object for the currently generating multiworld."""
     player: int
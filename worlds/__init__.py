@@ -2,7 +2,10 @@ import importlib
 import importlib.abc
 import importlib.machinery
 import logging
+import marshal
+import mmap
 import os
+import struct
 import sys
 import zipimport
 import time
@@ -10,11 +13,14 @@ import dataclasses
 import json
 from pathlib import Path
 from types import ModuleType
-from typing import List, Sequence
+from typing import Any, Dict, Iterator, List, MutableMapping, Optional, Sequence, Tuple, Type, TYPE_CHECKING, cast
 from zipfile import BadZipFile
 
-from NetUtils import DataPackage
-from Utils import local_path, user_path, Version, version_tuple, tuplize_version, messagebox
+from NetUtils import DataPackage, GamesPackage
+from Utils import cache_path, local_path, user_path, Version, version_tuple, tuplize_version, messagebox, __version__
+
+if TYPE_CHECKING:
+    from .AutoWorld import World
 
 local_folder = os.path.dirname(__file__)
 user_folder = user_path("worlds") if user_path() != local_path() else user_path("custom_worlds")
@@ -30,11 +36,23 @@ __all__ = [
     "local_folder",
     "user_folder",
     "failed_world_loads",
+    "lazy_load",
+    "get_loaded_world_types",
+    "get_world_settings_names",
 ]
 
 
 failed_world_loads: List[str] = []
 
+lazy_load: bool = os.environ.get("AP_LAZY_WORLDS", "").lower() in ("1", "true", "yes")
+"""Only import a world when its game is first looked up in AutoWorldRegister.world_types.
+Opted into by setting AP_LAZY_WORLDS before worlds is imported, by programs that only need some of the games."""
+
+world_index_version = 1
+"""Version of the world index format, bump when changing it."""
+data_package_cache_version = 1
+"""Version of the data package cache format, bump when changing it."""
+
 
 @dataclasses.dataclass(order=True)
 class WorldSource:
@@ -43,6 +61,8 @@ class WorldSource:
     relative: bool = True  # relative to regular world import folder
     time_taken: float = -1.0
     version: Version = Version(0, 0, 0)
+    game: Optional[str] = None  # game of the manifest
+    world_version: Optional[Version] = None  # world_version of the manifest, applied to the world class of game
 
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}({self.path}, is_zip={self.is_zip}, relative={self.relative})"
@@ -53,6 +73,39 @@ class WorldSource:
             return os.path.join(local_folder, self.path)
         return self.path
 
+    @property
+    def module_name(self) -> str:
+        return f"worlds.{Path(self.path).stem}"
+
+    def get_stamp(self) -> List[int]:
+        """Size and modification time of the source, which change when any of its files change."""
+        if self.is_zip:
+            stat = os.stat(self.resolved_path)
+            return [stat.st_size, stat.st_mtime_ns]
+        file_count = 0
+        mtime = os.stat(self.resolved_path).st_mtime_ns
+        for dirpath, dirnames, filenames in os.walk(self.resolved_path):
+            if "__pycache__" in dirnames:
+                dirnames.remove("__pycache__")
+            for name in dirnames + filenames:
+                mtime = max(mtime, os.stat(os.path.join(dirpath, name)).st_mtime_ns)
+            file_count += len(filenames)
+        return [file_count, mtime]
+
+    def read_manifest(self) -> None:
+        """Read game and world_version from the archipelago.json of a world folder."""
+        manifest = {}
+        for dirpath, dirnames, filenames in os.walk(self.resolved_path):
+            for file in filenames:
+                if file.endswith("archipelago.json"):
+                    with open(os.path.join(dirpath, file), mode="r", encoding="utf-8") as manifest_file:
+                        manifest = json.load(manifest_file)
+                    break
+            if manifest:
+                break
+        self.game = manifest.get("game")
+        self.world_version = tuplize_version(manifest.get("world_version", "0.0.0"))
+
     def load(self) -> bool:
         try:
             start = time.perf_counter()
@@ -91,6 +144,62 @@ for folder in (folder for folder in (user_folder, local_folder) if folder):
             elif entry.is_file() and entry.name.endswith(".apworld"):
                 world_sources.append(WorldSource(file_name, is_zip=True, relative=relative))
 
+from .AutoWorld import AutoWorldRegister, LazyWorldTypes
+
+
+def _has_settings(world: Type["World"]) -> bool:
+    annotation = world.__annotations__.get("settings", None)
+    return annotation is not None and annotation != "ClassVar[Optional['Group']]"
+
+
+def _read_world_index() -> Dict[str, Any]:
+    """The world index maps each world source, by path and stamp, to the games it registers and their settings."""
+    try:
+        with open(cache_path("worlds", "index.json"), encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if index.get("version") != world_index_version or index.get("core_version") != __version__:
+        return {}
+    return index.get("sources", {})
+
+
+def _write_world_index(sources: Dict[str, Any]) -> None:
+    path = cache_path("worlds", "index.json")
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # per process, as several processes may start at once and all write the index
+        with open(f"{path}.{os.getpid()}.tmp", "w", encoding="utf-8") as f:
+            json.dump({"version": world_index_version, "core_version": __version__, "sources": sources}, f)
+        os.replace(f"{path}.{os.getpid()}.tmp", path)
+    except OSError as e:
+        logging.debug(f"Could not write world index: {e}")
+
+
+_world_index = _read_world_index()
+_stamps: Dict[str, List[int]] = {}
+_deferred_world_settings: Dict[str, str] = {}  # settings_key: world class, for worlds that were not imported yet
+if lazy_load:
+    AutoWorldRegister.world_types = LazyWorldTypes()
+
+
+def _load_world_source(world_source: WorldSource) -> None:
+    """Import world_source, or when loading lazily and it is unchanged since it was indexed, only list its games."""
+    if lazy_load:
+        stamp = _stamps[world_source.resolved_path] = world_source.get_stamp()
+        entry = _world_index.get(world_source.resolved_path)
+        if entry and entry["stamp"] == stamp:
+            world_types = cast(LazyWorldTypes, AutoWorldRegister.world_types)
+            for game, settings_entry in entry["games"].items():
+                if game not in world_types:
+                    world_types.defer(game, world_source)
+                    if settings_entry:
+                        _deferred_world_settings[settings_entry[0]] = settings_entry[1]
+            return
+    if world_source.load() and world_source.game in AutoWorldRegister.world_types and world_source.world_version:
+        AutoWorldRegister.world_types[world_source.game].world_version = world_source.world_version
+
+
 # import all submodules to trigger AutoWorldRegister
 world_sources.sort()
 apworlds: list[WorldSource] = []
@@ -99,25 +208,8 @@ for world_source in world_sources:
     if world_source.is_zip:
         apworlds.append(world_source)
     else:
-        world_source.load()
-
-from .AutoWorld import AutoWorldRegister
-
-for world_source in world_sources:
-    if not world_source.is_zip:
-        # look for manifest
-        manifest = {}
-        for dirpath, dirnames, filenames in os.walk(world_source.resolved_path):
-            for file in filenames:
-                if file.endswith("archipelago.json"):
-                    with open(os.path.join(dirpath, file), mode="r", encoding="utf-8") as manifest_file:
-                        manifest = json.load(manifest_file)
-                    break
-            if manifest:
-                break
-        game = manifest.get("game")
-        if game in AutoWorldRegister.world_types:
-            AutoWorldRegister.world_types[game].world_version = tuplize_version(manifest.get("world_version", "0.0.0"))
+        world_source.read_manifest()
+        _load_world_source(world_source)
 
 if apworlds:
     # encapsulation for namespace / gc purposes
@@ -194,18 +286,215 @@ if apworlds:
                 spec = importer.find_spec(f"worlds.{world_name}")
                 apworld_module_specs[f"worlds.{world_name}"] = spec
 
-                apworld_source.load()
-                if apworld.game in AutoWorldRegister.world_types:
-                    # world could fail to load at this point
-                    if apworld.world_version:
-                        AutoWorldRegister.world_types[apworld.game].world_version = apworld.world_version
+                apworld_source.game = apworld.game
+                apworld_source.world_version = apworld.world_version
+                _load_world_source(apworld_source)
     load_apworlds()
     del load_apworlds
 
 del apworlds
 
-# Build the data package for each game.
-network_data_package: DataPackage = {
-    "games": {world_name: world.get_data_package_data() for world_name, world in AutoWorldRegister.world_types.items()},
-}
 
+def get_loaded_world_types() -> Dict[str, Type["World"]]:
+    """The world types that are imported already, which are all of them unless worlds are loaded lazily."""
+    world_types = AutoWorldRegister.world_types
+    if isinstance(world_types, LazyWorldTypes):
+        return world_types.loaded
+    return world_types
+
+
+def get_world_settings_names() -> Dict[str, str]:
+    """Map the settings_key of each world that defines settings to its world class, without importing any world."""
+    names = _deferred_world_settings.copy()
+    for world in get_loaded_world_types().values():
+        if _has_settings(world):
+            names[world.settings_key] = f"{world.__module__}.{world.__name__}"
+    return names
+
+
+def _get_world_source_paths() -> Dict[str, str]:
+    """Map the game of each imported world to the resolved path of the world source that defines its class."""
+    sources_by_module = {world_source.module_name: world_source for world_source in world_sources}
+    paths: Dict[str, str] = {}
+    for game, world in get_loaded_world_types().items():
+        world_source = sources_by_module.get(".".join(world.__module__.split(".", 2)[:2]))
+        if world_source:
+            paths[game] = world_source.resolved_path
+    return paths
+
+
+def _update_world_index() -> None:
+    """Index the games of every world source that was imported and not indexed yet."""
+    loaded_world_types = get_loaded_world_types()
+    games: Dict[str, Dict[str, Optional[List[str]]]] = {}
+    for game, path in _get_world_source_paths().items():
+        world = loaded_world_types[game]
+        games.setdefault(path, {})[game] = \
+            [world.settings_key, f"{world.__module__}.{world.__name__}"] if _has_settings(world) else None
+    new_index = {}
+    for world_source in world_sources:
+        path = world_source.resolved_path
+        if path not in _stamps:
+            _stamps[path] = world_source.get_stamp()
+        if path in _world_index and _world_index[path]["stamp"] == _stamps[path]:
+            new_index[path] = _world_index[path]
+        elif world_source.time_taken >= 0:  # imported successfully
+            new_index[path] = {"stamp": _stamps[path], "games": games.get(path, {})}
+    if new_index != _world_index:
+        _write_world_index(new_index)
+
+
+_update_world_index()
+
+# The data packages of all worlds are cached in one file: a header, a marshalled index of the cached games and then
+# the marshalled data package of each game. The file is memory mapped and a game's package is only unmarshalled when
+# it is used. A cached package is used for worlds that are not imported, while the stamp of its world source is
+# unchanged. Imported worlds build their package, as the order of their tables may differ between processes.
+_data_package_cache_header = struct.Struct("<4sIIQ")  # magic, format version, python version, index length
+_data_package_cache_magic = b"APDP"
+_data_package_cache: Dict[str, Tuple[str, List[int], int, int]] = {}
+"""game: (world source path, stamp, offset, length), offset relative to the end of the index"""
+_data_package_cache_map: Optional[mmap.mmap] = None
+_data_package_cache_start = 0
+
+
+def _read_data_package_cache() -> None:
+    global _data_package_cache, _data_package_cache_map, _data_package_cache_start
+    _data_package_cache, _data_package_cache_map = {}, None
+    try:
+        with open(cache_path("worlds", "datapackages.bin"), "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):  # missing or empty
+        return
+    try:
+        magic, version, python_version, index_length = _data_package_cache_header.unpack_from(data)
+        if (magic != _data_package_cache_magic or version != data_package_cache_version
+                or python_version != sys.hexversion >> 16):  # marshal format depends on the python version
+            raise ValueError("Incompatible data package cache")
+        index = marshal.loads(data[_data_package_cache_header.size:_data_package_cache_header.size + index_length])
+        if index["core_version"] != __version__:
+            raise ValueError("Data package cache of a different core version")
+    except (ValueError, EOFError, TypeError, KeyError, struct.error) as e:
+        logging.debug(f"Not using data package cache: {e}")
+        data.close()
+        return
+    _data_package_cache = index["games"]
+    _data_package_cache_map = data
+    _data_package_cache_start = _data_package_cache_header.size + index_length
+
+
+def _read_cached_data_package(game: str) -> Optional[bytes]:
+    """The marshalled data package of game, if it is cached and its world source did not change since."""
+    entry = _data_package_cache.get(game)
+    if entry and _data_package_cache_map and _stamps.get(entry[0]) == entry[1]:
+        start = _data_package_cache_start + entry[2]
+        data = _data_package_cache_map[start:start + entry[3]]
+        if len(data) == entry[3]:  # else the file was cut off
+            return data
+    return None
+
+
+def _get_cached_data_package(game: str) -> Optional[GamesPackage]:
+    """The data package of game, if it is cached, its world source did not change since and it can be read."""
+    data = _read_cached_data_package(game)
+    if data is None:
+        return None
+    try:
+        return marshal.loads(data)
+    except (ValueError, EOFError, TypeError) as e:
+        logging.debug(f"Not using cached data package of {game}: {e}")
+        return None
+
+
+def _write_data_package_cache(packages: Dict[str, Tuple[str, bytes]]) -> None:
+    """Replace the data package cache with packages, game: (world source path, marshalled data package)."""
+    index: Dict[str, Tuple[str, List[int], int, int]] = {}
+    offset = 0
+    for game, (path, data) in packages.items():
+        index[game] = (path, _stamps[path], offset, len(data))
+        offset += len(data)
+    encoded_index = marshal.dumps({"core_version": __version__, "games": index})
+    path = cache_path("worlds", "datapackages.bin")
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # per process, as several processes may start at once and all write the cache
+        with open(f"{path}.{os.getpid()}.tmp", "wb") as f:
+            f.write(_data_package_cache_header.pack(_data_package_cache_magic, data_package_cache_version,
+                                                    sys.hexversion >> 16, len(encoded_index)))
+            f.write(encoded_index)
+            for _, data in packages.values():
+                f.write(data)
+        if _data_package_cache_map:
+            _data_package_cache_map.close()  # can't replace a mapped file on Windows
+        os.replace(f"{path}.{os.getpid()}.tmp", path)
+    except OSError as e:
+        logging.debug(f"Could not write data package cache: {e}")
+    _read_data_package_cache()
+
+
+def _build_data_packages() -> Dict[str, GamesPackage]:
+    """Build the data packages of the imported worlds and add those that are not cached yet to the cache."""
+    built = {game: world.get_data_package_data() for game, world in get_loaded_world_types().items()}
+    source_paths = _get_world_source_paths()
+    if any(game in source_paths and _read_cached_data_package(game) is None for game in built):
+        packages: Dict[str, Tuple[str, bytes]] = {}
+        for game in AutoWorldRegister.world_types:
+            data = _read_cached_data_package(game)
+            if data is not None:
+                packages[game] = (_data_package_cache[game][0], data)
+            elif game in built and game in source_paths:
+                packages[game] = (source_paths[game], marshal.dumps(built[game]))
+        _write_data_package_cache(packages)
+    return built
+
+
+_read_data_package_cache()
+_built_data_packages = _build_data_packages()
+
+
+class LazyGamesPackages(MutableMapping[str, GamesPackage]):
+    """network_data_package["games"] when worlds are loaded lazily, which loads the data package of a game the first
+    time it is looked up. The cached data package of a world that is not imported yet is loaded without importing it."""
+    _packages: Dict[str, GamesPackage]
+
+    def __init__(self, packages: Dict[str, GamesPackage]) -> None:
+        self._packages = packages
+
+    def __getitem__(self, game: str) -> GamesPackage:
+        package = self._packages.get(game)
+        if package is None:
+            world_types = cast(LazyWorldTypes, AutoWorldRegister.world_types)
+            if game not in world_types:
+                raise KeyError(game)
+            if world_types.is_deferred(game):
+                package = _get_cached_data_package(game)
+            if package is None:
+                # imported worlds build their package, like in _build_data_packages
+                package = world_types[game].get_data_package_data()
+            self._packages[game] = package
+        return package
+
+    def __setitem__(self, game: str, package: GamesPackage) -> None:
+        self._packages[game] = package
+
+    def __delitem__(self, game: str) -> None:
+        del self._packages[game]
+
+    def __contains__(self, game: object) -> bool:
+        return game in self._packages or game in AutoWorldRegister.world_types
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._packages
+        yield from (game for game in AutoWorldRegister.world_types if game not in self._packages)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+# Load the data package for each game.
+network_data_package: DataPackage
+if lazy_load:
+    network_data_package = {"games": cast(Dict[str, GamesPackage], LazyGamesPackages(_built_data_packages))}
+else:
+    network_data_package = {"games": _built_data_packages}
+del _built_data_packages
@@ -1,5 +1,6 @@
 import collections
 import logging
+import time
 import typing
 
 from BaseClasses import LocationProgressType, MultiWorld, Location, Region, Entrance
@@ -96,12 +97,110 @@ def exclusion_rules(multiworld: MultiWorld, player: int, exclude_locations: typi
                 logging.warning(f"Unable to exclude location {loc_name} in player {player}'s world.")
 
 
+class RuleStatistics:
+    """
+    Counts the calls and time of access rules, enabled by Generate.py's --profile_rules and read by --profile_report.
+
+    While rule_statistics is set, set_rule and add_rule wrap the rule of a spot in a counting function, and
+    wrap_remaining can wrap rules that worlds assigned directly. Time is tracked both in total and excluding the time of
+    other counted rules evaluated from within a rule, like entrance rules evaluated by state.can_reach.
+    """
+    spots: typing.Dict[typing.Union[Location, Entrance], typing.List[float]]
+    """spot -> [calls, total time, self time]"""
+    _nested_time: typing.List[float]
+
+    def __init__(self) -> None:
+        self.spots = {}
+        self._nested_time = [0.]
+
+    def wrap(self, spot: typing.Union[Location, Entrance], rule: CollectionRule) -> CollectionRule:
+        """Return a rule that counts its calls and time towards spot, then evaluates rule."""
+        rule = unwrap_rule(rule)
+        if rule is Location.access_rule or rule is Entrance.access_rule:
+            return rule
+        return _count_rule(rule, self.spots.setdefault(spot, [0, 0., 0.]), self._nested_time)
+
+    def wrap_remaining(self, multiworld: MultiWorld) -> None:
+        """Wrap the access rules of all locations and entrances that were not set through set_rule or add_rule."""
+        for region in multiworld.get_regions():
+            for spot in (*region.locations, *region.exits):
+                if not is_counted_rule(spot.access_rule):
+                    spot.access_rule = self.wrap(spot, spot.access_rule)
+
+    def get_folded_stacks(self) -> typing.List[str]:
+        """Self time in microseconds per game, spot type and spot, in the folded format read by flame graph tools."""
+        lines: typing.List[str] = []
+        for spot, (calls, total_time, self_time) in self.spots.items():
+            if not calls:
+                continue
+            multiworld = spot.parent_region.multiworld if spot.parent_region else None
+            game = multiworld.game[spot.player] if multiworld else "Unknown"
+            name = f"{spot.name} (Player {spot.player})".replace(";", ",")
+            lines.append(f"{game};{type(spot).__name__};{name} {max(round(self_time * 1_000_000), 0)}")
+        return lines
+
+    def log_summary(self, top: int = 5) -> None:
+        """Log the time spent in rules per game, with the most expensive spots of each game."""
+        games: typing.Dict[str, typing.List[typing.Tuple[typing.Union[Location, Entrance], typing.List[float]]]] = \
+            collections.defaultdict(list)
+        for spot, stats in self.spots.items():
+            if stats[0]:
+                multiworld = spot.parent_region.multiworld if spot.parent_region else None
+                games[multiworld.game[spot.player] if multiworld else "Unknown"].append((spot, stats))
+        self_time_total = sum(stats[2] for spot_stats in games.values() for _, stats in spot_stats) or 1.
+        lines = [f"Access rule profile, {sum(stats[0] for stats in self.spots.values())} evaluations "
+                 f"taking {self_time_total:.2f} seconds:"]
+        for game, spot_stats in sorted(games.items(), key=lambda game_stats: -sum(stats[2] for _, stats in
+                                                                                   game_stats[1])):
+            game_time = sum(stats[2] for _, stats in spot_stats)
+            lines.append(f"  {game}: {game_time:.3f}s ({game_time / self_time_total:.1%}), "
+                         f"{sum(stats[0] for _, stats in spot_stats)} calls")
+            for spot, (calls, total_time, self_time) in sorted(spot_stats, key=lambda item: -item[1][2])[:top]:
+                lines.append(f"    {type(spot).__name__} {spot.name} (Player {spot.player}): {self_time:.3f}s self, "
+                             f"{total_time:.3f}s total, {int(calls)} calls")
+        logging.info("\n".join(lines))
+
+
+def _count_rule(rule: CollectionRule, stats: typing.List[float], nested_time: typing.List[float]) -> CollectionRule:
+    perf_counter = time.perf_counter
+
+    def counted_rule(state: "BaseClasses.CollectionState") -> bool:
+        outer_nested_time = nested_time[0]
+        nested_time[0] = 0.
+        start = perf_counter()
+        result = rule(state)
+        taken = perf_counter() - start
+        stats[0] += 1
+        stats[1] += taken
+        stats[2] += taken - nested_time[0]
+        nested_time[0] = outer_nested_time + taken
+        return result
+
+    counted_rule.__wrapped__ = rule  # type: ignore[attr-defined]
+    return counted_rule
+
+
+_counted_rule_code = _count_rule(Location.access_rule, [0, 0., 0.], [0.]).__code__
+
+rule_statistics: typing.Optional[RuleStatistics] = None
+"""Set to count the calls and time of access rules set from now on."""
+
+
+def is_counted_rule(rule: CollectionRule) -> bool:
+    return getattr(rule, "__code__", None) is _counted_rule_code
+
+
+def unwrap_rule(rule: CollectionRule) -> CollectionRule:
+    """Return the original rule of a rule wrapped by RuleStatistics, or the rule itself."""
+    return rule.__wrapped__ if is_counted_rule(rule) else rule  # type: ignore[attr-defined]
+
+
 def set_rule(spot: typing.Union["BaseClasses.Location", "BaseClasses.Entrance"], rule: CollectionRule):
-    spot.access_rule = rule
+    spot.access_rule = rule_statistics.wrap(spot, rule) if rule_statistics else rule
 
 
 def add_rule(spot: typing.Union["BaseClasses.Location", "BaseClasses.Entrance"], rule: CollectionRule, combine="and"):
-    old_rule = spot.access_rule
+    old_rule = unwrap_rule(spot.access_rule)
     # empty rule, replace instead of add
     if old_rule is Location.access_rule or old_rule is Entrance.access_rule:
         spot.access_rule = rule if combine == "and" else old_rule
@@ -110,6 +209,8 @@ def add_rule(spot: typing.Union["BaseClasses.Location", "BaseClasses.Entrance"],
             spot.access_rule = lambda state: rule(state) and old_rule(state)
         else:
             spot.access_rule = lambda state: rule(state) or old_rule(state)
+    if rule_statistics:
+        spot.access_rule = rule_statistics.wrap(spot, spot.access_rule)
 
 
 def forbid_item(location: "BaseClasses.Location", item: str, player: int):
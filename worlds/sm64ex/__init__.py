@@ -38,6 +38,7 @@ class SM64World(World):
     location_name_to_id = location_table
 
     required_client_version = (0, 3, 5)
+    compact_prog_items = True
 
     area_connections: typing.Dict[int, int]
 